@@ -0,0 +1,107 @@
+"""
+Per-function timings for the keyword rules: the old chained ``in`` checks
+vs. the shared single-pass scanner, over a realistic query corpus.
+
+    python -m benchmarks.bench_keyword_scanner
+"""
+from __future__ import annotations
+
+import re
+import time
+from typing import Callable, List
+
+from src.normalization import rule_engine
+from src.normalization.keyword_scanner import normalize_text, scan_keywords
+
+CORPUS = [
+    "澳門半島上月存款餘額",
+    "上月 ATM 與櫃檯 transaction volume",
+    "近三個月存款餘額趨勢",
+    "今年與去年同比交易量",
+    "列出每個account_no的明細",
+    "客戶明細 customer_id 與 phone",
+    "total deposit balance by region",
+    "總餘額 MOP HKD",
+    "期末餘額 比較 氹仔 vs 路氹城",
+    "what is the weather today",
+]
+N = 20_000
+
+
+def _legacy_normalize(raw_text: str) -> str:
+    text = re.sub(r"\s+", " ", raw_text.strip())
+    for src, dst in {"期末餘額": "存款餘額", "transaction volume": "交易量"}.items():
+        text = text.replace(src, dst)
+    return text
+
+
+def _legacy_intent(text: str) -> str:
+    t = text.lower()
+    if any(k in t for k in ["明細", "detail", "列出每個", "list all"]):
+        return "detail_request"
+    if any(k in t for k in ["趨勢", "trend"]):
+        return "trend"
+    if any(k in t for k in ["比較", "vs", "對比", "同比", "環比"]):
+        return "comparison"
+    if any(k in t for k in ["存款", "交易", "餘額", "kpi", "balance", "volume"]):
+        return "kpi_query"
+    return "out_of_scope"
+
+
+def _legacy_risk(text: str) -> List[str]:
+    lowered = text.lower()
+    flags = []
+    if any(term.lower() in lowered for term in rule_engine.SENSITIVE_TERMS):
+        flags.append("pii_requested")
+    if any(k in lowered for k in ["帳戶明細", "account detail", "account_id"]):
+        flags.append("account_level_detail_requested")
+    if any(k in lowered for k in ["客戶明細", "customer detail", "customer_id"]):
+        flags.append("customer_level_detail_requested")
+    if any(k in lowered for k in ["總餘額", "總和", "total"]) and not any(
+        k in lowered for k in ["mop", "hkd", "幣別", "currency"]
+    ):
+        flags.append("cross_currency_aggregation_risk")
+    return flags
+
+
+def _per_call_us(fn: Callable[[str], object], inputs: List[str]) -> float:
+    start = time.perf_counter()
+    for _ in range(N):
+        for text in inputs:
+            fn(text)
+    return (time.perf_counter() - start) / (N * len(inputs)) * 1e6
+
+
+def _scanned_intent_and_risk(text: str) -> None:
+    hits = scan_keywords(text.lower())
+    rule_engine._detect_intent(text, hits)
+    rule_engine._risk_flags(text, None, hits)
+
+
+def main() -> None:
+    normalized = [normalize_text(q) for q in CORPUS]
+    rows = [
+        ("normalize_text", _per_call_us(_legacy_normalize, CORPUS), _per_call_us(normalize_text, CORPUS)),
+        (
+            "intent",
+            _per_call_us(_legacy_intent, normalized),
+            _per_call_us(lambda t: rule_engine._detect_intent(t, scan_keywords(t.lower())), normalized),
+        ),
+        (
+            "risk_flags",
+            _per_call_us(_legacy_risk, normalized),
+            _per_call_us(lambda t: rule_engine._risk_flags(t, None, scan_keywords(t.lower())), normalized),
+        ),
+        (
+            "intent+risk",
+            _per_call_us(lambda t: (_legacy_intent(t), _legacy_risk(t)), normalized),
+            _per_call_us(_scanned_intent_and_risk, normalized),
+        ),
+    ]
+    print(f"{'function':>16} {'legacy_us':>10} {'scanner_us':>11}")
+    for name, legacy, scanned in rows:
+        print(f"{name:>16} {legacy:>10.2f} {scanned:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+KPI latency: compiled SQL on the local SQLite engine vs the NumPy columnar
+cube, on synthetic data (defaults give ~10M fact_transaction rows; the file
+database is built once and reused).
+
+    python -m benchmarks.bench_kpi_cube [--scale N,M,K] [--txns-per-account-day T] [--db PATH]
+"""
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import statistics
+import time
+from datetime import date, timedelta
+
+from src.query import compile_plan
+from src.query.kpi_cube import KpiCube
+from src.query.sqlite_engine import LocalEngine, SyntheticScale
+
+DEPOSIT = "metric.deposit.total_end_balance"
+TXN = "metric.txn.volume_by_channel"
+
+
+def _plan(metric_id, group_by, measures, start, end, filters=None):
+    return {
+        "plan_version": "1.0",
+        "request_id": "bench",
+        "metric_id": metric_id,
+        "filters": filters or {},
+        "group_by": group_by,
+        "measures": measures,
+        "time_window": {"type": "date_range" if start != end else "single_date", "start_date": start, "end_date": end},
+        "assumptions": [],
+        "confidence": 1.0,
+        "needs_clarification": False,
+        "clarification_question": None,
+    }
+
+
+def _p50_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e3
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", default="20,365,10000", help="N branches, M days, K accounts")
+    parser.add_argument("--txns-per-account-day", type=float, default=2.74)
+    parser.add_argument("--db", default="bench_kpi_cube.db")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    scale = dataclasses.replace(SyntheticScale.parse(args.scale), txns_per_account_day=args.txns_per_account_day)
+    start = time.perf_counter()
+    engine = LocalEngine.open(args.db, scale=scale)
+    print(f"sqlite ready ({scale.describe()}): {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    cube = KpiCube.build(engine.conn)
+    print(f"cube build: {time.perf_counter() - start:.1f}s")
+    for metric_id, metric_cube in cube.cubes.items():
+        size = sum(a.nbytes for a in (metric_cube.dates, metric_cube.row_count, *metric_cube.dims.values(), *metric_cube.sums.values()))
+        print(f"  {metric_id}: {metric_cube.fact_rows:,} fact rows -> {metric_cube.cells:,} cells ({size / 1e6:.1f} MB)")
+
+    first = date.fromisoformat(scale.start_date)
+    last = (first + timedelta(days=scale.days - 1)).isoformat()
+    week = (first + timedelta(days=scale.days - 7)).isoformat()
+    year = (first + timedelta(days=max(0, scale.days - 365))).isoformat()
+    plans = {
+        "txn by channel, 1 day": _plan(TXN, ["channel"], ["txn_count", "txn_amount_net"], last, last),
+        "txn by date x channel, 7 days": _plan(TXN, ["biz_date", "channel"], ["txn_count"], week, last),
+        "txn FEE by date, 1 year": _plan(TXN, ["biz_date"], ["txn_count"], year, last, {"txn_type": "FEE"}),
+        "deposit by branch x currency, 1 day": _plan(DEPOSIT, ["branch_id", "currency"], ["total_end_balance"], last, last),
+        "deposit by region x currency, 7 days": _plan(DEPOSIT, ["biz_date", "region", "currency"], ["total_end_balance"], week, last),
+    }
+    print(f"{'plan':<40}{'sql p50':>12}{'cube p50':>12}{'speedup':>10}")
+    for name, plan in plans.items():
+        query = compile_plan(plan)
+        sql_ms = _p50_ms(lambda: engine.execute(query), args.repeat)
+        cube_ms = _p50_ms(lambda: cube.answer(plan), args.repeat * 20)
+        print(f"{name:<40}{sql_ms:>10.2f}ms{cube_ms:>10.3f}ms{sql_ms / cube_ms:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Question -> answer latency against the local SQLite engine: normalize
+(rules only, no LLM), plan, compile and execute, at a synthetic data volume.
+
+    python -m benchmarks.bench_local_engine [--scale N,M,K] [--db PATH] [--repeat R]
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from datetime import datetime
+
+from src.normalization import normalize_input
+from src.normalization.config import NormalizationSettings
+from src.query import build_semantic_plan, compile_plan
+from src.query.sqlite_engine import LocalEngine, SyntheticScale
+
+QUESTIONS = (
+    "昨天各分行存款餘額",
+    "近7天各區存款餘額",
+    "近7天 ATM 與櫃檯交易量",
+    "近30天每日提款交易筆數",
+    "最近30天各渠道交易淨額",
+)
+USER = {"user_id": "bench", "role": "analyst", "data_scope": ["AGGREGATED_ONLY"], "allowed_regions": []}
+
+
+def _ms(samples) -> str:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"p50={statistics.median(ordered) * 1e3:7.2f}ms p95={p95 * 1e3:7.2f}ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", default="20,365,2000", help="N branches, M days, K accounts")
+    parser.add_argument("--db", default=":memory:")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    scale = SyntheticScale.parse(args.scale)
+    start = time.perf_counter()
+    engine = LocalEngine.open(args.db, scale=scale)
+    print(f"build {scale.describe()}: {time.perf_counter() - start:.2f}s")
+
+    settings = NormalizationSettings(completion_enabled=False)
+    # "today" is the last synthetic day so relative windows land on data
+    last_day = engine.conn.execute("SELECT MAX(biz_date) FROM dim_calendar").fetchone()[0]
+    now = datetime.fromisoformat(f"{last_day}T10:00:00+08:00")
+    context = {"request_id": "bench", "request_ts": now.isoformat()}
+
+    for question in QUESTIONS:
+        front, execute, total = [], [], []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            normalized = normalize_input(question, USER, context, now=now, settings=settings)
+            query = compile_plan(build_semantic_plan(normalized, settings=settings))
+            t1 = time.perf_counter()
+            result = engine.execute(query)
+            t2 = time.perf_counter()
+            front.append(t1 - t0)
+            execute.append(t2 - t1)
+            total.append(t2 - t0)
+        print(f"{question}  [{query.source}, {len(result.rows)} rows]")
+        print(f"  normalize+plan+compile {_ms(front)}  execute {_ms(execute)}  total {_ms(total)}")
+
+
+if __name__ == "__main__":
+    main()
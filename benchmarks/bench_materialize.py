@@ -0,0 +1,125 @@
+"""
+Refresh cost and query latency of the materialized vw_kpi_* summary tables
+vs the plain views, on synthetic multi-year data. Measures the initial full
+build, a no-op refresh, a refresh after appending one business day, and one
+after a back-dated transaction.
+
+    python -m benchmarks.bench_materialize [--scale N,M,K] [--db PATH]
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from datetime import date, timedelta
+
+from src.query import compile_plan
+from src.query.materialize import KpiMaterializer
+from src.query.sqlite_engine import LocalEngine, SyntheticScale
+
+DEPOSIT = "metric.deposit.total_end_balance"
+TXN = "metric.txn.volume_by_channel"
+
+
+def _plan(metric_id, group_by, measures, start, end, window="date_range"):
+    return {
+        "plan_version": "1.0",
+        "request_id": "bench",
+        "metric_id": metric_id,
+        "filters": {},
+        "group_by": group_by,
+        "measures": measures,
+        "time_window": {"type": window, "start_date": start, "end_date": end},
+        "assumptions": [],
+        "confidence": 1.0,
+        "needs_clarification": False,
+        "clarification_question": None,
+    }
+
+
+def _p50_ms(fn, repeat: int = 7) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e3
+
+
+def _append_day(engine: LocalEngine) -> str:
+    """Copy the last business day's facts one day forward."""
+    conn = engine.conn
+    last = conn.execute("SELECT MAX(biz_date) FROM fact_account_balance_daily").fetchone()[0]
+    next_day = (date.fromisoformat(last) + timedelta(days=1)).isoformat()
+    txn_offset = conn.execute("SELECT MAX(txn_id) FROM fact_transaction").fetchone()[0]
+    with conn:
+        conn.execute(
+            "INSERT INTO fact_account_balance_daily SELECT ?, account_id, end_balance, available_bal, hold_amount "
+            "FROM fact_account_balance_daily WHERE biz_date = ?",
+            (next_day, last),
+        )
+        conn.execute(
+            "INSERT INTO fact_transaction SELECT txn_id + ?, ?, account_id, datetime(txn_ts, '+1 day'), txn_type, "
+            "channel, amount, merchant_cat, counterparty FROM fact_transaction WHERE biz_date = ?",
+            (txn_offset, next_day, last),
+        )
+        conn.execute(
+            "INSERT INTO fact_loan_balance_daily SELECT ?, loan_id, outstanding_bal, overdue_days, overdue_amt "
+            "FROM fact_loan_balance_daily WHERE biz_date = ?",
+            (next_day, last),
+        )
+    return next_day
+
+
+def _report(label: str, stats) -> None:
+    total = sum(s.elapsed_seconds for s in stats.values())
+    dates = {s.table.replace("mv_kpi_", ""): s.dates_refreshed for s in stats.values()}
+    print(f"{label:<28}{total * 1e3:>10.1f}ms  dates={dates}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", default="20,1095,500", help="N branches, M days, K accounts")
+    parser.add_argument("--db", default=":memory:")
+    args = parser.parse_args()
+
+    scale = SyntheticScale.parse(args.scale)
+    start = time.perf_counter()
+    engine = LocalEngine.open(args.db, scale=scale)
+    print(f"sqlite ready ({scale.describe()}): {time.perf_counter() - start:.1f}s")
+    last = engine.conn.execute("SELECT MAX(biz_date) FROM fact_account_balance_daily").fetchone()[0]
+    last_day = date.fromisoformat(last)
+    plans = {
+        "txn by date x channel, 7 days": _plan(TXN, ["biz_date", "channel"], ["txn_count"], (last_day - timedelta(days=6)).isoformat(), last),
+        "txn by channel, 1 year": _plan(TXN, ["channel"], ["txn_amount_net"], (last_day - timedelta(days=364)).isoformat(), last),
+        "deposit by region x ccy, 30 days": _plan(
+            DEPOSIT, ["biz_date", "region", "currency"], ["total_end_balance"], (last_day - timedelta(days=29)).isoformat(), last
+        ),
+        "deposit latest by currency": _plan(DEPOSIT, ["biz_date", "currency"], ["total_end_balance"], last, last, "latest_available_date"),
+    }
+    view_ms = {name: _p50_ms(lambda q=compile_plan(plan): engine.execute(q)) for name, plan in plans.items()}
+
+    materializer = KpiMaterializer(engine.conn, routes=engine.routes)
+    materializer.install()
+    _report("full build", materializer.refresh())
+    _report("no-op refresh", materializer.refresh())
+    _append_day(engine)
+    _report("append 1 day", materializer.refresh())
+    with engine.conn:
+        engine.conn.execute(
+            "INSERT INTO fact_transaction (txn_id, biz_date, account_id, txn_ts, txn_type, channel, amount) "
+            "SELECT MAX(txn_id) + 1, ?, 20001, datetime(MAX(txn_ts), '+1 second'), 'FEE', 'ATM', -5 FROM fact_transaction",
+            (scale.start_date,),
+        )
+    _report("back-dated txn", materializer.refresh())
+
+    print(f"{'plan':<36}{'direct p50':>12}{'mv p50':>12}{'speedup':>10}")
+    for name, plan in plans.items():
+        query = compile_plan(plan, routes=engine.routes)
+        mv_ms = _p50_ms(lambda: engine.execute(query))
+        print(f"{name:<36}{view_ms[name]:>10.2f}ms{mv_ms:>10.3f}ms{view_ms[name] / mv_ms:>9.0f}x  [{query.source}]")
+    materializer.uninstall()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Latency of retrieve_metric_hints vs catalog size: linear scan, prebuilt
+keyword index and n-gram TF-IDF mode.
+
+    python -m benchmarks.bench_metric_hints
+"""
+from __future__ import annotations
+
+import random
+import time
+
+from src.normalization.metric_catalog import CompiledMetricCatalog
+from src.normalization.metric_hint_retriever import load_metric_catalog, retrieve_metric_hints
+
+QUERIES = [
+    "昨天澳門半島存款餘額",
+    "查昨天各分行的存款餘額",
+    "近7天 ATM 與櫃檯交易量",
+    "total deposit balance by branch",
+    "channel transaction volume last 7 days",
+]
+_SYLLABLES = "存款貸放交易渠道分行餘額利息手續費逾期客戶帳戶風險資產負債收入支出"
+
+
+def synthetic_catalog(size: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    base = load_metric_catalog("semantic/metrics.yaml")
+    catalog = list(base)
+    while len(catalog) < size:
+        n = len(catalog)
+        word = "".join(rng.choice(_SYLLABLES) for _ in range(4))
+        catalog.append(
+            {
+                "metric_id": f"metric.synthetic.m{n}",
+                "name_zh": f"{word}指標{n}",
+                "name_en": f"Synthetic metric {n} {rng.choice(['volume', 'balance', 'ratio'])}",
+                "definition_zh": "".join(rng.choice(_SYLLABLES) for _ in range(20)),
+                "aliases": [f"{word}{n}", f"alias {n}"],
+            }
+        )
+    return catalog[:size]
+
+
+def _per_query_us(fn, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for query in QUERIES:
+            fn(query)
+    return (time.perf_counter() - start) / (rounds * len(QUERIES)) * 1e6
+
+
+def main() -> None:
+    print(f"{'metrics':>8} {'scan_us':>12} {'index_us':>12} {'speedup':>8} {'build_ms':>10} {'ngram_us':>10}")
+    for size in (10, 100, 1_000, 10_000):
+        plain = synthetic_catalog(size)
+        compiled = CompiledMetricCatalog(source_path="<synthetic>", digest="", metrics=tuple(plain))
+        start = time.perf_counter()
+        compiled.hint_index
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        for query in QUERIES:
+            assert retrieve_metric_hints(query, compiled) == retrieve_metric_hints(query, plain)
+
+        rounds = max(1, 20_000 // size)
+        scan = _per_query_us(lambda q: retrieve_metric_hints(q, plain), rounds)
+        indexed = _per_query_us(lambda q: retrieve_metric_hints(q, compiled), rounds * 10)
+        compiled.ngram_index
+        ngram = _per_query_us(lambda q: retrieve_metric_hints(q, compiled, mode="ngram"), rounds * 10)
+        print(f"{size:>8} {scan:>12.1f} {indexed:>12.1f} {scan / indexed:>7.0f}x {build_ms:>10.1f} {ngram:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+normalize_input latency with metrics disabled (default no-op sink) vs. the
+in-process exporter, plus the per-stage p50/p95/p99 it collects.
+
+    python -m benchmarks.bench_metrics_overhead
+"""
+from __future__ import annotations
+
+import time
+from datetime import datetime
+
+from src.normalization import metrics, normalize_input
+from src.normalization.config import NormalizationSettings
+
+QUERIES = ["昨天澳門半島存款餘額", "上月 ATM 與櫃檯交易量", "列出每個account_no的明細", "total deposit balance"]
+N = 5_000
+SETTINGS = NormalizationSettings(completion_enabled=False)
+
+
+def _run() -> float:
+    user = {"user_id": "u-1", "role": "analyst", "data_scope": ["AGGREGATED_ONLY"], "allowed_regions": []}
+    req = {"request_id": "req-1", "request_ts": "2026-02-11T10:00:00+08:00"}
+    now = datetime(2026, 2, 11, 10, 0)
+    start = time.perf_counter()
+    for i in range(N):
+        normalize_input(QUERIES[i % len(QUERIES)], user, req, now=now, settings=SETTINGS)
+    return (time.perf_counter() - start) / N * 1e6
+
+
+def main() -> None:
+    _run()  # warm caches
+    metrics.set_metrics(None)
+    disabled = _run()
+    sink = metrics.enable_metrics()
+    enabled = _run()
+    metrics.set_metrics(None)
+
+    print(f"disabled: {disabled:.1f} us/request")
+    print(f" enabled: {enabled:.1f} us/request ({(enabled / disabled - 1) * 100:+.1f}%)")
+    print()
+    print(sink.format_summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Plans/sec for build_semantic_plan on normalized requests built once up front
+(metric specs and phrase tables are compiled on the first call and reused).
+
+    python -m benchmarks.bench_plan_builder
+"""
+from __future__ import annotations
+
+import time
+from datetime import datetime
+
+from src.normalization.config import NormalizationSettings
+from src.normalization.rule_engine import build_normalized_request
+from src.query import build_semantic_plan
+
+N = 20_000
+QUERIES = (
+    "查昨天各分行的存款餘額",
+    "本月到今天，澳門半島存款期末餘額",
+    "近7天 ATM 與櫃檯交易量",
+    "今天各渠道交易淨額",
+)
+
+
+def _samples() -> list:
+    return [
+        build_normalized_request(
+            raw_text=text,
+            user_context={"user_id": "u-1", "role": "analyst", "data_scope": ["AGGREGATED_ONLY"], "allowed_regions": []},
+            request_context={"request_id": "req-1", "request_ts": "2026-02-11T10:00:00+08:00"},
+            now=datetime(2026, 2, 11, 10, 0),
+        )
+        for text in QUERIES
+    ]
+
+
+def main() -> None:
+    samples = _samples()
+    settings = NormalizationSettings()
+    start = time.perf_counter()
+    build_semantic_plan(samples[0], settings=settings)
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(N):
+        build_semantic_plan(samples[i % len(samples)], settings=settings)
+    elapsed = time.perf_counter() - start
+    print(f"first plan (compiles specs): {first * 1e3:8.2f} ms")
+    print(f"steady state:                {N / elapsed:>10,.0f} plans/sec ({elapsed / N * 1e6:.1f} µs/plan)")
+
+
+if __name__ == "__main__":
+    main()
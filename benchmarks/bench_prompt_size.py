@@ -0,0 +1,45 @@
+"""
+Prompt size (chars / estimated tokens) and build time: full vs compact completion prompt.
+
+    python -m benchmarks.bench_prompt_size
+"""
+from __future__ import annotations
+
+import time
+from datetime import datetime
+
+from src.normalization.config import NormalizationSettings
+from src.normalization.llm_enricher import _prompt_for
+from src.normalization.llm_prompt import measure_prompt
+from src.normalization.rule_engine import build_normalized_request
+
+QUERIES = ["澳門半島存款餘額", "ATM 與櫃檯交易量", "列出每個account_no的明細", "total deposit balance"]
+N = 5_000
+
+
+def main() -> None:
+    drafts = [
+        build_normalized_request(
+            q,
+            {"user_id": "u-1", "role": "analyst", "data_scope": ["AGGREGATED_ONLY"], "allowed_regions": ["澳門半島", "氹仔"]},
+            {"request_id": "req-1", "request_ts": "2026-02-11T10:00:00+08:00", "channel": "cli"},
+            now=datetime(2026, 2, 11, 10, 0),
+        )
+        for q in QUERIES
+    ]
+    print(f"{'mode':>8} {'chars':>8} {'tokens':>8} {'build_us':>9}")
+    for mode in ("full", "compact"):
+        settings = NormalizationSettings(completion_prompt_mode=mode)
+        sizes = [measure_prompt(_prompt_for(d, None, [], settings)) for d in drafts]
+        start = time.perf_counter()
+        for _ in range(N):
+            for d in drafts:
+                _prompt_for(d, None, [], settings)
+        build_us = (time.perf_counter() - start) / (N * len(drafts)) * 1e6
+        chars = sum(s.chars for s in sizes) / len(sizes)
+        tokens = sum(s.estimated_tokens for s in sizes) / len(sizes)
+        print(f"{mode:>8} {chars:>8.0f} {tokens:>8.0f} {build_us:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
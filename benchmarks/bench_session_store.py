@@ -0,0 +1,63 @@
+"""
+Memory use and per-turn prompt size with 10k live chat sessions:
+unbounded dict of InMemoryChatMessageHistory vs. SessionStore.
+
+    python -m benchmarks.bench_session_store
+"""
+from __future__ import annotations
+
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.chat_history import InMemoryChatMessageHistory
+from langchain_core.messages import AIMessage, HumanMessage
+
+from session_store import SessionStore, message_tokens
+
+SESSIONS = 10_000
+TURNS = 20
+WORKERS = 8
+QUESTION = "請問上月澳門半島的存款餘額與交易量相比前月有何變化？"
+ANSWER = "上月澳門半島存款餘額為 1,234 億 MOP，較前月增加 2.1%；交易量為 56 萬筆，較前月減少 0.8%。" * 3
+
+
+def _simulate(get_history) -> float:
+    def _session(idx: int) -> None:
+        for _ in range(TURNS):
+            get_history(f"s{idx}").add_messages([HumanMessage(QUESTION), AIMessage(ANSWER)])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        list(pool.map(_session, range(SESSIONS)))
+    return time.perf_counter() - start
+
+
+def _prompt_tokens(history) -> int:
+    return sum(message_tokens(m) for m in history.messages)
+
+
+def main() -> None:
+    rows = []
+
+    tracemalloc.start()
+    unbounded: dict = {}
+    elapsed = _simulate(lambda sid: unbounded.setdefault(sid, InMemoryChatMessageHistory()))
+    rows.append(("unbounded dict", len(unbounded), tracemalloc.get_traced_memory()[0], _prompt_tokens(unbounded["s0"]), elapsed))
+    del unbounded
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    store = SessionStore(max_sessions=SESSIONS, max_messages=12, max_tokens=2000)
+    elapsed = _simulate(store.get)
+    rows.append(("SessionStore", len(store), tracemalloc.get_traced_memory()[0], _prompt_tokens(store.get("s0")), elapsed))
+    tracemalloc.stop()
+
+    print(f"{SESSIONS} sessions x {TURNS} turns, {WORKERS} threads")
+    print(f"{'store':>16} {'sessions':>9} {'memory_mb':>10} {'history_tokens/turn':>20} {'elapsed_s':>10}")
+    for name, sessions, mem, tokens, elapsed in rows:
+        print(f"{name:>16} {sessions:>9} {mem / 1e6:>10.1f} {tokens:>20} {elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
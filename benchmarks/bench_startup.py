@@ -0,0 +1,104 @@
+"""
+Startup cost: import time per entry module (``python -X importtime``) and
+cold start of ``main.py chat`` until the first ``You>`` prompt.
+
+    python -m benchmarks.bench_startup [--with-warm-up]
+
+The chat run uses a dummy, unreachable LLM endpoint so nothing leaves the
+machine; ``--with-warm-up`` also times ``chat --warm-up`` against the LLM
+configured in the environment / .env.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+MODULES = ["src.normalization", "src.normalization.batch", "src.app", "chat", "main"]
+# what the old eager startup imported before the first prompt
+DEFERRED = ["dotenv", "langchain_openai", "langchain_core.prompts", "langchain_core.runnables.history"]
+DUMMY_LLM_ENV = {
+    "LLM_BASE_URL": "http://127.0.0.1:9/v1",
+    "LLM_MODEL": "dummy",
+    "LLM_API_KEY": "dummy",
+    "SYSTEM_PROMPT": "dummy",
+}
+
+
+def _importtime(statement: str) -> List[Tuple[float, str, int]]:
+    """``(cumulative_ms, module, depth)`` rows reported by ``-X importtime``."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or "cumulative" in parts[1]:
+            continue
+        name = parts[2][1:]
+        rows.append((int(parts[1]) / 1e3, name.strip(), (len(name) - len(name.lstrip())) // 2))
+    return rows
+
+
+def _import_cost(module: str, baseline: set) -> Tuple[float, List[Tuple[float, str]]]:
+    """Top-level import time of ``module`` beyond interpreter startup, plus its heaviest children."""
+    rows = [row for row in _importtime(f"import {module}") if row[1] not in baseline]
+    total = sum(ms for ms, _, depth in rows if depth == 0)
+    heaviest = sorted(((ms, name) for ms, name, depth in rows if depth in (0, 1) and name != module), reverse=True)
+    return total, heaviest[:3]
+
+
+def _time_to_prompt(args: List[str], env: Dict[str, str]) -> float:
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-u", "main.py", *args],
+        cwd=ROOT,
+        env={**os.environ, **env},
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    seen = b""
+    while b"You> " not in seen:
+        byte = proc.stdout.read(1)
+        if not byte:
+            proc.wait()
+            raise RuntimeError(f"exited before prompt: {seen.decode(errors='replace')}")
+        seen += byte
+    elapsed = time.perf_counter() - start
+    proc.communicate(b"/exit\n", timeout=30)
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--with-warm-up", action="store_true")
+    args = parser.parse_args()
+
+    baseline = {name for _, name, _ in _importtime("pass")}
+    print(f"{'import':<34} {'ms':>8}   heaviest (ms)")
+    for module in MODULES + DEFERRED:
+        total, top = _import_cost(module, baseline)
+        heaviest = ", ".join(f"{name} {ms:.0f}" for ms, name in top)
+        print(f"{module:<34} {total:>8.1f}   {heaviest}")
+
+    print()
+    runs = [("chat (lazy)", ["chat"], DUMMY_LLM_ENV)]
+    if args.with_warm_up:
+        runs.append(("chat --warm-up", ["chat", "--warm-up"], {}))
+    for label, argv, env in runs:
+        samples = [_time_to_prompt(argv, env) for _ in range(3)]
+        print(f"{label:<16} cold start -> first prompt: best {min(samples) * 1e3:.0f} ms over {len(samples)} runs")
+
+
+if __name__ == "__main__":
+    main()
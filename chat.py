@@ -1,16 +1,21 @@
 # chat.py (smartbi_chat.py)
 from __future__ import annotations
 
+import atexit
 import os
 import sys
+import threading
+import time
+from collections import deque
 from dataclasses import dataclass
-from typing import Callable, Dict, Optional
+from typing import TYPE_CHECKING, AsyncIterator, Deque, Iterator, List, Optional
 
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.chat_history import InMemoryChatMessageHistory
-from langchain_core.runnables.history import RunnableWithMessageHistory
+# langchain / dotenv 載入很慢（數百 ms ~ 數秒），一律在真正用到時才 import，
+# 讓 CLI 與只用 src.normalization 的工具啟動不必等
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+    from session_store import SessionStore
 
 
 @dataclass
@@ -31,6 +36,18 @@ class ChatConfig:
     input_messages_key: str = "input"
     history_messages_key: str = "history"
 
+    # ===== 對話記憶上限（避免長時間執行時記憶體無限成長）=====
+    max_sessions: int = 10_000
+    session_idle_ttl_seconds: float = 3600
+    max_history_messages: int = 40
+    max_history_tokens: int = 4000
+
+    # ===== 對話記憶儲存位置 =====
+    # "memory"：只存在 process 內；"sqlite"：存到 history_db_path，重啟後保留、多個 worker 可共用
+    history_backend: str = "memory"
+    history_db_path: str = "chat_history.db"
+    history_write_batch_size: int = 1
+
 
 def _get_env_or_die(key: str) -> str:
     """
@@ -48,6 +65,8 @@ def build_llm(cfg: ChatConfig) -> ChatOpenAI:
     建立 LLM 連線設定（ChatOpenAI）。
     依賴 .env 提供：base_url / model / api_key。
     """
+    from langchain_openai import ChatOpenAI
+
     base_url = _get_env_or_die(cfg.base_url_key)
     model = _get_env_or_die(cfg.model_key)
     api_key = _get_env_or_die(cfg.api_key_key)
@@ -67,6 +86,8 @@ def build_chain(llm: ChatOpenAI, cfg: ChatConfig):
     - history：由 RunnableWithMessageHistory 自動注入
     - human：當下使用者輸入
     """
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
     system_prompt = _get_env_or_die(cfg.system_prompt_key)
 
     prompt = ChatPromptTemplate.from_messages(
@@ -81,11 +102,86 @@ def build_chain(llm: ChatOpenAI, cfg: ChatConfig):
     return prompt | llm
 
 
+def build_session_store(cfg: ChatConfig) -> SessionStore:
+    """
+    依 cfg.history_backend 建立 session 記憶：
+    - memory：process 內的視窗化歷史
+    - sqlite：SQLite 持久化，只讀每個 session 最後 max_history_messages 則
+    """
+    from session_store import SessionStore, SQLiteChatMessageHistory, SQLiteHistoryBackend
+
+    history_factory = None
+    if cfg.history_backend == "sqlite":
+        backend = SQLiteHistoryBackend(cfg.history_db_path, batch_size=cfg.history_write_batch_size)
+        atexit.register(backend.close)  # batch_size > 1 時把尚未寫入的訊息補寫
+
+        def history_factory(session_id: str) -> SQLiteChatMessageHistory:
+            return SQLiteChatMessageHistory(
+                session_id, backend, max_messages=cfg.max_history_messages, max_tokens=cfg.max_history_tokens
+            )
+
+    elif cfg.history_backend != "memory":
+        raise ValueError(f"Unknown history_backend: {cfg.history_backend!r}")
+
+    return SessionStore(
+        max_sessions=cfg.max_sessions,
+        idle_ttl_seconds=cfg.session_idle_ttl_seconds,
+        max_messages=cfg.max_history_messages,
+        max_tokens=cfg.max_history_tokens,
+        history_factory=history_factory,
+    )
+
+
+@dataclass(frozen=True)
+class TurnStats:
+    """
+    一輪串流回覆的延遲統計（秒）；tokens 為粗估值。
+    """
+    session_id: str
+    ttft_seconds: Optional[float]
+    total_seconds: float
+    chunks: int
+    estimated_tokens: int
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.estimated_tokens / self.total_seconds if self.total_seconds > 0 else 0.0
+
+
+class _TurnTimer:
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.start = time.perf_counter()
+        self.first: Optional[float] = None
+        self.parts: List[str] = []
+
+    def chunk(self, text: str) -> None:
+        if self.first is None:
+            self.first = time.perf_counter()
+        self.parts.append(text)
+
+    def finish(self) -> TurnStats:
+        from src.normalization.llm_prompt import estimate_tokens
+
+        return TurnStats(
+            session_id=self.session_id,
+            ttft_seconds=None if self.first is None else self.first - self.start,
+            total_seconds=time.perf_counter() - self.start,
+            chunks=len(self.parts),
+            estimated_tokens=estimate_tokens("".join(self.parts)),
+        )
+
+
+def _chunk_text(chunk) -> str:
+    content = getattr(chunk, "content", chunk)
+    return content if isinstance(content, str) else str(content)
+
+
 class SmartBIChat:
     """
     可重用的 Chat 包裝器：
     - chain：prompt | llm
-    - memory：以 session_id 分流保存對話（InMemoryChatMessageHistory）
+    - memory：以 session_id 分流保存對話（SessionStore，LRU/TTL 淘汰 + 視窗化歷史）
     - chat：RunnableWithMessageHistory，把 history 自動串進 chain
     """
 
@@ -95,50 +191,99 @@ class SmartBIChat:
         *,
         load_env: bool = True,
         test_connection: bool = True,
+        warm_up: bool = False,
     ):
         """
         :param load_env: 是否自動 load_dotenv() 讀取 .env
-        :param test_connection: 是否在初始化時用 "ping" 測試 LLM + prompt 是否可用
+        :param test_connection: 是否用 "ping" 測試 LLM + prompt 是否可用
+        :param warm_up: True 時在 __init__ 內同步完成 import / 建立 chain / ping（舊行為）；
+            False 時這些都在背景 thread 進行，第一次用到 llm / chain / chat / store 才等待
         """
         self.cfg = cfg or ChatConfig()
+        self.test_connection = test_connection
 
         # 讀取 .env（例如本地開發情境很需要；若部署環境用外部注入 env，可設 False）
         if load_env:
+            from dotenv import load_dotenv
+
             load_dotenv()
 
-        # 以 session_id 管理記憶：同一個 session_id 共享上下文
-        self.store: Dict[str, InMemoryChatMessageHistory] = {}
-
-        # 建立 llm 與 chain
-        self.llm = build_llm(self.cfg)
-        self.chain = build_chain(self.llm, self.cfg)
-
-        # 測試 chain 連線（保留你原本的報錯日誌）
-        if test_connection:
-            try:
-                _ = self.chain.invoke({self.cfg.input_messages_key: "ping", self.cfg.history_messages_key: []})
-            except Exception as e:
-                print("[Chain error]: ", repr(e))
-                # 初始化直接失敗通常是設定問題；這裡選擇直接結束，行為跟你原先一致
-                sys.exit(1)
-
-        def get_history(session_id: str) -> InMemoryChatMessageHistory:
-            """
-            取得/建立指定 session 的對話歷史。
-            """
-            if session_id not in self.store:
-                self.store[session_id] = InMemoryChatMessageHistory()
-            return self.store[session_id]
-
-        self._get_history: Callable[[str], InMemoryChatMessageHistory] = get_history
-
-        # 包裝成可自動帶記憶的 chat runnable
-        self.chat = RunnableWithMessageHistory(
-            self.chain,
-            get_session_history=self._get_history,
-            input_messages_key=self.cfg.input_messages_key,
-            history_messages_key=self.cfg.history_messages_key,
-        )
+        # 串流回覆的每輪統計（time-to-first-token、tokens/sec），只保留最近 1000 輪
+        self.turn_stats: Deque[TurnStats] = deque(maxlen=1000)
+        self.last_turn: Optional[TurnStats] = None
+
+        self._ready = threading.Event()
+        self._setup_error: Optional[BaseException] = None
+        if warm_up:
+            self._setup()
+            self._wait_ready()
+        else:
+            threading.Thread(target=self._setup, name="smartbi-chat-setup", daemon=True).start()
+
+    def _setup(self) -> None:
+        """
+        建立 session 記憶、llm、chain 與 chat runnable，並（可選）測試連線。
+        """
+        try:
+            from langchain_core.runnables.history import RunnableWithMessageHistory
+
+            # 以 session_id 管理記憶：同一個 session_id 共享上下文
+            self._store = build_session_store(self.cfg)
+
+            # 建立 llm 與 chain
+            self._llm = build_llm(self.cfg)
+            self._chain = build_chain(self._llm, self.cfg)
+
+            # 包裝成可自動帶記憶的 chat runnable
+            self._chat = RunnableWithMessageHistory(
+                self._chain,
+                get_session_history=self._store.get,
+                input_messages_key=self.cfg.input_messages_key,
+                history_messages_key=self.cfg.history_messages_key,
+            )
+
+            # 測試 chain 連線
+            if self.test_connection:
+                _ = self._chain.invoke({self.cfg.input_messages_key: "ping", self.cfg.history_messages_key: []})
+        except BaseException as e:  # 包含 _get_env_or_die 的 SystemExit
+            self._setup_error = e
+        finally:
+            self._ready.set()
+
+    def _wait_ready(self) -> None:
+        self._ready.wait()
+        if self._setup_error is not None:
+            # 保留你原本的報錯日誌；初始化失敗通常是設定問題，直接結束，行為跟你原先一致
+            if not isinstance(self._setup_error, SystemExit):
+                print("[Chain error]: ", repr(self._setup_error))
+            sys.exit(1)
+
+    @property
+    def ready(self) -> bool:
+        """
+        背景初始化（含連線測試）是否已完成。
+        """
+        return self._ready.is_set()
+
+    @property
+    def store(self) -> "SessionStore":
+        self._wait_ready()
+        return self._store
+
+    @property
+    def llm(self) -> "ChatOpenAI":
+        self._wait_ready()
+        return self._llm
+
+    @property
+    def chain(self):
+        self._wait_ready()
+        return self._chain
+
+    @property
+    def chat(self):
+        self._wait_ready()
+        return self._chat
 
     def invoke(self, session_id: str, user_text: str) -> str:
         """
@@ -148,7 +293,7 @@ class SmartBIChat:
         try:
             out = self.chat.invoke(
                 {self.cfg.input_messages_key: user_text},
-                config={"configurable": {"session_id": session_id}},
+                config=self._session_config(session_id),
             )
             return out.content
         except Exception as e:
@@ -156,17 +301,59 @@ class SmartBIChat:
             print("[error]", repr(e))
             raise
 
+    def _session_config(self, session_id: str) -> dict:
+        return {"configurable": {"session_id": session_id}}
+
+    def stream(self, session_id: str, user_text: str) -> Iterator[str]:
+        """
+        與 invoke 相同，但邊收到模型輸出邊 yield 文字片段；
+        串流結束後完整回覆一樣會寫進該 session 的記憶，並記錄本輪 TurnStats。
+        """
+        turn = _TurnTimer(session_id)
+        try:
+            for chunk in self.chat.stream({self.cfg.input_messages_key: user_text}, config=self._session_config(session_id)):
+                text = _chunk_text(chunk)
+                if text:
+                    turn.chunk(text)
+                    yield text
+        except Exception as e:
+            print("[error]", repr(e))
+            raise
+        self._record_turn(turn.finish())
+
+    async def astream(self, session_id: str, user_text: str) -> AsyncIterator[str]:
+        """
+        stream 的 async 版本。
+        """
+        turn = _TurnTimer(session_id)
+        try:
+            async for chunk in self.chat.astream(
+                {self.cfg.input_messages_key: user_text}, config=self._session_config(session_id)
+            ):
+                text = _chunk_text(chunk)
+                if text:
+                    turn.chunk(text)
+                    yield text
+        except Exception as e:
+            print("[error]", repr(e))
+            raise
+        self._record_turn(turn.finish())
+
+    def _record_turn(self, stats: "TurnStats") -> None:
+        self.last_turn = stats
+        self.turn_stats.append(stats)
+
     def reset(self, session_id: str) -> None:
         """
         清空某個 session 的對話記憶。
         """
-        self.store[session_id] = InMemoryChatMessageHistory()
+        self.store.reset(session_id)
 
     def history(self, session_id: str):
         """
-        取得某個 session 的完整訊息列表（可用於 /history 指令）。
+        取得某個 session 目前保留的訊息列表（可用於 /history 指令）。
         """
-        return list(self._get_history(session_id).messages)
+        return list(self.store.get(session_id).messages)
 
     def ping(self) -> str:
         """
@@ -1,8 +1,65 @@
-from src.app import run_cli
+from __future__ import annotations
 
+import argparse
+import sys
+from typing import Optional, Sequence
 
-def main() -> None:
-    run_cli()
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="smartbi")
+    sub = parser.add_subparsers(dest="command")
+    chat = sub.add_parser("chat", help="interactive SmartBI chat (default)")
+    chat.add_argument("--warm-up", action="store_true", help="connect to the LLM before showing the prompt")
+
+    batch = sub.add_parser("normalize-jsonl", help="normalize a JSONL file of requests")
+    batch.add_argument("input", help="input JSONL path, '-' for stdin")
+    batch.add_argument("output", help="output JSONL path, '-' for stdout")
+    batch.add_argument("--workers", type=int, default=0, help="process pool size (0 = in-process)")
+    batch.add_argument("--chunk-size", type=int, default=64)
+    batch.add_argument("--text-field", default=None, help="record field holding the query text")
+    batch.add_argument("--metrics-path", default="semantic/metrics.yaml")
+
+    local_db = sub.add_parser("local-db", help="build the offline SQLite copy of exmaple_data.sql")
+    local_db.add_argument("output", help="SQLite database path")
+    local_db.add_argument("--sql", default="exmaple_data.sql", help="MySQL script to translate")
+    local_db.add_argument("--scale", default=None, metavar="N,M,K", help="synthetic N branches x M days x K accounts")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = _build_parser().parse_args(argv)
+
+    if args.command == "normalize-jsonl":
+        from src.normalization.batch import BatchOptions, normalize_jsonl
+
+        stats = normalize_jsonl(
+            args.input,
+            args.output,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            options=BatchOptions(metrics_path=args.metrics_path, text_field=args.text_field),
+        )
+        print(
+            f"[normalize-jsonl] records={stats.records} ok={stats.succeeded} failed={stats.failed} "
+            f"elapsed={stats.elapsed_seconds:.2f}s throughput={stats.records_per_second:,.0f} records/sec",
+            file=sys.stderr,
+        )
+        return
+
+    if args.command == "local-db":
+        import time
+
+        from src.query.sqlite_engine import SyntheticScale, open_local_db
+
+        start = time.perf_counter()
+        scale = SyntheticScale.parse(args.scale) if args.scale else None
+        open_local_db(args.output, sql_path=args.sql, scale=scale).close()
+        print(f"[local-db] {args.output} ready in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        return
+
+    from src.app import run_cli
+
+    run_cli(warm_up=getattr(args, "warm_up", False))
 
 
 if __name__ == "__main__":
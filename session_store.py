@@ -0,0 +1,275 @@
+# session_store.py
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Callable, Deque, List, Optional, Sequence, Tuple
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+from src.normalization.llm_prompt import estimate_tokens
+
+
+def message_tokens(message: BaseMessage) -> int:
+    """粗估單則訊息 token 數（與 normalization prompt 的估算方式一致）。"""
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    return estimate_tokens(content) + 4  # role / 分隔符的固定開銷
+
+
+class WindowedChatMessageHistory(BaseChatMessageHistory):
+    """
+    只保留最近一段對話的記憶：
+    - 超過 max_messages 則或 max_tokens（粗估）時，從最舊的訊息開始丟
+    - 最新一則訊息一定保留
+    """
+
+    def __init__(self, max_messages: int = 40, max_tokens: int = 4000):
+        self.max_messages = max(1, max_messages)
+        self.max_tokens = max(1, max_tokens)
+        self._messages: Deque[BaseMessage] = deque()
+        self._token_counts: Deque[int] = deque()
+        self.tokens = 0
+        self._lock = threading.Lock()
+
+    @property
+    def messages(self) -> list[BaseMessage]:
+        with self._lock:
+            return list(self._messages)
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        with self._lock:
+            for message in messages:
+                n = message_tokens(message)
+                self._messages.append(message)
+                self._token_counts.append(n)
+                self.tokens += n
+            while len(self._messages) > 1 and (
+                len(self._messages) > self.max_messages or self.tokens > self.max_tokens
+            ):
+                self._messages.popleft()
+                self.tokens -= self._token_counts.popleft()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._messages.clear()
+            self._token_counts.clear()
+            self.tokens = 0
+
+
+def _window_by_tokens(messages: List[BaseMessage], max_tokens: int) -> List[BaseMessage]:
+    """從最新往回累計 token，超過 max_tokens 的較舊訊息丟掉（最新一則一定保留）。"""
+    total = 0
+    for idx in range(len(messages) - 1, -1, -1):
+        total += message_tokens(messages[idx])
+        if total > max_tokens and idx < len(messages) - 1:
+            return messages[idx + 1 :]
+    return messages
+
+
+class SQLiteHistoryBackend:
+    """
+    多個 session 共用的 SQLite 儲存（WAL 模式，可多個 process 同時讀寫）：
+    - 只做 append；每次 add_messages 先進 buffer，累積到 batch_size 則才一次寫入
+    - 讀取前會先 flush，同一 process 內一定讀得到自己剛寫的訊息
+    - 以 (session_id, id) 建索引，只讀最後 N 則，不需載入完整對話
+    """
+
+    def __init__(self, path: str, *, batch_size: int = 1, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, float, str]] = []
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_messages ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, created_at REAL NOT NULL, message TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_messages_session ON chat_messages (session_id, id)")
+
+    def append(self, session_id: str, messages: Sequence[BaseMessage]) -> None:
+        now = time.time()
+        rows = [(session_id, now, json.dumps(message_to_dict(m), ensure_ascii=False)) for m in messages]
+        with self._lock:
+            self._pending.extend(rows)
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._pending or self._conn is None:
+            return
+        rows, self._pending = self._pending, []
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany("INSERT INTO chat_messages (session_id, created_at, message) VALUES (?, ?, ?)", rows)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            self._pending = rows + self._pending
+            raise
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def load_last(self, session_id: str, limit: int) -> List[BaseMessage]:
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(
+                "SELECT message FROM chat_messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, limit),
+            ).fetchall()
+        return messages_from_dict([json.loads(row[0]) for row in reversed(rows)])
+
+    def count(self, session_id: str) -> int:
+        with self._lock:
+            self._flush_locked()
+            (n,) = self._conn.execute("SELECT COUNT(*) FROM chat_messages WHERE session_id = ?", (session_id,)).fetchone()
+        return n
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._pending = [row for row in self._pending if row[0] != session_id]
+            self._conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._flush_locked()
+                self._conn.close()
+                self._conn = None
+
+
+class SQLiteChatMessageHistory(BaseChatMessageHistory):
+    """
+    持久化的對話歷史：訊息存在 SQLite，重啟後仍在。
+    messages 只讀最後 max_messages 則，再依 max_tokens 視窗化。
+    """
+
+    def __init__(self, session_id: str, backend: SQLiteHistoryBackend, max_messages: int = 40, max_tokens: int = 4000):
+        self.session_id = session_id
+        self.backend = backend
+        self.max_messages = max(1, max_messages)
+        self.max_tokens = max(1, max_tokens)
+
+    @property
+    def messages(self) -> list[BaseMessage]:
+        return _window_by_tokens(self.backend.load_last(self.session_id, self.max_messages), self.max_tokens)
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        self.backend.append(self.session_id, messages)
+
+    def clear(self) -> None:
+        self.backend.delete(self.session_id)
+
+
+@dataclass(frozen=True)
+class SessionStoreStats:
+    sessions: int
+    messages: int
+    estimated_tokens: int
+    evicted_lru: int
+    evicted_idle: int
+
+
+class SessionStore:
+    """
+    以 session_id 管理對話歷史，並限制記憶體用量：
+    - 最多 max_sessions 個 session，超過時淘汰最久未使用者（LRU）
+    - 閒置超過 idle_ttl_seconds 的 session 會被清掉（<= 0 表示不過期）
+    - 每個 session 的訊息由 history_factory 建立（預設為視窗化歷史）
+    所有操作皆為 thread-safe。
+    """
+
+    def __init__(
+        self,
+        *,
+        max_sessions: int = 10_000,
+        idle_ttl_seconds: float = 3600,
+        max_messages: int = 40,
+        max_tokens: int = 4000,
+        history_factory: Optional[Callable[[str], BaseChatMessageHistory]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_sessions = max(1, max_sessions)
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._history_factory = history_factory or (
+            lambda _session_id: WindowedChatMessageHistory(max_messages=max_messages, max_tokens=max_tokens)
+        )
+        self._clock = clock
+        self._lock = threading.Lock()
+        # session_id -> (history, last_access)；依最後存取時間排序，最舊的在前面
+        self._sessions: "OrderedDict[str, tuple[BaseChatMessageHistory, float]]" = OrderedDict()
+        self._evicted_lru = 0
+        self._evicted_idle = 0
+
+    def get(self, session_id: str) -> BaseChatMessageHistory:
+        """
+        取得/建立指定 session 的對話歷史（給 RunnableWithMessageHistory 用）。
+        """
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                history = self._history_factory(session_id)
+                while len(self._sessions) >= self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self._evicted_lru += 1
+            else:
+                history = entry[0]
+            self._sessions[session_id] = (history, now)
+            self._sessions.move_to_end(session_id)
+            return history
+
+    def _expire(self, now: float) -> None:
+        if self.idle_ttl_seconds <= 0:
+            return
+        while self._sessions:
+            _, (_, last_access) = next(iter(self._sessions.items()))
+            if now - last_access <= self.idle_ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
+            self._evicted_idle += 1
+
+    def evict_expired(self) -> None:
+        with self._lock:
+            self._expire(self._clock())
+
+    def reset(self, session_id: str) -> None:
+        """
+        清空某個 session 的對話記憶。
+        """
+        self.get(session_id).clear()
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._sessions
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self) -> SessionStoreStats:
+        with self._lock:
+            histories = [history for history, _ in self._sessions.values()]
+            evicted_lru, evicted_idle = self._evicted_lru, self._evicted_idle
+        messages = tokens = 0
+        for history in histories:
+            msgs = history.messages
+            messages += len(msgs)
+            tokens += getattr(history, "tokens", None) or sum(message_tokens(m) for m in msgs)
+        return SessionStoreStats(
+            sessions=len(histories),
+            messages=messages,
+            estimated_tokens=tokens,
+            evicted_lru=evicted_lru,
+            evicted_idle=evicted_idle,
+        )
@@ -2,25 +2,44 @@ from __future__ import annotations
 
 import json
 from datetime import datetime
+from typing import TYPE_CHECKING
 
-from chat import SmartBIChat
 from src.normalization import NormalizationError, normalize_input
 
+if TYPE_CHECKING:
+    from chat import SmartBIChat
+
 
 def _make_llm_completion_client(bot: SmartBIChat):
     """Adapt LangChain chat model output to enricher's plain-text completion interface."""
 
-    def _client(prompt: str, timeout: int = 5) -> str:
-        del timeout  # timeout control is model/provider specific for invoke()
-        response = bot.llm.invoke(prompt)
+    def _client(prompt: str, timeout: float = 5) -> str:
+        # passed through to the provider's HTTP client; enrich_draft stops waiting at the same budget
+        response = bot.llm.invoke(prompt, timeout=timeout)
         return response.content if hasattr(response, "content") else str(response)
 
+    _client.model_id = getattr(bot.llm, "model_name", "")  # completion cache namespace
     return _client
 
 
-def run_cli() -> None:
-    bot = SmartBIChat(load_env=True)
-    llm_completion_client = _make_llm_completion_client(bot)
+def _make_async_llm_completion_client(bot: SmartBIChat):
+    """Awaitable variant for ``anormalize_input``/``aenrich_draft``, backed by ``ainvoke``."""
+
+    async def _aclient(prompt: str, timeout: float = 5) -> str:
+        # aenrich_draft also cancels the call once this budget is spent
+        response = await bot.llm.ainvoke(prompt, timeout=timeout)
+        return response.content if hasattr(response, "content") else str(response)
+
+    _aclient.model_id = getattr(bot.llm, "model_name", "")
+    return _aclient
+
+
+def run_cli(warm_up: bool = False) -> None:
+    # chat（langchain）在這裡才載入；沒有 warm_up 時連線檢查在背景進行，提示字元不必等 LLM
+    from chat import SmartBIChat
+
+    bot = SmartBIChat(load_env=True, warm_up=warm_up)
+    llm_completion_client = None
     session_id = "smartbi-cli"
 
     print("=== SmartBI CLI Chat (LangChain + Memory) ===")
@@ -72,6 +91,8 @@ def run_cli() -> None:
                 "allowed_regions": ["澳門半島", "氹仔", "路氹城", "路環"],
             }
 
+            if llm_completion_client is None:
+                llm_completion_client = _make_llm_completion_client(bot)
             try:
                 normalized = normalize_input(
                     text_for_normalize,
@@ -87,7 +108,11 @@ def run_cli() -> None:
                 continue
 
         try:
-            ans = bot.invoke(session_id, user_text)
-            print("AI>", ans)
+            # 邊收邊印：time-to-first-token 不再等於整段回覆的延遲
+            print("AI> ", end="", flush=True)
+            for chunk in bot.stream(session_id, user_text):
+                print(chunk, end="", flush=True)
+            print()
         except Exception as e:
+            print()
             print("[error]", repr(e))
@@ -1,3 +1,17 @@
-from .normalizer import NormalizationError, normalize_input
+from .config import NormalizationSettings, get_settings, load_settings, reload_settings
+from .metrics import InProcessMetrics, enable_metrics, get_metrics, set_metrics
+from .normalizer import NormalizationError, anormalize_input, normalize_input
 
-__all__ = ["NormalizationError", "normalize_input"]
+__all__ = [
+    "InProcessMetrics",
+    "NormalizationError",
+    "NormalizationSettings",
+    "anormalize_input",
+    "enable_metrics",
+    "get_metrics",
+    "get_settings",
+    "load_settings",
+    "normalize_input",
+    "reload_settings",
+    "set_metrics",
+]
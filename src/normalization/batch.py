@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from itertools import islice
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .config import NormalizationSettings, get_settings
+from .metric_catalog import get_metric_catalog
+from .normalizer import normalize_input
+
+TEXT_FIELDS = ("raw_text", "text", "query")
+
+DEFAULT_USER_CONTEXT: Dict[str, object] = {
+    "user_id": "batch",
+    "role": "batch",
+    "data_scope": ["AGGREGATED_ONLY"],
+    "allowed_regions": [],
+}
+
+
+@dataclass(frozen=True)
+class BatchOptions:
+    """Per-run options shipped once to every worker process."""
+
+    metrics_path: str = "semantic/metrics.yaml"
+    text_field: Optional[str] = None
+    now: Optional[datetime] = None
+    user_context: Dict[str, object] = field(default_factory=lambda: dict(DEFAULT_USER_CONTEXT))
+    settings: Optional[NormalizationSettings] = None
+
+
+@dataclass
+class BatchStats:
+    records: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def records_per_second(self) -> float:
+        return self.records / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+
+_worker_options: Optional[BatchOptions] = None
+
+
+def _init_worker(options: BatchOptions) -> None:
+    """Pool initializer: keep options and warm the compiled catalog + hint index once per worker."""
+    global _worker_options
+    _worker_options = options
+    get_metric_catalog(options.metrics_path).hint_index
+
+
+def _extract_text(record: Dict[str, Any], text_field: Optional[str]) -> str:
+    fields = (text_field,) if text_field else TEXT_FIELDS
+    for name in fields:
+        value = record.get(name)
+        if isinstance(value, str) and value.strip():
+            return value
+    raise ValueError(f"record has no text field ({', '.join(fields)})")
+
+
+def _normalize_record(seq: int, record: Any, options: BatchOptions) -> Dict[str, Any]:
+    try:
+        if isinstance(record, str):
+            record = json.loads(record)
+        if not isinstance(record, dict):
+            raise ValueError("record must be a JSON object")
+
+        now = options.now or datetime.now().astimezone()
+        request_context = {
+            "request_id": str(record.get("request_id") or f"batch-{seq}"),
+            "request_ts": now.isoformat(),
+            "timezone": "Asia/Macau",
+            "channel": "batch",
+        }
+        request_context.update(record.get("request_context") or {})
+        user_context = dict(options.user_context)
+        user_context.update(record.get("user_context") or {})
+
+        result = normalize_input(
+            _extract_text(record, options.text_field),
+            user_context,
+            request_context,
+            metrics_path=options.metrics_path,
+            now=options.now,
+            settings=options.settings,
+        )
+        return {"seq": seq, "ok": True, "result": result}
+    except Exception as e:
+        return {"seq": seq, "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+
+def _process_chunk(chunk: List[Tuple[int, Any]]) -> List[Dict[str, Any]]:
+    options = _worker_options or BatchOptions()
+    return [_normalize_record(seq, record, options) for seq, record in chunk]
+
+
+def _chunks(records: Iterable[Any], chunk_size: int) -> Iterator[List[Tuple[int, Any]]]:
+    numbered = enumerate(records)
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _ordered_results(
+    executor: Executor,
+    chunks: Iterator[List[Tuple[int, Any]]],
+    max_pending: int,
+) -> Iterator[Dict[str, Any]]:
+    # at most max_pending chunks are in flight, so memory stays bounded
+    pending: Deque[Future] = deque()
+    for chunk in chunks:
+        pending.append(executor.submit(_process_chunk, chunk))
+        if len(pending) >= max_pending:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+
+def normalize_many(
+    records: Iterable[Any],
+    *,
+    workers: int = 0,
+    chunk_size: int = 64,
+    max_pending_chunks: Optional[int] = None,
+    options: Optional[BatchOptions] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Normalize a stream of records (dicts or raw JSON lines) in input order.
+
+    Yields ``{"seq", "ok", "result"|"error"}`` per record. ``workers <= 1``
+    runs in-process; otherwise records are fanned out in chunks over a
+    process pool. LLM completion is not used in batch mode.
+    """
+    options = options or BatchOptions()
+    if options.settings is None:
+        options = replace(options, settings=get_settings())
+
+    chunks = _chunks(records, max(1, chunk_size))
+    if workers <= 1:
+        _init_worker(options)
+        for chunk in chunks:
+            yield from _process_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(options,)) as executor:
+        yield from _ordered_results(executor, chunks, max_pending_chunks or workers * 4)
+
+
+def normalize_jsonl(
+    input_path: str,
+    output_path: str,
+    *,
+    workers: int = 0,
+    chunk_size: int = 64,
+    options: Optional[BatchOptions] = None,
+) -> BatchStats:
+    """Stream ``input_path`` (JSONL, ``-`` for stdin) to ``output_path`` (``-`` for stdout)."""
+    stats = BatchStats()
+    start = time.perf_counter()
+
+    src = sys.stdin if input_path == "-" else open(input_path, encoding="utf-8")
+    dst = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8")
+    try:
+        lines = (line for line in src if line.strip())
+        for item in normalize_many(lines, workers=workers, chunk_size=chunk_size, options=options):
+            dst.write(json.dumps(item, ensure_ascii=False) + "\n")
+            stats.records += 1
+            if item["ok"]:
+                stats.succeeded += 1
+            else:
+                stats.failed += 1
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+    stats.elapsed_seconds = time.perf_counter() - start
+    return stats
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict
+
+from .metrics import gauge, incr
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# gauge values exported as circuit_state.<model>
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Failure-rate breaker for one model.
+
+    closed: calls go through; once the last ``window`` outcomes hold at least
+    ``min_calls`` results and ``failure_rate`` of them are failures, it opens.
+    open: calls are refused until ``open_seconds`` have passed.
+    half_open: up to ``half_open_probes`` trial calls; one success closes the
+    breaker (with a fresh window), one failure re-opens it. Every allowed call
+    must end in ``record_success``, ``record_failure`` or ``release``.
+    """
+
+    def __init__(
+        self,
+        name: str = "",
+        *,
+        window: int = 20,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        open_seconds: float = 30,
+        half_open_probes: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.min_calls = max(1, min_calls)
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes: Deque[bool] = deque(maxlen=max(self.min_calls, window))
+        self._failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._publish()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; in half-open this reserves a probe slot."""
+        with self._lock:
+            if self._state == OPEN:
+                if self._clock() - self._opened_at < self.open_seconds:
+                    return False
+                self._transition(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    return False
+                self._probes += 1
+            return True
+
+    def release(self) -> None:
+        """Hand back a slot taken by ``allow`` for a call that ended without an outcome (cancelled, cut short)."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._outcomes.clear()
+                self._failures = 0
+                self._transition(CLOSED)
+            elif self._state == CLOSED:
+                self._add(False)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open()
+            elif self._state == CLOSED:
+                self._add(True)
+                if len(self._outcomes) >= self.min_calls and self._failures >= self.failure_rate * len(self._outcomes):
+                    self._open()
+
+    def _add(self, failed: bool) -> None:
+        if len(self._outcomes) == self._outcomes.maxlen and self._outcomes[0]:
+            self._failures -= 1
+        self._outcomes.append(failed)
+        self._failures += failed
+
+    def _open(self) -> None:
+        self._opened_at = self._clock()
+        self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        self._state = state
+        self._probes = 0
+        incr(f"circuit.{state}")
+        self._publish()
+
+    def _publish(self) -> None:
+        gauge(f"circuit_state.{self.name or 'default'}", STATE_VALUES[self._state])
+
+
+class CircuitBreakerRegistry:
+    """One breaker per model id, created on first use with the given settings."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, model_id: str, **kwargs) -> CircuitBreaker:
+        breaker = self._breakers.get(model_id)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(model_id)
+                if breaker is None:
+                    breaker = self._breakers[model_id] = CircuitBreaker(model_id, **kwargs)
+        return breaker
+
+    def states(self) -> Dict[str, str]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {model_id: breaker.state for model_id, breaker in breakers.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._breakers.clear()
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from .config import NormalizationSettings
+
+_EVICTION_CHECK_EVERY = 64
+
+
+def completion_cache_key(prompt: str, model_id: str = "") -> str:
+    """Content address of one completion: sha256 over model id + prompt."""
+    digest = hashlib.sha256()
+    digest.update(model_id.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class CompletionCacheStats:
+    hits: int
+    misses: int
+    memory_hits: int
+    disk_hits: int
+    stores: int
+    evictions: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class CompletionCache:
+    """
+    Two-level cache of raw LLM completions: in-memory LRU in front of an
+    optional SQLite store. Entries expire after ``ttl_seconds``; each level
+    is trimmed to its max entry count, oldest first.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        *,
+        max_memory_entries: int = 1024,
+        max_disk_entries: int = 100_000,
+        ttl_seconds: float = 86_400,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.max_memory_entries = max(1, max_memory_entries)
+        self.max_disk_entries = max(1, max_disk_entries)
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._puts_since_trim = 0
+        self._hits = self._misses = self._memory_hits = self._disk_hits = 0
+        self._stores = self._evictions = 0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_completions_created_at ON completions (created_at)")
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        now = self._clock()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[1], now):
+                    self._memory.move_to_end(key)
+                    self._hits += 1
+                    self._memory_hits += 1
+                    return entry[0]
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute("SELECT value, created_at FROM completions WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    if not self._expired(row[1], now):
+                        self._remember(key, row[0], row[1])
+                        self._hits += 1
+                        self._disk_hits += 1
+                        return row[0]
+                    self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                    self._evictions += 1
+
+            self._misses += 1
+            return None
+
+    def put(self, key: str, value: str) -> None:
+        now = self._clock()
+        with self._lock:
+            self._remember(key, value, now)
+            self._stores += 1
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO completions (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, value, now),
+                )
+                self._puts_since_trim += 1
+                if self._puts_since_trim >= _EVICTION_CHECK_EVERY:
+                    self._trim_disk(now)
+
+    def _remember(self, key: str, value: str, created_at: float) -> None:
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._evictions += 1
+
+    def _trim_disk(self, now: float) -> None:
+        self._puts_since_trim = 0
+        if self.ttl_seconds > 0:
+            cur = self._conn.execute("DELETE FROM completions WHERE created_at < ?", (now - self.ttl_seconds,))
+            self._evictions += max(cur.rowcount, 0)
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()
+        if count > self.max_disk_entries:
+            cur = self._conn.execute(
+                "DELETE FROM completions WHERE key IN (SELECT key FROM completions ORDER BY created_at LIMIT ?)",
+                (count - self.max_disk_entries,),
+            )
+            self._evictions += max(cur.rowcount, 0)
+
+    def trim(self) -> None:
+        """Apply TTL and size limits to the disk store now."""
+        with self._lock:
+            if self._conn is not None:
+                self._trim_disk(self._clock())
+
+    def stats(self) -> CompletionCacheStats:
+        return CompletionCacheStats(
+            hits=self._hits,
+            misses=self._misses,
+            memory_hits=self._memory_hits,
+            disk_hits=self._disk_hits,
+            stores=self._stores,
+            evictions=self._evictions,
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM completions")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_caches: Dict[tuple, CompletionCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_completion_cache(settings: NormalizationSettings) -> Optional[CompletionCache]:
+    """Process-wide cache matching ``settings``; None when caching is disabled."""
+    if not settings.completion_cache_enabled:
+        return None
+    key = (
+        settings.completion_cache_path,
+        settings.completion_cache_max_entries,
+        settings.completion_cache_max_disk_entries,
+        settings.completion_cache_ttl_seconds,
+    )
+    cache = _caches.get(key)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(key)
+            if cache is None:
+                cache = CompletionCache(
+                    settings.completion_cache_path,
+                    max_memory_entries=settings.completion_cache_max_entries,
+                    max_disk_entries=settings.completion_cache_max_disk_entries,
+                    ttl_seconds=settings.completion_cache_ttl_seconds,
+                )
+                _caches[key] = cache
+    return cache
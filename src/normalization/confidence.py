@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+
+# weight of each rule-engine signal in the completeness score (sums to 1.0)
+_WEIGHTS = {
+    "metric": 0.35,
+    "time": 0.25,
+    "intent": 0.2,
+    "complete": 0.2,
+}
+
+
+@dataclass(frozen=True)
+class DraftConfidence:
+    score: float
+    gaps: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class EnrichmentGateStats:
+    skipped: int
+    performed: int
+
+
+def score_draft(draft: Dict[str, Any]) -> DraftConfidence:
+    """
+    Rule-based completeness of a draft in [0, 1]: one metric hint, a resolved
+    time window, a known intent and no missing required fields each add
+    their weight; several competing metric hints count half.
+    """
+    score = 0.0
+    gaps = []
+
+    hints = draft.get("metric_hints")
+    if isinstance(hints, list) and len(hints) == 1:
+        score += _WEIGHTS["metric"]
+    elif isinstance(hints, list) and hints:
+        score += _WEIGHTS["metric"] / 2
+        gaps.append("ambiguous_metric")
+    else:
+        gaps.append("metric")
+
+    time_context = draft.get("time_context")
+    if isinstance(time_context, dict) and isinstance(time_context.get("resolved"), dict):
+        score += _WEIGHTS["time"]
+    else:
+        gaps.append("time")
+
+    query_context = draft.get("query_context")
+    intent = query_context.get("intent") if isinstance(query_context, dict) else None
+    if intent and intent != "out_of_scope":
+        score += _WEIGHTS["intent"]
+    else:
+        gaps.append("intent")
+
+    if draft.get("missing_required_fields") == []:
+        score += _WEIGHTS["complete"]
+    else:
+        gaps.append("missing_required_fields")
+
+    return DraftConfidence(score=round(score, 4), gaps=tuple(gaps))
+
+
+_lock = threading.Lock()
+_counts = {"skipped": 0, "performed": 0}
+
+
+def should_skip_enrichment(draft: Dict[str, Any], threshold: float) -> bool:
+    """True when the rule result alone is good enough; updates the skipped/performed counters."""
+    skip = score_draft(draft).score >= threshold
+    with _lock:
+        _counts["skipped" if skip else "performed"] += 1
+    return skip
+
+
+def enrichment_gate_stats() -> EnrichmentGateStats:
+    return EnrichmentGateStats(skipped=_counts["skipped"], performed=_counts["performed"])
+
+
+def reset_enrichment_gate_stats() -> None:
+    with _lock:
+        _counts["skipped"] = _counts["performed"] = 0
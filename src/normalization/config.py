@@ -1,17 +1,189 @@
 from __future__ import annotations
 
-ENABLE_LLM_COMPLETION = False
+import os
+import threading
+from dataclasses import dataclass
+from typing import Mapping, Optional
+
+ENABLE_LLM_COMPLETION = True
 LLM_COMPLETION_TIMEOUT_SECONDS = 5
 LLM_COMPLETION_ALLOWED_FIELDS = (
-    "intent",
+    "query_context",
     "time_context",
     "metric_hints",
-    "filter_hints",
     "missing_required_fields",
 )
 LLM_COMPLETION_PROTECTED_FIELDS = (
-    "raw_text",
+    "request_id",
     "request_context",
     "user_context",
+    "schema_version",
 )
 LLM_COMPLETION_MAX_ATTEMPTS = 1
+LLM_COMPLETION_MAX_CONCURRENCY = 64
+LLM_COMPLETION_DEADLINE_SECONDS = 0
+LLM_COMPLETION_MIN_ATTEMPT_SECONDS = 0.5
+LLM_COMPLETION_HEDGE_ENABLED = False
+LLM_COMPLETION_HEDGE_QUANTILE = 0.95
+LLM_COMPLETION_HEDGE_AFTER_SECONDS = 0
+LLM_CIRCUIT_BREAKER_ENABLED = True
+LLM_CIRCUIT_BREAKER_WINDOW = 20
+LLM_CIRCUIT_BREAKER_MIN_CALLS = 10
+LLM_CIRCUIT_BREAKER_FAILURE_RATE = 0.5
+LLM_CIRCUIT_BREAKER_OPEN_SECONDS = 30
+LLM_CIRCUIT_BREAKER_HALF_OPEN_PROBES = 1
+LLM_COMPLETION_SKIP_CONFIDENCE = 1.0
+LLM_COMPLETION_PROMPT_MODE = "full"
+LLM_COMPLETION_CACHE_ENABLED = False
+LLM_COMPLETION_CACHE_PATH = None
+LLM_COMPLETION_CACHE_TTL_SECONDS = 86_400
+LLM_COMPLETION_CACHE_MAX_ENTRIES = 1024
+LLM_COMPLETION_CACHE_MAX_DISK_ENTRIES = 100_000
+METRIC_HINT_RETRIEVAL_MODE = "keyword"
+NORMALIZATION_TRACE_SAMPLE_RATE = 1.0
+
+
+def _env_bool(env: Mapping[str, str], name: str, default: bool) -> bool:
+    raw = env.get(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _env_int(env: Mapping[str, str], name: str, default: int) -> int:
+    raw = env.get(name)
+    if raw is None:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        return default
+
+
+def _env_float(env: Mapping[str, str], name: str, default: float) -> float:
+    raw = env.get(name)
+    if raw is None:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        return default
+
+
+def _env_csv(env: Mapping[str, str], name: str, default: tuple[str, ...]) -> tuple[str, ...]:
+    raw = env.get(name)
+    if raw is None:
+        return default
+    parts = tuple(item.strip() for item in raw.split(",") if item.strip())
+    return parts or default
+
+
+def _env_str(env: Mapping[str, str], name: str, default: str) -> str:
+    raw = env.get(name)
+    if raw is None or not raw.strip():
+        return default
+    return raw.strip()
+
+
+@dataclass(frozen=True)
+class NormalizationSettings:
+    """
+    Immutable snapshot of normalization settings.
+    Module constants above are the defaults; environment variables override them.
+    """
+
+    completion_enabled: bool = ENABLE_LLM_COMPLETION
+    completion_timeout_seconds: float = LLM_COMPLETION_TIMEOUT_SECONDS
+    completion_allowed_fields: tuple[str, ...] = LLM_COMPLETION_ALLOWED_FIELDS
+    completion_protected_fields: tuple[str, ...] = LLM_COMPLETION_PROTECTED_FIELDS
+    completion_max_attempts: int = LLM_COMPLETION_MAX_ATTEMPTS
+    completion_max_concurrency: int = LLM_COMPLETION_MAX_CONCURRENCY
+    # end-to-end budget when request_context carries no deadline; 0 means none
+    completion_deadline_seconds: float = LLM_COMPLETION_DEADLINE_SECONDS
+    # no new attempt starts with less budget than this left
+    completion_min_attempt_seconds: float = LLM_COMPLETION_MIN_ATTEMPT_SECONDS
+    # hedging: a second request once a call outlives the model's observed quantile latency
+    # (or hedge_after_seconds until enough samples exist; 0 waits for samples)
+    completion_hedge_enabled: bool = LLM_COMPLETION_HEDGE_ENABLED
+    completion_hedge_quantile: float = LLM_COMPLETION_HEDGE_QUANTILE
+    completion_hedge_after_seconds: float = LLM_COMPLETION_HEDGE_AFTER_SECONDS
+    # per-model breaker: while open, enrichment is skipped and the rule-engine draft is returned
+    breaker_enabled: bool = LLM_CIRCUIT_BREAKER_ENABLED
+    breaker_window: int = LLM_CIRCUIT_BREAKER_WINDOW
+    breaker_min_calls: int = LLM_CIRCUIT_BREAKER_MIN_CALLS
+    breaker_failure_rate: float = LLM_CIRCUIT_BREAKER_FAILURE_RATE
+    breaker_open_seconds: float = LLM_CIRCUIT_BREAKER_OPEN_SECONDS
+    breaker_half_open_probes: int = LLM_CIRCUIT_BREAKER_HALF_OPEN_PROBES
+    # drafts scoring at least this much skip the LLM; > 1 disables the gate
+    completion_skip_confidence: float = LLM_COMPLETION_SKIP_CONFIDENCE
+    completion_prompt_mode: str = LLM_COMPLETION_PROMPT_MODE
+    completion_cache_enabled: bool = LLM_COMPLETION_CACHE_ENABLED
+    completion_cache_path: Optional[str] = LLM_COMPLETION_CACHE_PATH
+    completion_cache_ttl_seconds: float = LLM_COMPLETION_CACHE_TTL_SECONDS
+    completion_cache_max_entries: int = LLM_COMPLETION_CACHE_MAX_ENTRIES
+    completion_cache_max_disk_entries: int = LLM_COMPLETION_CACHE_MAX_DISK_ENTRIES
+    metric_hint_mode: str = METRIC_HINT_RETRIEVAL_MODE
+    # share of requests traced when a trace sink is installed (see tracing.set_trace_sink)
+    trace_sample_rate: float = NORMALIZATION_TRACE_SAMPLE_RATE
+
+
+def load_settings(environ: Optional[Mapping[str, str]] = None) -> NormalizationSettings:
+    """Build a fresh settings snapshot from ``environ`` (defaults to ``os.environ``)."""
+    env = os.environ if environ is None else environ
+    return NormalizationSettings(
+        completion_enabled=_env_bool(env, "ENABLE_LLM_COMPLETION", ENABLE_LLM_COMPLETION),
+        completion_timeout_seconds=_env_float(env, "LLM_COMPLETION_TIMEOUT_SECONDS", LLM_COMPLETION_TIMEOUT_SECONDS),
+        completion_allowed_fields=_env_csv(env, "LLM_COMPLETION_ALLOWED_FIELDS", LLM_COMPLETION_ALLOWED_FIELDS),
+        completion_protected_fields=_env_csv(env, "LLM_COMPLETION_PROTECTED_FIELDS", LLM_COMPLETION_PROTECTED_FIELDS),
+        completion_max_attempts=max(1, min(_env_int(env, "LLM_COMPLETION_MAX_ATTEMPTS", LLM_COMPLETION_MAX_ATTEMPTS), 2)),
+        completion_max_concurrency=max(1, _env_int(env, "LLM_COMPLETION_MAX_CONCURRENCY", LLM_COMPLETION_MAX_CONCURRENCY)),
+        completion_deadline_seconds=_env_float(env, "LLM_COMPLETION_DEADLINE_SECONDS", LLM_COMPLETION_DEADLINE_SECONDS),
+        completion_min_attempt_seconds=_env_float(
+            env, "LLM_COMPLETION_MIN_ATTEMPT_SECONDS", LLM_COMPLETION_MIN_ATTEMPT_SECONDS
+        ),
+        completion_hedge_enabled=_env_bool(env, "LLM_COMPLETION_HEDGE_ENABLED", LLM_COMPLETION_HEDGE_ENABLED),
+        completion_hedge_quantile=_env_float(env, "LLM_COMPLETION_HEDGE_QUANTILE", LLM_COMPLETION_HEDGE_QUANTILE),
+        completion_hedge_after_seconds=_env_float(
+            env, "LLM_COMPLETION_HEDGE_AFTER_SECONDS", LLM_COMPLETION_HEDGE_AFTER_SECONDS
+        ),
+        breaker_enabled=_env_bool(env, "LLM_CIRCUIT_BREAKER_ENABLED", LLM_CIRCUIT_BREAKER_ENABLED),
+        breaker_window=max(1, _env_int(env, "LLM_CIRCUIT_BREAKER_WINDOW", LLM_CIRCUIT_BREAKER_WINDOW)),
+        breaker_min_calls=max(1, _env_int(env, "LLM_CIRCUIT_BREAKER_MIN_CALLS", LLM_CIRCUIT_BREAKER_MIN_CALLS)),
+        breaker_failure_rate=_env_float(env, "LLM_CIRCUIT_BREAKER_FAILURE_RATE", LLM_CIRCUIT_BREAKER_FAILURE_RATE),
+        breaker_open_seconds=_env_float(env, "LLM_CIRCUIT_BREAKER_OPEN_SECONDS", LLM_CIRCUIT_BREAKER_OPEN_SECONDS),
+        breaker_half_open_probes=max(
+            1, _env_int(env, "LLM_CIRCUIT_BREAKER_HALF_OPEN_PROBES", LLM_CIRCUIT_BREAKER_HALF_OPEN_PROBES)
+        ),
+        completion_skip_confidence=_env_float(env, "LLM_COMPLETION_SKIP_CONFIDENCE", LLM_COMPLETION_SKIP_CONFIDENCE),
+        completion_prompt_mode=_env_str(env, "LLM_COMPLETION_PROMPT_MODE", LLM_COMPLETION_PROMPT_MODE),
+        completion_cache_enabled=_env_bool(env, "LLM_COMPLETION_CACHE_ENABLED", LLM_COMPLETION_CACHE_ENABLED),
+        completion_cache_path=env.get("LLM_COMPLETION_CACHE_PATH") or LLM_COMPLETION_CACHE_PATH,
+        completion_cache_ttl_seconds=_env_float(env, "LLM_COMPLETION_CACHE_TTL_SECONDS", LLM_COMPLETION_CACHE_TTL_SECONDS),
+        completion_cache_max_entries=_env_int(env, "LLM_COMPLETION_CACHE_MAX_ENTRIES", LLM_COMPLETION_CACHE_MAX_ENTRIES),
+        completion_cache_max_disk_entries=_env_int(
+            env, "LLM_COMPLETION_CACHE_MAX_DISK_ENTRIES", LLM_COMPLETION_CACHE_MAX_DISK_ENTRIES
+        ),
+        metric_hint_mode=_env_str(env, "METRIC_HINT_RETRIEVAL_MODE", METRIC_HINT_RETRIEVAL_MODE),
+        trace_sample_rate=_env_float(env, "NORMALIZATION_TRACE_SAMPLE_RATE", NORMALIZATION_TRACE_SAMPLE_RATE),
+    )
+
+
+_settings: Optional[NormalizationSettings] = None
+_settings_lock = threading.Lock()
+
+
+def get_settings() -> NormalizationSettings:
+    """Process-wide snapshot, loaded on first use; call ``reload_settings`` after env changes."""
+    global _settings
+    if _settings is None:
+        with _settings_lock:
+            if _settings is None:
+                _settings = load_settings()
+    return _settings
+
+
+def reload_settings(environ: Optional[Mapping[str, str]] = None) -> NormalizationSettings:
+    global _settings
+    with _settings_lock:
+        _settings = load_settings(environ)
+    return _settings
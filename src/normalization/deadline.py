@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Deque, Dict, Mapping, Optional, Set
+
+from .metrics import incr
+
+if TYPE_CHECKING:
+    import asyncio
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+@dataclass(frozen=True)
+class Deadline:
+    """Absolute point on the monotonic clock by which a request must finish."""
+
+    expires_at: float
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + seconds)
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    @classmethod
+    def from_request_context(
+        cls, request_context: Mapping[str, Any], default_seconds: float = 0
+    ) -> Optional["Deadline"]:
+        """
+        ``deadline_ms`` (budget from now) or ``deadline`` (epoch seconds or ISO-8601
+        datetime) from the request; otherwise ``default_seconds`` when > 0.
+        """
+        budget_ms = request_context.get("deadline_ms")
+        if isinstance(budget_ms, (int, float)) and not isinstance(budget_ms, bool):
+            return cls.after(budget_ms / 1000)
+
+        absolute = request_context.get("deadline")
+        epoch: Optional[float] = None
+        if isinstance(absolute, (int, float)) and not isinstance(absolute, bool):
+            epoch = float(absolute)
+        elif isinstance(absolute, str):
+            try:
+                epoch = datetime.fromisoformat(absolute).timestamp()
+            except ValueError:
+                epoch = None
+        if epoch is not None:
+            return cls.after(epoch - time.time())
+
+        return cls.after(default_seconds) if default_seconds > 0 else None
+
+
+class LatencyTracker:
+    """Recent successful call latencies per model, for hedging thresholds."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, model_id: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(model_id, deque(maxlen=self.window)).append(seconds)
+
+    def quantile(self, model_id: str, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(model_id, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def _start(fn: Callable[[], str]) -> Future:
+    # a daemon thread per call: Python threads cannot be killed, so a stalled call is
+    # abandoned rather than cancelled, and must not hold up interpreter exit the way
+    # ThreadPoolExecutor workers would
+    future: Future = Future()
+
+    def run() -> None:
+        try:
+            future.set_result(fn())
+        except BaseException as exc:
+            future.set_exception(exc)
+
+    threading.Thread(target=run, name="llm-call", daemon=True).start()
+    return future
+
+
+def call_with_deadline(fn: Callable[[], str], timeout: float, hedge_after: Optional[float] = None) -> str:
+    """
+    Run ``fn`` in a worker thread and wait at most ``timeout`` seconds. With
+    ``hedge_after``, a second identical call starts if the first is still
+    running by then; the first successful result wins.
+    """
+    start = time.monotonic()
+    stop_at = start + timeout
+    hedge_at = start + hedge_after if hedge_after is not None and hedge_after < timeout else None
+    primary = _start(fn)
+    pending: Set[Future] = {primary}
+    last_error: Optional[BaseException] = None
+
+    while pending:
+        now = time.monotonic()
+        if now >= stop_at:
+            break
+        wake_at = min(stop_at, hedge_at) if hedge_at is not None else stop_at
+        done, pending = wait(pending, timeout=wake_at - now, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is not primary:
+                    incr("enrich.hedge_won")
+                return future.result()
+            last_error = future.exception()
+        if hedge_at is not None and pending and time.monotonic() >= hedge_at:
+            incr("enrich.hedged")
+            pending.add(_start(fn))
+            hedge_at = None
+
+    if last_error is not None and not pending:
+        raise last_error
+    raise DeadlineExceeded(f"LLM call exceeded {timeout:.3f}s")
+
+
+async def acall_with_deadline(
+    make_call: Callable[[], Awaitable[str]], timeout: float, hedge_after: Optional[float] = None
+) -> str:
+    """Async ``call_with_deadline``; late and losing calls are cancelled rather than abandoned."""
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    stop_at = start + timeout
+    hedge_at = start + hedge_after if hedge_after is not None and hedge_after < timeout else None
+    primary = asyncio.ensure_future(make_call())
+    pending: Set["asyncio.Future[str]"] = {primary}
+    last_error: Optional[BaseException] = None
+
+    try:
+        while pending:
+            now = loop.time()
+            if now >= stop_at:
+                break
+            wake_at = min(stop_at, hedge_at) if hedge_at is not None else stop_at
+            done, pending = await asyncio.wait(pending, timeout=wake_at - now, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.cancelled():
+                    continue
+                if task.exception() is None:
+                    if task is not primary:
+                        incr("enrich.hedge_won")
+                    return task.result()
+                last_error = task.exception()
+            if hedge_at is not None and pending and loop.time() >= hedge_at:
+                incr("enrich.hedged")
+                pending.add(asyncio.ensure_future(make_call()))
+                hedge_at = None
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if last_error is not None and not pending:
+        raise last_error
+    raise DeadlineExceeded(f"LLM call exceeded {timeout:.3f}s")
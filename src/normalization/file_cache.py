@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Generic, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class FileCacheStats:
+    hits: int
+    misses: int
+    reloads: int
+    entries: int
+
+
+@dataclass
+class _Entry(Generic[T]):
+    stamp: Tuple[int, int]
+    digest: str
+    value: T
+
+
+class CompiledFileCache(Generic[T]):
+    """
+    Process-wide cache of objects compiled from files on disk.
+
+    Each lookup costs one ``stat``; the file is only re-read when its
+    mtime/size changes, and only recompiled when its content hash changes.
+    """
+
+    def __init__(self, compile_fn: Callable[[Path, str, str], T]):
+        self._compile_fn = compile_fn
+        self._entries: Dict[str, _Entry[T]] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._reloads = 0
+
+    def get(self, path: str | Path) -> T:
+        resolved = os.path.abspath(path)
+        st = os.stat(resolved)
+        stamp = (st.st_mtime_ns, st.st_size)
+
+        entry = self._entries.get(resolved)
+        if entry is not None and entry.stamp == stamp:
+            # the lookup stays lock-free; only the counter update needs the lock
+            with self._lock:
+                self._hits += 1
+            return entry.value
+
+        with self._lock:
+            entry = self._entries.get(resolved)
+            if entry is not None and entry.stamp == stamp:
+                self._hits += 1
+                return entry.value
+
+            raw = Path(resolved).read_bytes()
+            digest = hashlib.sha256(raw).hexdigest()
+            if entry is not None and entry.digest == digest:
+                # touched but unchanged: keep the compiled value
+                entry.stamp = stamp
+                self._hits += 1
+                return entry.value
+
+            value = self._compile_fn(Path(resolved), raw.decode("utf-8"), digest)
+            if entry is None:
+                self._misses += 1
+            else:
+                self._reloads += 1
+            self._entries[resolved] = _Entry(stamp=stamp, digest=digest, value=value)
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._reloads = 0
+
+    def stats(self) -> FileCacheStats:
+        with self._lock:
+            return FileCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                reloads=self._reloads,
+                entries=len(self._entries),
+            )
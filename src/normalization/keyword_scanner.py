@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from .text_matcher import KeywordAutomaton
+
+SENSITIVE_TERMS = ["account_no", "full_name", "id_no", "phone", "email", "客戶明細", "帳戶明細", "明細"]
+
+# evaluated in this order; the first intent with a hit wins
+INTENT_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("detail_request", ("明細", "detail", "列出每個", "list all")),
+    ("trend", ("趨勢", "trend")),
+    ("comparison", ("比較", "vs", "對比", "同比", "環比")),
+    ("kpi_query", ("存款", "交易", "餘額", "kpi", "balance", "volume")),
+)
+
+RISK_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "sensitive": tuple(term.lower() for term in SENSITIVE_TERMS),
+    "account_detail": ("帳戶明細", "account detail", "account_id"),
+    "customer_detail": ("客戶明細", "customer detail", "customer_id"),
+    "total": ("總餘額", "總和", "total"),
+    "currency": ("mop", "hkd", "幣別", "currency"),
+}
+
+TEXT_REPLACEMENTS: Dict[str, str] = {
+    "期末餘額": "存款餘額",
+    "transaction volume": "交易量",
+}
+
+
+class KeywordScanner:
+    """
+    All rule keywords compiled into one automaton. ``scan`` walks the
+    (lower-cased) text once and returns the names of every keyword group
+    with at least one hit; intent and risk rules are derived from that set.
+    """
+
+    def __init__(self, groups: Iterable[Tuple[str, Iterable[str]]]):
+        keyword_groups: Dict[str, Set[str]] = {}
+        for group, keywords in groups:
+            for keyword in keywords:
+                keyword_groups.setdefault(keyword, set()).add(group)
+        self._automaton = KeywordAutomaton(keyword_groups)
+        self._groups: List[FrozenSet[str]] = [frozenset(keyword_groups[k]) for k in self._automaton.keywords]
+
+    def scan(self, lowered_text: str) -> FrozenSet[str]:
+        hits: Set[str] = set()
+        for kw_id in self._automaton.matches(lowered_text):
+            hits |= self._groups[kw_id]
+        return frozenset(hits)
+
+
+SCANNER = KeywordScanner(
+    [(f"intent:{intent}", keywords) for intent, keywords in INTENT_KEYWORDS]
+    + [(f"risk:{name}", keywords) for name, keywords in RISK_KEYWORDS.items()]
+)
+
+
+def scan_keywords(lowered_text: str) -> FrozenSet[str]:
+    return SCANNER.scan(lowered_text)
+
+
+# whitespace collapsing and term replacement in one regex pass; replacement
+# keys allow any whitespace run where they contain a space, matching
+# "collapse first, then replace"
+_NORMALIZE_RE = re.compile(
+    "|".join(
+        [re.escape(src).replace(r"\ ", r"\s+") for src in sorted(TEXT_REPLACEMENTS, key=len, reverse=True)]
+        + [r"\s+"]
+    )
+)
+_REPLACEMENT_LOOKUP = {re.sub(r"\s+", " ", src): dst for src, dst in TEXT_REPLACEMENTS.items()}
+
+
+def _replace_match(match: "re.Match[str]") -> str:
+    token = match.group(0)
+    if token.isspace():
+        return " "
+    return _REPLACEMENT_LOOKUP[re.sub(r"\s+", " ", token)]
+
+
+def normalize_text(raw_text: str) -> str:
+    return _NORMALIZE_RE.sub(_replace_match, raw_text.strip())
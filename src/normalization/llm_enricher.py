@@ -1,75 +1,157 @@
 from __future__ import annotations
 
+import inspect
 import json
-import os
+import time
+import weakref
 from copy import deepcopy
-from typing import Any, Dict, Iterable, Optional
-
-from .llm_prompt import build_json_completion_prompt
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Tuple
+
+from .circuit_breaker import CircuitBreaker, CircuitBreakerRegistry
+from .completion_cache import CompletionCache, completion_cache_key, get_completion_cache
+from .confidence import should_skip_enrichment
+from .config import NormalizationSettings, get_settings
+from .deadline import Deadline, DeadlineExceeded, LatencyTracker, acall_with_deadline, call_with_deadline
+from .metrics import incr, timed
+from .llm_prompt import PromptSize, build_compact_completion_prompt, build_json_completion_prompt, measure_prompt
 from .validator import validate_normalized_request
 
-
-def _record_enrichment_failure(_reason: str) -> None:
-    """Hook for logging/metrics; intentionally no-op by default."""
+# asyncio is only needed once an event loop is running; importing it lazily keeps
+# sync-only users (CLI, batch workers) from paying for it at startup
+if TYPE_CHECKING:
+    import asyncio
 
 
-def _env_bool(name: str, default: bool) -> bool:
-    raw = os.getenv(name)
-    if raw is None:
-        return default
-    return raw.strip().lower() in {"1", "true", "yes", "on"}
+def _record_enrichment_failure(reason: str) -> None:
+    """Hook for logging/metrics; counts into the active metrics sink (no-op by default)."""
+    incr(f"enrich.failure.{reason}")
 
 
-def _env_int(name: str, default: int) -> int:
-    raw = os.getenv(name)
-    if raw is None:
-        return default
-    try:
-        return int(raw)
-    except ValueError:
-        return default
+_prompt_totals = {"prompts": 0, "chars": 0, "estimated_tokens": 0}
 
 
-def _env_csv(name: str, default: tuple[str, ...]) -> tuple[str, ...]:
-    raw = os.getenv(name)
-    if raw is None:
-        return default
-    parts = tuple(item.strip() for item in raw.split(",") if item.strip())
-    return parts or default
+def _record_prompt_size(mode: str, size: PromptSize) -> None:
+    """Hook for logging/metrics; keeps running totals for prompt_size_stats()."""
+    _prompt_totals["prompts"] += 1
+    _prompt_totals["chars"] += size.chars
+    _prompt_totals["estimated_tokens"] += size.estimated_tokens
+    incr(f"enrich.prompt_tokens.{mode}", size.estimated_tokens)
 
 
-def _completion_enabled() -> bool:
-    return _env_bool("ENABLE_LLM_COMPLETION", True)
+def prompt_size_stats() -> Dict[str, float]:
+    """Prompt count plus total and mean chars/estimated tokens sent to the LLM."""
+    count = _prompt_totals["prompts"]
+    return {
+        **_prompt_totals,
+        "mean_chars": _prompt_totals["chars"] / count if count else 0.0,
+        "mean_estimated_tokens": _prompt_totals["estimated_tokens"] / count if count else 0.0,
+    }
 
 
-def _completion_timeout_seconds() -> int:
-    return _env_int("LLM_COMPLETION_TIMEOUT_SECONDS", 5)
+def _call_llm(llm_client: Any, prompt: str, timeout_seconds: float) -> str:
+    if callable(llm_client):
+        return llm_client(prompt, timeout=timeout_seconds)
+    if hasattr(llm_client, "complete"):
+        return llm_client.complete(prompt=prompt, timeout=timeout_seconds)
+    raise TypeError("Unsupported llm_client interface")
 
 
-def _completion_allowed_fields() -> tuple[str, ...]:
-    return _env_csv(
-        "LLM_COMPLETION_ALLOWED_FIELDS",
-        ("query_context", "time_context", "metric_hints", "filter_hints", "missing_required_fields"),
+def _is_async_client(llm_client: Any) -> bool:
+    if hasattr(llm_client, "acomplete"):
+        return True
+    return inspect.iscoroutinefunction(llm_client) or inspect.iscoroutinefunction(
+        getattr(llm_client, "__call__", None)
     )
 
 
-def _completion_protected_fields() -> tuple[str, ...]:
-    return _env_csv(
-        "LLM_COMPLETION_PROTECTED_FIELDS",
-        ("request_id", "request_context", "user_context", "schema_version"),
+async def _acall_llm(llm_client: Any, prompt: str, timeout_seconds: float) -> str:
+    """Await an async client (``acomplete`` or coroutine callable); sync clients run in a thread."""
+    import asyncio
+
+    if hasattr(llm_client, "acomplete"):
+        return await llm_client.acomplete(prompt=prompt, timeout=timeout_seconds)
+    if _is_async_client(llm_client):
+        return await llm_client(prompt, timeout=timeout_seconds)
+    return await asyncio.to_thread(_call_llm, llm_client, prompt, timeout_seconds)
+
+
+# successful call latencies per model id; drives the hedging threshold
+_latencies = LatencyTracker()
+
+
+def _attempt_budget(settings: NormalizationSettings, deadline: Optional[Deadline]) -> Optional[float]:
+    """Timeout for the next attempt, or None when the deadline leaves too little to start one."""
+    if deadline is None:
+        return settings.completion_timeout_seconds
+    remaining = deadline.remaining()
+    if remaining < settings.completion_min_attempt_seconds:
+        return None
+    return min(settings.completion_timeout_seconds, remaining)
+
+
+# one breaker per model id; see config.breaker_*
+_breakers = CircuitBreakerRegistry()
+
+
+def _breaker_for(llm_client: Any, settings: NormalizationSettings) -> Optional[CircuitBreaker]:
+    if not settings.breaker_enabled:
+        return None
+    return _breakers.get(
+        _client_model_id(llm_client),
+        window=settings.breaker_window,
+        min_calls=settings.breaker_min_calls,
+        failure_rate=settings.breaker_failure_rate,
+        open_seconds=settings.breaker_open_seconds,
+        half_open_probes=settings.breaker_half_open_probes,
     )
 
 
-def _completion_max_attempts() -> int:
-    return max(1, min(_env_int("LLM_COMPLETION_MAX_ATTEMPTS", 1), 2))
+def _record_call_failure(breaker: Optional[CircuitBreaker], reason: str) -> None:
+    _record_enrichment_failure(reason)
+    if breaker is not None:
+        breaker.record_failure()
 
 
-def _call_llm(llm_client: Any, prompt: str, timeout_seconds: int) -> str:
-    if callable(llm_client):
-        return llm_client(prompt, timeout=timeout_seconds)
-    if hasattr(llm_client, "complete"):
-        return llm_client.complete(prompt=prompt, timeout=timeout_seconds)
-    raise TypeError("Unsupported llm_client interface")
+def _record_call_timeout(breaker: Optional[CircuitBreaker], budget: float, settings: NormalizationSettings) -> None:
+    _record_enrichment_failure("llm_timeout")
+    if breaker is None:
+        return
+    if budget >= settings.completion_timeout_seconds:
+        breaker.record_failure()
+    else:
+        # cut short by the caller's deadline, which says nothing about the provider
+        breaker.release()
+
+
+def _record_call_success(breaker: Optional[CircuitBreaker], llm_client: Any, seconds: float) -> None:
+    # the breaker tracks provider health, so any response counts, even one that later fails to parse
+    _latencies.record(_client_model_id(llm_client), seconds)
+    if breaker is not None:
+        breaker.record_success()
+
+
+def circuit_states() -> Dict[str, str]:
+    """Current breaker state (closed/open/half_open) per model id."""
+    return _breakers.states()
+
+
+def _hedge_after(llm_client: Any, settings: NormalizationSettings) -> Optional[float]:
+    if not settings.completion_hedge_enabled:
+        return None
+    threshold = _latencies.quantile(_client_model_id(llm_client), settings.completion_hedge_quantile)
+    if threshold is None and settings.completion_hedge_after_seconds > 0:
+        threshold = settings.completion_hedge_after_seconds
+    return threshold
+
+
+def _merge_delta(current: Any, delta: Any) -> Any:
+    if isinstance(current, dict) and isinstance(delta, dict):
+        merged = dict(current)
+        for key, value in delta.items():
+            merged[key] = _merge_delta(current.get(key), value)
+        return merged
+    return delta
 
 
 def _enforce_allowed_and_protected(
@@ -77,12 +159,14 @@ def _enforce_allowed_and_protected(
     completed: Dict[str, Any],
     allowed_fields: Iterable[str],
     protected_fields: Iterable[str],
+    merge_objects: bool = False,
 ) -> Dict[str, Any]:
     result = deepcopy(original)
     allowed = set(allowed_fields)
     for field in allowed:
         if field in completed:
-            result[field] = completed[field]
+            # compact replies are deltas: a partial object keeps the draft's other keys
+            result[field] = _merge_delta(result.get(field), completed[field]) if merge_objects else completed[field]
 
     for field in protected_fields:
         if field in original:
@@ -91,56 +175,258 @@ def _enforce_allowed_and_protected(
     return result
 
 
+def _prompt_draft(original: Dict[str, Any], protected_fields: Iterable[str]) -> Dict[str, Any]:
+    # per-request values of protected fields are restored after completion anyway;
+    # leaving them out makes identical questions produce identical prompts
+    protected = set(protected_fields)
+    draft = dict(original)
+    if "request_id" in protected:
+        draft.pop("request_id", None)
+    if "request_context" in protected and isinstance(draft.get("request_context"), dict):
+        draft["request_context"] = {k: v for k, v in draft["request_context"].items() if k != "request_ts"}
+    return draft
+
+
+def _client_model_id(llm_client: Any) -> str:
+    return str(getattr(llm_client, "model_id", "") or "")
+
+
+def _prompt_for(original: Dict[str, Any], time_resolved, risk_flags, settings: NormalizationSettings) -> str:
+    with timed("enrich.prompt_build"):
+        if settings.completion_prompt_mode == "compact":
+            prompt = build_compact_completion_prompt(
+                draft=original,
+                time_resolved=time_resolved,
+                risk_flags=risk_flags,
+                allowed_fields=settings.completion_allowed_fields,
+            )
+        else:
+            prompt = build_json_completion_prompt(
+                draft=_prompt_draft(original, settings.completion_protected_fields),
+                time_resolved=time_resolved,
+                risk_flags=risk_flags,
+                allowed_fields=settings.completion_allowed_fields,
+                protected_fields=settings.completion_protected_fields,
+            )
+    _record_prompt_size(settings.completion_prompt_mode, measure_prompt(prompt))
+    return prompt
+
+
+def _parse_completed(raw_response: str) -> Tuple[Optional[Dict[str, Any]], str]:
+    """Return ``(completed, "")`` or ``(None, failure_reason)``."""
+    try:
+        completed = json.loads(raw_response).get("completed")
+    except Exception:
+        return None, "llm_or_parse_failure"
+    if not isinstance(completed, dict):
+        return None, "missing_completed"
+    return completed, ""
+
+
+def _apply_response(
+    original: Dict[str, Any],
+    raw_response: str,
+    settings: NormalizationSettings,
+) -> Optional[Dict[str, Any]]:
+    """Parse one LLM response and merge it; returns None (after recording why) when unusable."""
+    with timed("enrich.parse"):
+        completed, failure = _parse_completed(raw_response)
+        if completed is not None:
+            enforced = _enforce_allowed_and_protected(
+                original=original,
+                completed=completed,
+                allowed_fields=settings.completion_allowed_fields,
+                protected_fields=settings.completion_protected_fields,
+                merge_objects=settings.completion_prompt_mode == "compact",
+            )
+    if completed is None:
+        _record_enrichment_failure(failure)
+        return None
+
+    with timed("enrich.validation"):
+        try:
+            ok, _ = validate_normalized_request(enforced)
+        except Exception:
+            ok = False
+
+    if ok:
+        return enforced
+
+    _record_enrichment_failure("schema_validation_failure")
+    return None
+
+
+def _from_cache(
+    cache: Optional[CompletionCache],
+    original: Dict[str, Any],
+    prompt: str,
+    llm_client: Any,
+    settings: NormalizationSettings,
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    if cache is None:
+        return "", None
+    key = completion_cache_key(prompt, _client_model_id(llm_client))
+    cached = cache.get(key)
+    if cached is None:
+        incr("enrich.cache_miss")
+        return key, None
+    incr("enrich.cache_hit")
+    return key, _apply_response(original, cached, settings)
+
+
 def enrich_draft(
     draft: Dict[str, Any],
     time_resolved: Optional[Dict[str, Any]],
     risk_flags: list[str],
     llm_client: Any,
+    settings: Optional[NormalizationSettings] = None,
+    cache: Optional[CompletionCache] = None,
+    deadline: Optional[Deadline] = None,
 ) -> Dict[str, Any]:
-    if not _completion_enabled() or llm_client is None:
+    """
+    Ask the LLM to fill the allowed fields of ``draft``. Each call is cut off
+    after ``completion_timeout_seconds`` or whatever is left of ``deadline``,
+    and retries only start while at least ``completion_min_attempt_seconds``
+    of the deadline remains.
+    """
+    settings = settings or get_settings()
+    if not settings.completion_enabled or llm_client is None:
+        return draft
+    if should_skip_enrichment(draft, settings.completion_skip_confidence):
+        incr("enrich.skipped_confident")
         return draft
 
     original = deepcopy(draft)
+    cache = cache or get_completion_cache(settings)
+    breaker = _breaker_for(llm_client, settings)
 
-    for _ in range(_completion_max_attempts()):
-        prompt = build_json_completion_prompt(
-            draft=original,
-            time_resolved=time_resolved,
-            risk_flags=risk_flags,
-            allowed_fields=_completion_allowed_fields(),
-            protected_fields=_completion_protected_fields(),
-        )
+    for _ in range(settings.completion_max_attempts):
+        prompt = _prompt_for(original, time_resolved, risk_flags, settings)
+        cache_key, enforced = _from_cache(cache, original, prompt, llm_client, settings)
+        if enforced is not None:
+            return enforced
+
+        budget = _attempt_budget(settings, deadline)
+        if budget is None:
+            _record_enrichment_failure("deadline_exhausted")
+            break
+        if breaker is not None and not breaker.allow():
+            incr("enrich.skipped_circuit_open")
+            break
 
+        started = time.monotonic()
         try:
-            raw_response = _call_llm(
-                llm_client=llm_client,
-                prompt=prompt,
-                timeout_seconds=_completion_timeout_seconds(),
-            )
-            response_json = json.loads(raw_response)
-            completed = response_json.get("completed")
-            if not isinstance(completed, dict):
-                _record_enrichment_failure("missing_completed")
-                continue
+            with timed("enrich.llm_call"):
+                raw_response = call_with_deadline(
+                    partial(_call_llm, llm_client, prompt, budget),
+                    budget,
+                    _hedge_after(llm_client, settings),
+                )
+        except DeadlineExceeded:
+            _record_call_timeout(breaker, budget, settings)
+            continue
         except Exception:
-            _record_enrichment_failure("llm_or_parse_failure")
+            _record_call_failure(breaker, "llm_or_parse_failure")
             continue
+        except BaseException:
+            if breaker is not None:
+                breaker.release()
+            raise
+        _record_call_success(breaker, llm_client, time.monotonic() - started)
+
+        enforced = _apply_response(original, raw_response, settings)
+        if enforced is not None:
+            if cache is not None:
+                cache.put(cache_key, raw_response)
+            return enforced
 
-        enforced = _enforce_allowed_and_protected(
-            original=original,
-            completed=completed,
-            allowed_fields=_completion_allowed_fields(),
-            protected_fields=_completion_protected_fields(),
-        )
+    return original
 
-        try:
-            ok, _ = validate_normalized_request(enforced)
-        except Exception:
-            ok = False
 
-        if ok:
+_loop_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _default_semaphore(settings: NormalizationSettings) -> asyncio.Semaphore:
+    import asyncio
+
+    # one cap per event loop; asyncio primitives cannot be shared across loops
+    loop = asyncio.get_running_loop()
+    semaphore = _loop_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(settings.completion_max_concurrency)
+        _loop_semaphores[loop] = semaphore
+    return semaphore
+
+
+async def aenrich_draft(
+    draft: Dict[str, Any],
+    time_resolved: Optional[Dict[str, Any]],
+    risk_flags: list[str],
+    llm_client: Any,
+    settings: Optional[NormalizationSettings] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    cache: Optional[CompletionCache] = None,
+    deadline: Optional[Deadline] = None,
+) -> Dict[str, Any]:
+    """
+    Async counterpart of ``enrich_draft``. LLM calls are bounded by ``semaphore``
+    (default: one per event loop sized by ``completion_max_concurrency``) and
+    cancelled after ``completion_timeout_seconds`` or when ``deadline`` passes.
+    """
+    settings = settings or get_settings()
+    if not settings.completion_enabled or llm_client is None:
+        return draft
+    if should_skip_enrichment(draft, settings.completion_skip_confidence):
+        incr("enrich.skipped_confident")
+        return draft
+
+    original = deepcopy(draft)
+    semaphore = semaphore or _default_semaphore(settings)
+    cache = cache or get_completion_cache(settings)
+    breaker = _breaker_for(llm_client, settings)
+
+    for _ in range(settings.completion_max_attempts):
+        prompt = _prompt_for(original, time_resolved, risk_flags, settings)
+        cache_key, enforced = _from_cache(cache, original, prompt, llm_client, settings)
+        if enforced is not None:
             return enforced
 
-        _record_enrichment_failure("schema_validation_failure")
+        reserved = False
+        try:
+            async with semaphore:
+                # budget is taken after the semaphore wait, which counts against the deadline
+                budget = _attempt_budget(settings, deadline)
+                if budget is None:
+                    _record_enrichment_failure("deadline_exhausted")
+                    break
+                if breaker is not None and not breaker.allow():
+                    incr("enrich.skipped_circuit_open")
+                    break
+                reserved = True
+                started = time.monotonic()
+                with timed("enrich.llm_call"):
+                    raw_response = await acall_with_deadline(
+                        partial(_acall_llm, llm_client, prompt, budget),
+                        budget,
+                        _hedge_after(llm_client, settings),
+                    )
+        except DeadlineExceeded:
+            _record_call_timeout(breaker, budget, settings)
+            continue
+        except Exception:
+            _record_call_failure(breaker, "llm_or_parse_failure")
+            continue
+        except BaseException:
+            # cancelled by the caller: no outcome to record, but a half-open probe slot to give back
+            if reserved and breaker is not None:
+                breaker.release()
+            raise
+        _record_call_success(breaker, llm_client, time.monotonic() - started)
+
+        enforced = _apply_response(original, raw_response, settings)
+        if enforced is not None:
+            if cache is not None:
+                cache.put(cache_key, raw_response)
+            return enforced
 
     return original
@@ -1,15 +1,40 @@
 from __future__ import annotations
 
 import json
+import re
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, Iterable, Optional
 
+from .file_cache import CompiledFileCache
 
 PROMPT_FILE = Path(__file__).resolve().parents[2] / "prompts" / "json_completion_prompt.md"
+COMPACT_PROMPT_FILE = Path(__file__).resolve().parents[2] / "prompts" / "json_completion_prompt_compact.md"
 
+PROMPT_MODES = ("full", "compact")
 
-def load_json_completion_prompt() -> str:
-    return PROMPT_FILE.read_text(encoding="utf-8")
+_TEMPLATE_CACHE: CompiledFileCache[str] = CompiledFileCache(lambda path, text, digest: text)
+_CJK_RE = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+
+
+@dataclass(frozen=True)
+class PromptSize:
+    chars: int
+    estimated_tokens: int
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: one per CJK character, one per four other characters."""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def measure_prompt(prompt: str) -> PromptSize:
+    return PromptSize(chars=len(prompt), estimated_tokens=estimate_tokens(prompt))
+
+
+def load_json_completion_prompt(compact: bool = False) -> str:
+    return _TEMPLATE_CACHE.get(COMPACT_PROMPT_FILE if compact else PROMPT_FILE)
 
 
 def build_json_completion_prompt(
@@ -28,3 +53,32 @@ def build_json_completion_prompt(
         "protected_fields": list(protected_fields),
     }
     return f"{template}\n\nInput JSON:\n{json.dumps(payload, ensure_ascii=False)}"
+
+
+def build_compact_completion_prompt(
+    draft: Dict[str, Any],
+    time_resolved: Optional[Dict[str, Any]],
+    risk_flags: Iterable[str],
+    allowed_fields: Iterable[str],
+) -> str:
+    """
+    Delta-style prompt: only the allowed fields and the query text are sent;
+    the model answers with the changed fields, which are merged back onto
+    the full draft by the enricher.
+    """
+    allowed = list(allowed_fields)
+    fields = {name: draft[name] for name in allowed if name in draft}
+    context: Dict[str, Any] = {}
+    query_context = draft.get("query_context")
+    if "query_context" not in fields and isinstance(query_context, dict):
+        context = {k: query_context[k] for k in ("normalized_text", "language", "intent") if k in query_context}
+
+    payload = {
+        "fields": fields,
+        "context": context,
+        "time_resolved": time_resolved,
+        "risk_flags": list(risk_flags),
+        "allowed_fields": allowed,
+    }
+    template = load_json_completion_prompt(compact=True)
+    return f"{template}\nInput JSON:\n{json.dumps(payload, ensure_ascii=False, separators=(',', ':'))}"
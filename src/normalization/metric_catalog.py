@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+from types import MappingProxyType
+from typing import Iterator, Mapping, Tuple
+
+from .file_cache import CompiledFileCache, FileCacheStats
+from .metric_hint_retriever import parse_metric_catalog
+from .metric_index import MetricHintIndex, MetricNgramIndex
+
+
+@dataclass(frozen=True)
+class CompiledMetricCatalog:
+    """
+    Immutable, parsed view of metrics.yaml shared by every request.
+    Behaves like a read-only sequence of metric mappings.
+    """
+
+    source_path: str
+    digest: str
+    metrics: Tuple[Mapping[str, object], ...]
+
+    def __iter__(self) -> Iterator[Mapping[str, object]]:
+        return iter(self.metrics)
+
+    def __len__(self) -> int:
+        return len(self.metrics)
+
+    def __getitem__(self, idx: int) -> Mapping[str, object]:
+        return self.metrics[idx]
+
+    @cached_property
+    def hint_index(self) -> MetricHintIndex:
+        return MetricHintIndex(self.metrics)
+
+    @cached_property
+    def ngram_index(self) -> MetricNgramIndex:
+        return MetricNgramIndex(self.metrics)
+
+
+def compile_metric_catalog(path: Path, text: str, digest: str) -> CompiledMetricCatalog:
+    metrics = []
+    for metric in parse_metric_catalog(text):
+        frozen = dict(metric)
+        frozen["aliases"] = tuple(metric.get("aliases", []))
+        metrics.append(MappingProxyType(frozen))
+    return CompiledMetricCatalog(source_path=str(path), digest=digest, metrics=tuple(metrics))
+
+
+_CATALOG_CACHE: CompiledFileCache[CompiledMetricCatalog] = CompiledFileCache(compile_metric_catalog)
+
+
+def get_metric_catalog(metrics_path: str = "semantic/metrics.yaml") -> CompiledMetricCatalog:
+    """Return the compiled catalog for ``metrics_path``; re-parses only when the file changes."""
+    return _CATALOG_CACHE.get(metrics_path)
+
+
+def catalog_cache_stats() -> FileCacheStats:
+    return _CATALOG_CACHE.stats()
+
+
+def clear_catalog_cache() -> None:
+    _CATALOG_CACHE.clear()
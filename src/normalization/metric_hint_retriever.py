@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import re
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+from .metric_index import MetricNgramIndex
 
 
 def _extract_quoted(line: str) -> str:
@@ -15,8 +17,11 @@ def load_metric_catalog(metrics_path: str = "semantic/metrics.yaml") -> List[Dic
     Lightweight parser for current metrics.yaml structure without external deps.
     Extracts metric key, concept_id, names, aliases, definition.
     """
-    path = Path(metrics_path)
-    lines = path.read_text(encoding="utf-8").splitlines()
+    return parse_metric_catalog(Path(metrics_path).read_text(encoding="utf-8"))
+
+
+def parse_metric_catalog(text: str) -> List[Dict[str, object]]:
+    lines = text.splitlines()
 
     catalog: List[Dict[str, object]] = []
     current: Dict[str, object] | None = None
@@ -74,7 +79,33 @@ def load_metric_catalog(metrics_path: str = "semantic/metrics.yaml") -> List[Dic
     return catalog
 
 
-def retrieve_metric_hints(normalized_text: str, catalog: List[Dict[str, object]], top_k: int = 3) -> List[str]:
+RETRIEVAL_MODES = ("keyword", "ngram")
+
+
+def retrieve_metric_hints(
+    normalized_text: str,
+    catalog: Sequence[Mapping[str, object]],
+    top_k: int = 3,
+    mode: str = "keyword",
+) -> List[str]:
+    """
+    mode="keyword": token/alias substring scoring (default).
+    mode="ngram": character n-gram TF-IDF cosine ranking, for spaceless queries.
+    """
+    if mode == "ngram":
+        ngram_index = getattr(catalog, "ngram_index", None) or MetricNgramIndex(catalog)
+        return ngram_index.search(normalized_text, top_k=top_k)
+    if mode != "keyword":
+        raise ValueError(f"Unsupported metric hint retrieval mode: {mode}")
+
+    # compiled catalogs carry a prebuilt index; plain lists fall back to the scan
+    index = getattr(catalog, "hint_index", None)
+    if index is not None:
+        return index.search(normalized_text, top_k=top_k)
+    return _scan_metric_hints(normalized_text, catalog, top_k=top_k)
+
+
+def _scan_metric_hints(normalized_text: str, catalog: Sequence[Mapping[str, object]], top_k: int = 3) -> List[str]:
     tokens = [t for t in re.split(r"\s+", normalized_text.lower()) if t]
     scored: List[Tuple[str, int]] = []
 
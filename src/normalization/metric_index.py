@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import math
+import re
+from typing import Dict, FrozenSet, List, Mapping, Sequence, Set, Tuple
+
+from .text_matcher import KeywordAutomaton
+
+_TOKEN_CACHE_LIMIT = 4096
+
+
+def _bigrams(text: str) -> Set[str]:
+    return {text[i : i + 2] for i in range(len(text) - 1)}
+
+
+class MetricHintIndex:
+    """
+    Prebuilt lookup structures for ``retrieve_metric_hints``.
+
+    - token scoring: character bigram postings over each metric's lower-cased
+      fields narrow the candidates, then ``token in field`` confirms them;
+    - alias bonus: one Aho-Corasick pass over the query finds every alias.
+
+    Scores and ordering are identical to the linear scan.
+    """
+
+    def __init__(self, catalog: Sequence[Mapping[str, object]]):
+        self._metric_ids: Tuple[str, ...] = tuple(str(m.get("metric_id")) for m in catalog)
+        self._fields: List[Tuple[str, ...]] = []
+        self._chars: Dict[str, Set[int]] = {}
+        self._grams: Dict[str, Set[int]] = {}
+        alias_metrics: Dict[str, Dict[int, int]] = {}
+
+        for idx, metric in enumerate(catalog):
+            fields = [
+                str(metric.get("name_zh", "")).lower(),
+                str(metric.get("name_en", "")).lower(),
+                str(metric.get("definition_zh", "")).lower(),
+            ] + [str(a).lower() for a in metric.get("aliases", [])]
+            fields = tuple(f for f in fields if f)
+            self._fields.append(fields)
+            for field in fields:
+                for ch in field:
+                    self._chars.setdefault(ch, set()).add(idx)
+                for gram in _bigrams(field):
+                    self._grams.setdefault(gram, set()).add(idx)
+
+            for alias in metric.get("aliases", []):
+                alias_l = str(alias).lower()
+                if alias_l:
+                    counts = alias_metrics.setdefault(alias_l, {})
+                    counts[idx] = counts.get(idx, 0) + 1
+
+        self._alias_automaton = KeywordAutomaton(alias_metrics.keys())
+        self._alias_hits: Tuple[Tuple[Tuple[int, int], ...], ...] = tuple(
+            tuple(alias_metrics[alias].items()) for alias in self._alias_automaton.keywords
+        )
+        self._token_cache: Dict[str, FrozenSet[int]] = {}
+
+    def _metrics_containing(self, token: str) -> FrozenSet[int]:
+        cached = self._token_cache.get(token)
+        if cached is not None:
+            return cached
+
+        if len(token) == 1:
+            found = frozenset(self._chars.get(token, ()))
+        else:
+            postings = []
+            for gram in _bigrams(token):
+                posting = self._grams.get(gram)
+                if not posting:
+                    postings = []
+                    break
+                postings.append(posting)
+            found = frozenset()
+            if postings:
+                postings.sort(key=len)
+                candidates = set(postings[0]).intersection(*postings[1:])
+                found = frozenset(
+                    idx for idx in candidates if any(token in field for field in self._fields[idx])
+                )
+
+        if len(self._token_cache) >= _TOKEN_CACHE_LIMIT:
+            self._token_cache.clear()
+        self._token_cache[token] = found
+        return found
+
+    def search(self, normalized_text: str, top_k: int = 3) -> List[str]:
+        lowered = normalized_text.lower()
+        scores: Dict[int, int] = {}
+
+        for token in re.split(r"\s+", lowered):
+            if token:
+                for idx in self._metrics_containing(token):
+                    scores[idx] = scores.get(idx, 0) + 1
+
+        for alias_id in self._alias_automaton.matches(lowered):
+            for idx, count in self._alias_hits[alias_id]:
+                scores[idx] = scores.get(idx, 0) + 2 * count
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [self._metric_ids[idx] for idx, _ in ranked[:top_k]]
+
+
+def _char_ngrams(text: str, sizes: Tuple[int, ...] = (2, 3)) -> Dict[str, int]:
+    """
+    Features for n-gram retrieval: character n-grams inside each CJK/symbol run
+    (no word boundaries needed) and whole words for latin runs, so English
+    text does not match on incidental letter pairs.
+    """
+    counts: Dict[str, int] = {}
+    for run in re.findall(r"[a-z0-9_]+|[^\sa-z0-9_]+", text.lower()):
+        if run.isascii():
+            counts[run] = counts.get(run, 0) + 1
+            continue
+        for n in sizes:
+            for i in range(len(run) - n + 1):
+                gram = run[i : i + n]
+                counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+class MetricNgramIndex:
+    """
+    Bigram/trigram TF-IDF vectors over name_zh/name_en/aliases/definition_zh.
+
+    Metric vectors are L2-normalised and stored column-wise (gram -> postings),
+    so scoring a query is one sparse matrix-vector product returning cosine
+    similarity. Works on spaceless Chinese queries without tokenisation.
+    """
+
+    def __init__(self, catalog: Sequence[Mapping[str, object]]):
+        self._metric_ids: Tuple[str, ...] = tuple(str(m.get("metric_id")) for m in catalog)
+        docs: List[Dict[str, int]] = []
+        df: Dict[str, int] = {}
+        for metric in catalog:
+            text = " ".join(
+                [
+                    str(metric.get("name_zh", "")),
+                    str(metric.get("name_en", "")),
+                    " ".join(str(a) for a in metric.get("aliases", [])),
+                    str(metric.get("definition_zh", "")),
+                ]
+            )
+            counts = _char_ngrams(text)
+            docs.append(counts)
+            for gram in counts:
+                df[gram] = df.get(gram, 0) + 1
+
+        n_docs = len(docs)
+        self._idf: Dict[str, float] = {gram: math.log((1 + n_docs) / (1 + d)) + 1.0 for gram, d in df.items()}
+        postings: Dict[str, List[Tuple[int, float]]] = {}
+        for idx, counts in enumerate(docs):
+            weights = {gram: (1.0 + math.log(tf)) * self._idf[gram] for gram, tf in counts.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for gram, weight in weights.items():
+                postings.setdefault(gram, []).append((idx, weight / norm))
+        self._postings: Dict[str, Tuple[Tuple[int, float], ...]] = {g: tuple(p) for g, p in postings.items()}
+
+    def scores(self, normalized_text: str) -> Dict[int, float]:
+        weights: Dict[str, float] = {}
+        for gram, tf in _char_ngrams(normalized_text).items():
+            idf = self._idf.get(gram)
+            if idf is not None:
+                weights[gram] = (1.0 + math.log(tf)) * idf
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        if not norm:
+            return {}
+
+        scores: Dict[int, float] = {}
+        for gram, weight in weights.items():
+            q = weight / norm
+            for idx, w in self._postings[gram]:
+                scores[idx] = scores.get(idx, 0.0) + q * w
+        return scores
+
+    def search(self, normalized_text: str, top_k: int = 3, min_score: float = 0.05) -> List[str]:
+        ranked = sorted(
+            ((idx, score) for idx, score in self.scores(normalized_text).items() if score >= min_score),
+            key=lambda item: (-item[1], item[0]),
+        )
+        return [self._metric_ids[idx] for idx, _ in ranked[:top_k]]
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Prometheus-style latency buckets (seconds)
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class NullMetrics:
+    """
+    Metrics interface. The default instance drops everything; ``enabled``
+    lets hot paths skip timing entirely.
+    """
+
+    enabled = False
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """Add ``value`` to counter ``name``."""
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record one latency sample for stage ``name``."""
+
+    def gauge(self, name: str, value: float) -> None:
+        """Set gauge ``name`` to ``value``."""
+
+
+class _Histogram:
+    __slots__ = ("bucket_counts", "count", "total", "recent")
+
+    def __init__(self, buckets: Tuple[float, ...], window: int):
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    rank = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[rank]
+
+
+class InProcessMetrics(NullMetrics):
+    """
+    Default exporter: counters plus per-stage latency histograms kept in
+    memory. Percentiles come from the last ``window`` samples of each stage;
+    bucket counts, sum and count cover the whole process lifetime.
+    """
+
+    enabled = True
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, window: int = 10_000, prefix: str = "smartbi"):
+        self.buckets = tuple(sorted(buckets))
+        self.window = window
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._histograms: Dict[str, _Histogram] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = _Histogram(self.buckets, self.window)
+            hist.bucket_counts[bisect_left(self.buckets, seconds)] += 1
+            hist.count += 1
+            hist.total += seconds
+            hist.recent.append(seconds)
+
+    def gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def counters(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._counters)
+
+    def gauges(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._gauges)
+
+    def stage_summary(self) -> Dict[str, Dict[str, float]]:
+        """``{stage: {count, mean, p50, p95, p99}}`` with latencies in seconds."""
+        with self._lock:
+            snapshot = {name: (h.count, h.total, sorted(h.recent)) for name, h in self._histograms.items()}
+        return {
+            name: {
+                "count": count,
+                "mean": total / count if count else 0.0,
+                "p50": _percentile(ordered, 0.50),
+                "p95": _percentile(ordered, 0.95),
+                "p99": _percentile(ordered, 0.99),
+            }
+            for name, (count, total, ordered) in sorted(snapshot.items())
+        }
+
+    def format_summary(self) -> str:
+        lines = [f"{'stage':<28} {'count':>8} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9}"]
+        for name, s in self.stage_summary().items():
+            lines.append(
+                f"{name:<28} {s['count']:>8} {s['p50'] * 1e3:>9.3f} {s['p95'] * 1e3:>9.3f} {s['p99'] * 1e3:>9.3f}"
+            )
+        return "\n".join(lines)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        counters_name = f"{self.prefix}_normalization_events_total"
+        gauges_name = f"{self.prefix}_normalization_state"
+        hist_name = f"{self.prefix}_normalization_stage_seconds"
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(
+                (name, list(h.bucket_counts), h.count, h.total) for name, h in self._histograms.items()
+            )
+
+        lines = [f"# TYPE {counters_name} counter"]
+        for name, value in counters:
+            lines.append(f'{counters_name}{{event="{name}"}} {value:g}')
+
+        if gauges:
+            lines.append(f"# TYPE {gauges_name} gauge")
+            for name, value in gauges:
+                lines.append(f'{gauges_name}{{name="{name}"}} {value:g}')
+
+        lines.append(f"# TYPE {hist_name} histogram")
+        for name, bucket_counts, count, total in histograms:
+            cumulative = 0
+            for bound, n in zip(self.buckets, bucket_counts):
+                cumulative += n
+                lines.append(f'{hist_name}_bucket{{stage="{name}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{hist_name}_bucket{{stage="{name}",le="+Inf"}} {count}')
+            lines.append(f'{hist_name}_sum{{stage="{name}"}} {total:.9f}')
+            lines.append(f'{hist_name}_count{{stage="{name}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+_metrics: NullMetrics = NullMetrics()
+
+
+def get_metrics() -> NullMetrics:
+    return _metrics
+
+
+def set_metrics(metrics: Optional[NullMetrics]) -> NullMetrics:
+    """Install the process-wide metrics sink (None restores the no-op default); returns the previous one."""
+    global _metrics
+    previous, _metrics = _metrics, metrics or NullMetrics()
+    return previous
+
+
+def enable_metrics(**kwargs) -> InProcessMetrics:
+    """Install and return a fresh ``InProcessMetrics``."""
+    metrics = InProcessMetrics(**kwargs)
+    set_metrics(metrics)
+    return metrics
+
+
+def incr(name: str, value: float = 1) -> None:
+    if _metrics.enabled:
+        _metrics.incr(name, value)
+
+
+def gauge(name: str, value: float) -> None:
+    if _metrics.enabled:
+        _metrics.gauge(name, value)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _StageTimer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics: NullMetrics, name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timed(stage: str):
+    """``with timed("build.time_parse"):`` records the block's latency; a shared no-op when disabled."""
+    metrics = _metrics
+    if not metrics.enabled:
+        return _NULL_TIMER
+    return _StageTimer(metrics, stage)
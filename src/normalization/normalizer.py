@@ -1,66 +1,65 @@
 from __future__ import annotations
 
-import json
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional
 
-from .llm_enricher import enrich_draft
+from .config import NormalizationSettings, get_settings
+from .deadline import Deadline
+from .llm_enricher import aenrich_draft, enrich_draft
+from .metrics import incr, timed
 from .rule_engine import build_normalized_request
+from .tracing import NormalizationTrace, start_trace
 from .validator import validate_normalized_request
-from .llm_enricher import enrich_draft
+
+if TYPE_CHECKING:
+    import asyncio
 
 
 class NormalizationError(Exception):
     pass
 
 
-def _to_pretty_json(payload: Any) -> str:
-    return json.dumps(payload, ensure_ascii=False, indent=2, sort_keys=True)
-
+def _enrich_inputs(built: Dict[str, object]) -> Dict[str, Any]:
+    time_context = built.get("time_context")
+    risk_context = built.get("risk_context")
+    return {
+        "time_resolved": time_context.get("resolved") if isinstance(time_context, dict) else None,
+        "risk_flags": risk_context.get("risk_flags", []) if isinstance(risk_context, dict) else [],
+    }
 
-def _diff_paths(before: Any, after: Any, prefix: str = "") -> list[str]:
-    if before == after:
-        return []
 
-    if isinstance(before, dict) and isinstance(after, dict):
-        paths: list[str] = []
-        keys = set(before.keys()) | set(after.keys())
-        for key in sorted(keys):
-            next_prefix = f"{prefix}.{key}" if prefix else str(key)
-            if key not in before:
-                paths.append(f"{next_prefix} (added)")
-                continue
-            if key not in after:
-                paths.append(f"{next_prefix} (removed)")
-                continue
-            paths.extend(_diff_paths(before[key], after[key], next_prefix))
-        return paths
+@contextmanager
+def _emitting(trace: Optional[NormalizationTrace]) -> Iterator[None]:
+    """Emit the trace however the request ends, so failed requests leave one too."""
+    try:
+        yield
+    except BaseException as exc:
+        if trace is not None:
+            trace.fail(exc)
+        raise
+    finally:
+        if trace is not None:
+            trace.finish()
 
-    if isinstance(before, list) and isinstance(after, list):
-        max_len = max(len(before), len(after))
-        paths: list[str] = []
-        for idx in range(max_len):
-            next_prefix = f"{prefix}[{idx}]" if prefix else f"[{idx}]"
-            if idx >= len(before):
-                paths.append(f"{next_prefix} (added)")
-                continue
-            if idx >= len(after):
-                paths.append(f"{next_prefix} (removed)")
-                continue
-            paths.extend(_diff_paths(before[idx], after[idx], next_prefix))
-        return paths
 
-    return [prefix or "<root>"]
+def _validate_stage(enriched: Dict[str, object], trace: Optional[NormalizationTrace]) -> Dict[str, object]:
+    if trace is not None:
+        trace.record("enrich_draft", enriched)
 
+    with timed("normalize.validate"):
+        ok, errors = validate_normalized_request(enriched)
 
-def _print_stage(stage: str, payload: Any) -> None:
-    print(f"[normalize_input] {stage} JSON:")
-    print(_to_pretty_json(payload))
+    if trace is not None:
+        trace.record("validate_normalized_request", {"ok": ok, "errors": errors, "validated": enriched})
+        if trace.sink is not None and trace.sink.retains_traces:
+            trace.detach(enriched)
 
+    if not ok:
+        incr("normalize.validation_failed")
+        raise NormalizationError("; ".join(errors))
 
-def _print_stage_diff(label: str, before: Any, after: Any) -> None:
-    paths = _diff_paths(before, after)
-    print(f"[normalize_input] {label} diff_paths: {paths if paths else ['<no_changes>']}")
+    return enriched
 
 
 def normalize_input(
@@ -72,40 +71,79 @@ def normalize_input(
     now: Optional[datetime] = None,
     llm_client=None,
     debug: bool = False,
+    metric_hint_mode: Optional[str] = None,
+    settings: Optional[NormalizationSettings] = None,
 ) -> Dict[str, object]:
-    built = build_normalized_request(
-        raw_text=raw_text,
-        user_context=user_context,
-        request_context=request_context,
-        metrics_path=metrics_path,
-        now=now,
-    )
-
-    if debug:
-        _print_stage("build_normalized_request", built)
-
-    enriched = enrich_draft(
-        draft=built,
-        time_resolved=built.get("time_context", {}).get("resolved") if isinstance(built.get("time_context"), dict) else None,
-        risk_flags=built.get("risk_context", {}).get("risk_flags", []) if isinstance(built.get("risk_context"), dict) else [],
-        llm_client=llm_client,
-    )
-
-    if debug:
-        _print_stage("enrich_draft", enriched)
-        _print_stage_diff("build -> enrich", built, enriched)
-
-    ok, errors = validate_normalized_request(enriched)
-
-    if debug:
-        validation_payload = {
-            "ok": ok,
-            "errors": errors,
-            "validated": enriched,
-        }
-        _print_stage("validate_normalized_request", validation_payload)
-
-    if not ok:
-        raise NormalizationError("; ".join(errors))
-
-    return enriched
+    settings = settings or get_settings()
+    deadline = Deadline.from_request_context(request_context, settings.completion_deadline_seconds)
+    incr("normalize.requests")
+    trace = start_trace(str(request_context.get("request_id", "")), settings.trace_sample_rate, debug)
+    with _emitting(trace):
+        with timed("normalize.build"):
+            built = build_normalized_request(
+                raw_text=raw_text,
+                user_context=user_context,
+                request_context=request_context,
+                metrics_path=metrics_path,
+                now=now,
+                metric_hint_mode=metric_hint_mode or settings.metric_hint_mode,
+            )
+
+        if trace is not None:
+            trace.record("build_normalized_request", built)
+
+        with timed("normalize.enrich"):
+            enriched = enrich_draft(
+                draft=built,
+                **_enrich_inputs(built),
+                llm_client=llm_client,
+                settings=settings,
+                deadline=deadline,
+            )
+
+        return _validate_stage(enriched, trace)
+
+
+async def anormalize_input(
+    raw_text: str,
+    user_context: Dict[str, object],
+    request_context: Dict[str, object],
+    *,
+    metrics_path: str = "semantic/metrics.yaml",
+    now: Optional[datetime] = None,
+    llm_client=None,
+    debug: bool = False,
+    metric_hint_mode: Optional[str] = None,
+    settings: Optional[NormalizationSettings] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> Dict[str, object]:
+    """Async ``normalize_input``: rule stage and validation run inline, the LLM call is awaited."""
+    settings = settings or get_settings()
+    deadline = Deadline.from_request_context(request_context, settings.completion_deadline_seconds)
+    incr("normalize.requests")
+    trace = start_trace(str(request_context.get("request_id", "")), settings.trace_sample_rate, debug)
+    with _emitting(trace):
+        with timed("normalize.build"):
+            built = build_normalized_request(
+                raw_text=raw_text,
+                user_context=user_context,
+                request_context=request_context,
+                metrics_path=metrics_path,
+                now=now,
+                metric_hint_mode=metric_hint_mode or settings.metric_hint_mode,
+            )
+
+        if trace is not None:
+            trace.record("build_normalized_request", built)
+
+        with timed("normalize.enrich"):
+            enriched = await aenrich_draft(
+                draft=built,
+                **_enrich_inputs(built),
+                llm_client=llm_client,
+                settings=settings,
+                deadline=deadline,
+                semaphore=semaphore,
+            )
+
+        return _validate_stage(enriched, trace)
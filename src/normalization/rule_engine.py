@@ -2,24 +2,18 @@ from __future__ import annotations
 
 import re
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, FrozenSet, List, Optional
 
-from .metric_hint_retriever import load_metric_catalog, retrieve_metric_hints
+from .keyword_scanner import SENSITIVE_TERMS  # noqa: F401  (re-exported)
+from .keyword_scanner import INTENT_KEYWORDS, normalize_text, scan_keywords
+from .metric_catalog import get_metric_catalog
+from .metric_hint_retriever import retrieve_metric_hints
+from .metrics import timed
 from .time_parser import parse_time_phrase
 
-SENSITIVE_TERMS = ["account_no", "full_name", "id_no", "phone", "email", "客戶明細", "帳戶明細", "明細"]
-
 
 def _normalize_text(raw_text: str) -> str:
-    text = raw_text.strip()
-    text = re.sub(r"\s+", " ", text)
-    replacements = {
-        "期末餘額": "存款餘額",
-        "transaction volume": "交易量",
-    }
-    for src, dst in replacements.items():
-        text = text.replace(src, dst)
-    return text
+    return normalize_text(raw_text)
 
 
 def _detect_language(text: str) -> str:
@@ -28,38 +22,37 @@ def _detect_language(text: str) -> str:
     return "en"
 
 
-def _detect_intent(text: str) -> str:
-    t = text.lower()
-    if any(k in t for k in ["明細", "detail", "列出每個", "list all"]):
-        return "detail_request"
-    if any(k in t for k in ["趨勢", "trend"]):
-        return "trend"
-    if any(k in t for k in ["比較", "vs", "對比", "同比", "環比"]):
-        return "comparison"
-    if any(k in t for k in ["存款", "交易", "餘額", "kpi", "balance", "volume"]):
-        return "kpi_query"
+def _detect_intent(text: str, hits: Optional[FrozenSet[str]] = None) -> str:
+    if hits is None:
+        hits = scan_keywords(text.lower())
+    for intent, _ in INTENT_KEYWORDS:
+        if f"intent:{intent}" in hits:
+            return intent
     return "out_of_scope"
 
 
-def _risk_flags(text: str, time_resolved: Optional[dict]) -> Dict[str, object]:
+def _risk_flags(
+    text: str,
+    time_resolved: Optional[dict],
+    hits: Optional[FrozenSet[str]] = None,
+) -> Dict[str, object]:
+    if hits is None:
+        hits = scan_keywords(text.lower())
     flags: List[str] = []
-    lowered = text.lower()
 
-    if any(term.lower() in lowered for term in SENSITIVE_TERMS):
+    if "risk:sensitive" in hits:
         flags.append("pii_requested")
 
-    if any(k in lowered for k in ["帳戶明細", "account detail", "account_id"]):
+    if "risk:account_detail" in hits:
         flags.append("account_level_detail_requested")
 
-    if any(k in lowered for k in ["客戶明細", "customer detail", "customer_id"]):
+    if "risk:customer_detail" in hits:
         flags.append("customer_level_detail_requested")
 
     if time_resolved is None:
         flags.append("missing_time_filter")
 
-    if any(k in lowered for k in ["總餘額", "總和", "total"]) and not any(
-        k in lowered for k in ["mop", "hkd", "幣別", "currency"]
-    ):
+    if "risk:total" in hits and "risk:currency" not in hits:
         flags.append("cross_currency_aggregation_risk")
 
     dedup = list(dict.fromkeys(flags))
@@ -75,17 +68,25 @@ def build_normalized_request(
     request_context: Dict[str, object],
     metrics_path: str = "semantic/metrics.yaml",
     now: Optional[datetime] = None,
+    metric_hint_mode: str = "keyword",
 ) -> Dict[str, object]:
-    normalized_text = _normalize_text(raw_text)
-    language = _detect_language(normalized_text)
-    intent = _detect_intent(normalized_text)
-
-    time_result = parse_time_phrase(normalized_text, now=now)
-
-    catalog = load_metric_catalog(metrics_path)
-    metric_hints = retrieve_metric_hints(normalized_text, catalog)
-
-    risk = _risk_flags(normalized_text, time_result.resolved)
+    with timed("build.text_rules"):
+        normalized_text = _normalize_text(raw_text)
+        language = _detect_language(normalized_text)
+        # one automaton pass feeds both intent and risk rules
+        hits = scan_keywords(normalized_text.lower())
+        intent = _detect_intent(normalized_text, hits)
+
+    with timed("build.time_parse"):
+        time_result = parse_time_phrase(normalized_text, now=now)
+
+    with timed("build.catalog_load"):
+        catalog = get_metric_catalog(metrics_path)
+    with timed("build.hint_retrieval"):
+        metric_hints = retrieve_metric_hints(normalized_text, catalog, mode=metric_hint_mode)
+
+    with timed("build.risk"):
+        risk = _risk_flags(normalized_text, time_result.resolved, hits)
 
     missing: List[str] = []
     trace: List[str] = []
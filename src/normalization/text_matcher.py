@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over a fixed keyword list.
+
+    One left-to-right pass over the text reports every keyword occurrence,
+    including overlapping ones (e.g. both "帳戶明細" and "明細"), which is
+    exactly what a chain of ``keyword in text`` checks would find.
+    Matching is case-sensitive; lower-case keywords and text beforehand
+    when needed.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: Tuple[str, ...] = tuple(keywords)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+
+        own_out: List[List[int]] = [[]]
+        for kw_id, keyword in enumerate(self.keywords):
+            if not keyword:
+                continue
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    own_out.append([])
+                state = nxt
+            own_out[state].append(kw_id)
+
+        self._out = [()] * len(self._goto)
+        queue: deque[int] = deque()
+        for state in self._goto[0].values():
+            queue.append(state)
+            self._out[state] = tuple(own_out[state])
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = tuple(own_out[nxt]) + self._out[self._fail[nxt]]
+
+        # full transition table (goto edges with failure links folded in), so
+        # matching is one dict lookup per character; BFS order guarantees a
+        # state's failure target is complete before the state itself
+        self._delta: List[Dict[str, int]] = [dict(self._goto[0])] + [{} for _ in self._goto[1:]]
+        queue.extend(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            delta = dict(self._delta[self._fail[state]])
+            delta.update(self._goto[state])
+            self._delta[state] = delta
+            queue.extend(self._goto[state].values())
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yield ``(start, keyword_id)`` for every occurrence, in end-position order."""
+        delta, out, keywords = self._delta, self._out, self.keywords
+        state = 0
+        for pos, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            for kw_id in out[state]:
+                yield pos + 1 - len(keywords[kw_id]), kw_id
+
+    def matches(self, text: str) -> Set[int]:
+        """Return the ids of all keywords occurring anywhere in ``text``."""
+        delta, out = self._delta, self._out
+        found: Set[int] = set()
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
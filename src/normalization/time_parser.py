@@ -1,8 +1,14 @@
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
-from typing import Optional
+from functools import lru_cache
+from typing import Callable, Optional, Tuple
+
+from .text_matcher import KeywordAutomaton
+
+Window = Tuple[str, date, date]
 
 
 @dataclass
@@ -24,30 +30,174 @@ def _last_day_of_last_month(d: date) -> date:
     return d.replace(day=1) - timedelta(days=1)
 
 
+def _last_day_of_month(year: int, month: int) -> date:
+    if month == 12:
+        return date(year, 12, 31)
+    return date(year, month + 1, 1) - timedelta(days=1)
+
+
+def _first_day_of_quarter(d: date) -> date:
+    return date(d.year, 3 * ((d.month - 1) // 3) + 1, 1)
+
+
+def _same_day_last_year(d: date) -> date:
+    try:
+        return d.replace(year=d.year - 1)
+    except ValueError:  # 29 Feb
+        return date(d.year - 1, 2, 28)
+
+
+@dataclass(frozen=True)
+class KeywordTimeRule:
+    """Fixed phrases; the first listed keyword found in the text is reported."""
+
+    keywords: Tuple[str, ...]
+    resolve: Callable[[date], Window]
+
+
+@dataclass(frozen=True)
+class PatternTimeRule:
+    """Regex over the lower-cased text; ``resolve`` gets today and the match groups, None rejects the match."""
+
+    pattern: "re.Pattern[str]"
+    resolve: Callable[[date, Tuple[str, ...]], Optional[Window]]
+
+
+def _last_n_days(today: date, groups: Tuple[str, ...]) -> Optional[Window]:
+    days = int(next(g for g in groups if g))
+    if not 1 <= days <= 3660:
+        return None
+    return "date_range", today - timedelta(days=days - 1), today
+
+
+def _last_quarter(today: date, _groups: Tuple[str, ...]) -> Window:
+    end = _first_day_of_quarter(today) - timedelta(days=1)
+    return "date_range", _first_day_of_quarter(end), end
+
+
+def _this_quarter(today: date, _groups: Tuple[str, ...]) -> Window:
+    return "date_range", _first_day_of_quarter(today), today
+
+
+def _same_period_last_year(today: date, _groups: Tuple[str, ...]) -> Window:
+    return "date_range", date(today.year - 1, 1, 1), _same_day_last_year(today)
+
+
+def _explicit_range(_today: date, groups: Tuple[str, ...]) -> Optional[Window]:
+    y1, m1, d1, y2, m2, d2 = (int(g) for g in groups)
+    try:
+        start, end = date(y1, m1, d1), date(y2, m2, d2)
+    except ValueError:
+        return None
+    if start > end:
+        return None
+    return "date_range", start, end
+
+
+def _year_month(_today: date, groups: Tuple[str, ...]) -> Optional[Window]:
+    year, month = int(groups[0]), int(groups[1])
+    # date() rejects year 0
+    if not (1 <= year <= 9999 and 1 <= month <= 12):
+        return None
+    return "date_range", date(year, month, 1), _last_day_of_month(year, month)
+
+
+# evaluated in this order; the first rule that matches wins
+TIME_RULES = (
+    KeywordTimeRule(("今天", "今日", "today"), lambda today: ("single_date", today, today)),
+    KeywordTimeRule(
+        ("昨天", "昨日", "yesterday"),
+        lambda today: ("single_date", today - timedelta(days=1), today - timedelta(days=1)),
+    ),
+    KeywordTimeRule(("近7天", "最近7天", "last 7 days"), lambda today: ("date_range", today - timedelta(days=6), today)),
+    KeywordTimeRule(
+        ("本月", "这个月", "這個月", "this month"), lambda today: ("month_to_date", _first_day_of_month(today), today)
+    ),
+    KeywordTimeRule(("今年", "this year"), lambda today: ("year_to_date", date(today.year, 1, 1), today)),
+    KeywordTimeRule(
+        ("上月", "上個月", "last month"),
+        lambda today: ("date_range", _first_day_of_last_month(today), _last_day_of_last_month(today)),
+    ),
+    PatternTimeRule(re.compile(r"最?近(\d+)天|last (\d+) days"), _last_n_days),
+    PatternTimeRule(re.compile(r"上季度?|上個季度|last quarter"), _last_quarter),
+    PatternTimeRule(re.compile(r"本季度?|這個季度|这个季度|this quarter"), _this_quarter),
+    PatternTimeRule(re.compile(r"去年同期|same period last year"), _same_period_last_year),
+    PatternTimeRule(
+        re.compile(
+            r"(?<!\d)(\d{4})-(\d{1,2})-(\d{1,2})\s*(?:至|到|~|～|to|-)\s*(\d{4})-(\d{1,2})-(\d{1,2})(?!\d)"
+        ),
+        _explicit_range,
+    ),
+    PatternTimeRule(re.compile(r"(?<![\d-])(\d{4})-(\d{1,2})(?![\d-])"), _year_month),
+)
+
+
+class TimePhraseMatcher:
+    """
+    ``TIME_RULES`` compiled once: every fixed keyword goes into a single
+    automaton, so one pass over the text finds the best keyword rule; only
+    pattern rules ranked above it are tried afterwards. Resolved windows are
+    memoized per (rule, today, match) so each window is computed once a day.
+    """
+
+    def __init__(self, rules=TIME_RULES):
+        self.rules = tuple(rules)
+        entries = []
+        for rule_idx, rule in enumerate(self.rules):
+            if isinstance(rule, KeywordTimeRule):
+                for kw_idx, keyword in enumerate(rule.keywords):
+                    entries.append(((rule_idx, kw_idx), keyword))
+        self._keyword_rank = [rank for rank, _ in entries]
+        self._automaton = KeywordAutomaton(keyword.lower() for _, keyword in entries)
+        # one search decides whether any pattern rule can match at all
+        pattern_idx = [i for i, rule in enumerate(self.rules) if isinstance(rule, PatternTimeRule)]
+        self._first_pattern = pattern_idx[0] if pattern_idx else len(self.rules)
+        self._pattern_gate = re.compile("|".join(f"(?:{self.rules[i].pattern.pattern})" for i in pattern_idx) or "(?!)")
+        self._resolve = lru_cache(maxsize=4096)(self._resolve_uncached)
+
+    def _resolve_uncached(self, rule_idx: int, today: date, groups: Tuple[str, ...]) -> Optional[Tuple[str, str, str]]:
+        rule = self.rules[rule_idx]
+        window = rule.resolve(today) if isinstance(rule, KeywordTimeRule) else rule.resolve(today, groups)
+        if window is None:
+            return None
+        kind, start, end = window
+        return kind, start.isoformat(), end.isoformat()
+
+    def parse(self, text: str, today: date) -> TimeParseResult:
+        lowered = text.lower()
+        hits = self._automaton.matches(lowered)
+        best = min((self._keyword_rank[kw_id] for kw_id in hits), default=(len(self.rules), 0))
+
+        if self._first_pattern < best[0] and self._pattern_gate.search(lowered):
+            for rule_idx in range(self._first_pattern, best[0]):
+                rule = self.rules[rule_idx]
+                if not isinstance(rule, PatternTimeRule):
+                    continue
+                for match in rule.pattern.finditer(lowered):
+                    window = self._resolve(rule_idx, today, match.groups(default=""))
+                    if window is not None:
+                        return _result(match.group(0), window)
+
+        if best[0] < len(self.rules):
+            rule_idx, kw_idx = best
+            return _result(self.rules[rule_idx].keywords[kw_idx], self._resolve(rule_idx, today, ()))
+        return TimeParseResult(original_phrase=None, resolved=None)
+
+    def cache_info(self):
+        return self._resolve.cache_info()
+
+
+def _result(phrase: str, window: Tuple[str, str, str]) -> TimeParseResult:
+    kind, start, end = window
+    return TimeParseResult(
+        original_phrase=phrase,
+        resolved={"type": kind, "start_date": start, "end_date": end},
+    )
+
+
+_MATCHER = TimePhraseMatcher()
+
+
 def parse_time_phrase(text: str, now: Optional[datetime] = None) -> TimeParseResult:
     now = now or datetime.now()
-    today = now.date()
-
-    mappings = [
-        (["今天", "今日", "today"], "single_date", today, today),
-        (["昨天", "昨日", "yesterday"], "single_date", today - timedelta(days=1), today - timedelta(days=1)),
-        (["近7天", "最近7天", "last 7 days"], "date_range", today - timedelta(days=6), today),
-        (["本月", "这个月", "這個月", "this month"], "month_to_date", _first_day_of_month(today), today),
-        (["今年", "this year"], "year_to_date", date(today.year, 1, 1), today),
-        (["上月", "上個月", "last month"], "date_range", _first_day_of_last_month(today), _last_day_of_last_month(today)),
-    ]
-
-    lowered = text.lower()
-    for keywords, kind, start, end in mappings:
-        for keyword in keywords:
-            if keyword.lower() in lowered:
-                return TimeParseResult(
-                    original_phrase=keyword,
-                    resolved={
-                        "type": kind,
-                        "start_date": start.isoformat(),
-                        "end_date": end.isoformat(),
-                    },
-                )
-
-    return TimeParseResult(original_phrase=None, resolved=None)
+    return _MATCHER.parse(text, now.date())
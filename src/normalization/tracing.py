@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from collections import deque
+from copy import deepcopy
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, TextIO, Tuple
+
+
+def diff_paths(before: Any, after: Any, prefix: str = "") -> List[str]:
+    """Dotted paths whose values differ between two JSON-like payloads."""
+    if before == after:
+        return []
+
+    if isinstance(before, dict) and isinstance(after, dict):
+        paths: List[str] = []
+        keys = set(before.keys()) | set(after.keys())
+        for key in sorted(keys):
+            next_prefix = f"{prefix}.{key}" if prefix else str(key)
+            if key not in before:
+                paths.append(f"{next_prefix} (added)")
+                continue
+            if key not in after:
+                paths.append(f"{next_prefix} (removed)")
+                continue
+            paths.extend(diff_paths(before[key], after[key], next_prefix))
+        return paths
+
+    if isinstance(before, list) and isinstance(after, list):
+        max_len = max(len(before), len(after))
+        paths = []
+        for idx in range(max_len):
+            next_prefix = f"{prefix}[{idx}]" if prefix else f"[{idx}]"
+            if idx >= len(before):
+                paths.append(f"{next_prefix} (added)")
+                continue
+            if idx >= len(after):
+                paths.append(f"{next_prefix} (removed)")
+                continue
+            paths.extend(diff_paths(before[idx], after[idx], next_prefix))
+        return paths
+
+    return [prefix or "<root>"]
+
+
+@dataclass
+class StageSnapshot:
+    stage: str
+    payload: Any
+    elapsed_ms: float
+
+
+@dataclass
+class NormalizationTrace:
+    """
+    Stage snapshots of one normalization, held by reference.
+
+    Pipeline stages never mutate an earlier stage's output in place (enrichment
+    works on a deep copy), so recording is free. Only the object handed back
+    to the caller can change after the fact; ``detach`` copies that one before
+    the trace outlives the call. Diffs are computed on first request.
+    """
+
+    request_id: str
+    sink: Optional["TraceSink"] = None
+    stages: List[StageSnapshot] = field(default_factory=list)
+    # set when the normalization raised; stages then end where it stopped
+    error: Optional[str] = None
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+    _diffs: Dict[Tuple[str, str], List[str]] = field(default_factory=dict, repr=False)
+
+    def record(self, stage: str, payload: Any) -> None:
+        self.stages.append(StageSnapshot(stage, payload, (time.perf_counter() - self._started) * 1e3))
+
+    def payload(self, stage: str) -> Any:
+        for snapshot in self.stages:
+            if snapshot.stage == stage:
+                return snapshot.payload
+        raise KeyError(stage)
+
+    def diff(self, before: str, after: str) -> List[str]:
+        key = (before, after)
+        if key not in self._diffs:
+            self._diffs[key] = diff_paths(self.payload(before), self.payload(after))
+        return self._diffs[key]
+
+    def detach(self, escaping: Any) -> None:
+        """Copy ``escaping`` (the object returned to the caller) wherever the trace references it."""
+        copied = None
+        for snapshot in self.stages:
+            if snapshot.payload is escaping:
+                copied = copied if copied is not None else deepcopy(escaping)
+                snapshot.payload = copied
+            elif isinstance(snapshot.payload, dict):
+                for key, value in snapshot.payload.items():
+                    if value is escaping:
+                        copied = copied if copied is not None else deepcopy(escaping)
+                        snapshot.payload = {**snapshot.payload, key: copied}
+
+    def to_dict(self, include_payloads: bool = True) -> Dict[str, Any]:
+        stages = []
+        for snapshot in self.stages:
+            item: Dict[str, Any] = {"stage": snapshot.stage, "elapsed_ms": round(snapshot.elapsed_ms, 3)}
+            if include_payloads:
+                item["payload"] = snapshot.payload
+            stages.append(item)
+        out: Dict[str, Any] = {"request_id": self.request_id, "stages": stages}
+        if self.error is not None:
+            out["error"] = self.error
+        if self._has("build_normalized_request") and self._has("enrich_draft"):
+            out["build_to_enrich_diff"] = self.diff("build_normalized_request", "enrich_draft")
+        return out
+
+    def _has(self, stage: str) -> bool:
+        return any(s.stage == stage for s in self.stages)
+
+    def fail(self, exc: BaseException) -> None:
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def finish(self) -> None:
+        if self.sink is not None:
+            self.sink.emit(self)
+
+
+class TraceSink:
+    """Receives finished traces; subclasses decide where they go."""
+
+    # sinks that keep trace objects past emit() need the caller's result detached
+    retains_traces = False
+
+    def emit(self, trace: NormalizationTrace) -> None:
+        raise NotImplementedError
+
+
+class RingBufferSink(TraceSink):
+    """Keeps the last ``capacity`` traces in memory."""
+
+    retains_traces = True
+
+    def __init__(self, capacity: int = 256):
+        self._traces: Deque[NormalizationTrace] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def emit(self, trace: NormalizationTrace) -> None:
+        with self._lock:
+            self._traces.append(trace)
+
+    def recent(self) -> List[NormalizationTrace]:
+        with self._lock:
+            return list(self._traces)
+
+
+class JsonlFileSink(TraceSink):
+    """Appends one JSON line per trace."""
+
+    def __init__(self, path: str, include_payloads: bool = True):
+        self.path = path
+        self.include_payloads = include_payloads
+        self._lock = threading.Lock()
+
+    def emit(self, trace: NormalizationTrace) -> None:
+        line = json.dumps(trace.to_dict(self.include_payloads), ensure_ascii=False, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+
+
+class LoggerSink(TraceSink):
+    """Logs each trace as one JSON record; nothing is serialized unless the level is enabled."""
+
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.DEBUG, include_payloads: bool = True):
+        self.logger = logger or logging.getLogger("smartbi.normalization.trace")
+        self.level = level
+        self.include_payloads = include_payloads
+
+    def emit(self, trace: NormalizationTrace) -> None:
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(
+                self.level, "%s", json.dumps(trace.to_dict(self.include_payloads), ensure_ascii=False, default=str)
+            )
+
+
+def _to_pretty_json(payload: Any) -> str:
+    return json.dumps(payload, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+class StdoutSink(TraceSink):
+    """The ``debug=True`` view: pretty JSON per stage plus the build -> enrich diff, written in one block."""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream
+
+    def emit(self, trace: NormalizationTrace) -> None:
+        lines: List[str] = []
+        for snapshot in trace.stages:
+            lines.append(f"[normalize_input] {snapshot.stage} JSON:")
+            lines.append(_to_pretty_json(snapshot.payload))
+            if snapshot.stage == "enrich_draft" and trace._has("build_normalized_request"):
+                paths = trace.diff("build_normalized_request", "enrich_draft")
+                lines.append(f"[normalize_input] build -> enrich diff_paths: {paths if paths else ['<no_changes>']}")
+        if trace.error is not None:
+            lines.append(f"[normalize_input] error: {trace.error}")
+        stream = self.stream or sys.stdout
+        stream.write("\n".join(lines) + "\n")
+
+
+_sink: Optional[TraceSink] = None
+
+
+def get_trace_sink() -> Optional[TraceSink]:
+    return _sink
+
+
+def set_trace_sink(sink: Optional[TraceSink]) -> Optional[TraceSink]:
+    """Install the process-wide trace sink (None disables tracing); returns the previous one."""
+    global _sink
+    previous, _sink = _sink, sink
+    return previous
+
+
+def start_trace(request_id: str, sample_rate: float, debug: bool = False) -> Optional[NormalizationTrace]:
+    """A trace for this request, or None when tracing is off or the request is not sampled."""
+    if debug:
+        return NormalizationTrace(request_id, sink=StdoutSink())
+    sink = _sink
+    if sink is None or sample_rate <= 0 or (sample_rate < 1 and random.random() >= sample_rate):
+        return None
+    return NormalizationTrace(request_id, sink=sink)
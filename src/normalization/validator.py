@@ -2,64 +2,273 @@ from __future__ import annotations
 
 import json
 import re
+from datetime import date, datetime
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Tuple
 
+from .file_cache import CompiledFileCache, FileCacheStats
+from .metrics import timed
 
-def _load_schema(path: str = "contracts/normalized_request.schema.json") -> dict:
+NORMALIZED_REQUEST_SCHEMA = "contracts/normalized_request.schema.json"
+SEMANTIC_PLAN_SCHEMA = "contracts/semantic_plan.schema.json"
+
+Check = Callable[[Any, str, List[str]], None]
+
+_DATE_TIME_RE = re.compile(r"^\d{4}-\d{2}-\d{2}[Tt ]\d{2}:\d{2}:\d{2}(\.\d+)?([Zz]|[+-]\d{2}:\d{2})$")
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+_PY_TYPES: Dict[str, Tuple[type, ...]] = {
+    "object": (dict,),
+    "array": (list,),
+    "string": (str,),
+    "boolean": (bool,),
+    "null": (type(None),),
+    "integer": (int,),
+    "number": (int, float),
+}
+
+
+def _load_schema(path: str = NORMALIZED_REQUEST_SCHEMA) -> dict:
     return json.loads(Path(path).read_text(encoding="utf-8"))
 
 
-def validate_normalized_request(data: Dict[str, object], schema_path: str = "contracts/normalized_request.schema.json") -> Tuple[bool, List[str]]:
-    schema = _load_schema(schema_path)
-    errors: List[str] = []
+def _child(path: str, key: str) -> str:
+    return f"{path}.{key}" if path else key
 
-    required = schema.get("required", [])
-    for key in required:
-        if key not in data:
-            errors.append(f"missing required key: {key}")
 
-    if data.get("schema_version") != "1.0":
-        errors.append("schema_version must be 1.0")
+def _is_date_time(value: str) -> bool:
+    if not _DATE_TIME_RE.match(value):
+        return False
+    try:
+        datetime.fromisoformat(value.replace("z", "Z"))
+    except ValueError:
+        return False
+    return True
 
-    request_context = data.get("request_context", {})
-    if not isinstance(request_context, dict):
-        errors.append("request_context must be object")
-    else:
-        if not request_context.get("request_ts"):
-            errors.append("request_context.request_ts is required")
-        tz = request_context.get("timezone")
-        if not tz:
-            errors.append("request_context.timezone is required")
-
-    query_context = data.get("query_context", {})
-    if not isinstance(query_context, dict):
-        errors.append("query_context must be object")
-    else:
-        if query_context.get("language") not in ["zh-TW", "zh-CN", "en"]:
-            errors.append("query_context.language invalid")
-        if query_context.get("intent") not in ["kpi_query", "comparison", "trend", "detail_request", "out_of_scope"]:
-            errors.append("query_context.intent invalid")
-
-    time_context = data.get("time_context", {})
-    if not isinstance(time_context, dict):
-        errors.append("time_context must be object")
+
+def _is_date(value: str) -> bool:
+    if not _DATE_RE.match(value):
+        return False
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+_FORMAT_CHECKS: Dict[str, Callable[[str], bool]] = {
+    "date-time": _is_date_time,
+    "date": _is_date,
+}
+
+
+def _resolve_ref(root: dict, ref: str) -> dict:
+    if not ref.startswith("#"):
+        raise ValueError(f"Only local $ref is supported: {ref}")
+    node: Any = root
+    for part in ref.lstrip("#").strip("/").split("/"):
+        if part:
+            node = node[part.replace("~1", "/").replace("~0", "~")]
+    return node
+
+
+def _compile(schema: Any, root: dict) -> Check:
+    """Compile one (sub)schema into a closure; keywords are resolved once here."""
+    if schema is True or schema == {}:
+        return lambda value, path, errors: None
+    if schema is False:
+        return lambda value, path, errors: errors.append(f"{path or '<root>'} is not allowed")
+
+    if "$ref" in schema:
+        target = _compile(_resolve_ref(root, schema["$ref"]), root)
+        siblings = {k: v for k, v in schema.items() if k != "$ref"}
+        if not siblings:
+            return target
+        rest = _compile(siblings, root)
+
+        def check_ref(value: Any, path: str, errors: List[str]) -> None:
+            target(value, path, errors)
+            rest(value, path, errors)
+
+        return check_ref
+
+    checks: List[Check] = []
+
+    types = schema.get("type")
+    if types is not None:
+        type_names = [types] if isinstance(types, str) else list(types)
+        py_types = tuple(t for name in type_names for t in _PY_TYPES[name])
+        # bool is an int subclass but not a JSON number
+        reject_bool = "boolean" not in type_names and int in py_types
+        type_label = "|".join(type_names)
     else:
-        resolved = time_context.get("resolved")
-        if resolved is not None:
-            if not isinstance(resolved, dict):
-                errors.append("time_context.resolved must be object|null")
-            else:
-                kind = resolved.get("type")
-                if kind not in ["single_date", "date_range", "month_to_date", "year_to_date", "latest_available_date"]:
-                    errors.append("time_context.resolved.type invalid")
-                for k in ["start_date", "end_date"]:
-                    val = resolved.get(k, "")
-                    if not re.match(r"^\d{4}-\d{2}-\d{2}$", str(val)):
-                        errors.append(f"time_context.resolved.{k} invalid")
-
-    missing_fields = data.get("missing_required_fields", [])
-    if not isinstance(missing_fields, list):
-        errors.append("missing_required_fields must be array")
-
-    return len(errors) == 0, errors
+        py_types = ()
+        reject_bool = False
+        type_label = ""
+
+    if "const" in schema:
+        const = schema["const"]
+
+        def check_const(value: Any, path: str, errors: List[str]) -> None:
+            if value != const or isinstance(value, bool) != isinstance(const, bool):
+                errors.append(f"{path} must be {const}")
+
+        checks.append(check_const)
+
+    if "enum" in schema:
+        options = list(schema["enum"])
+
+        def check_enum(value: Any, path: str, errors: List[str]) -> None:
+            if value not in options:
+                errors.append(f"{path} invalid")
+
+        checks.append(check_enum)
+
+    string_checks: List[Check] = []
+    if "minLength" in schema or "maxLength" in schema:
+        min_len = schema.get("minLength", 0)
+        max_len = schema.get("maxLength")
+
+        def check_length(value: str, path: str, errors: List[str]) -> None:
+            if len(value) < min_len:
+                errors.append(f"{path} must not be empty" if min_len == 1 else f"{path} must have at least {min_len} characters")
+            if max_len is not None and len(value) > max_len:
+                errors.append(f"{path} must have at most {max_len} characters")
+
+        string_checks.append(check_length)
+    if "pattern" in schema:
+        pattern = re.compile(schema["pattern"])
+
+        def check_pattern(value: str, path: str, errors: List[str]) -> None:
+            if not pattern.search(value):
+                errors.append(f"{path} invalid")
+
+        string_checks.append(check_pattern)
+    if schema.get("format") in _FORMAT_CHECKS:
+        format_fn = _FORMAT_CHECKS[schema["format"]]
+
+        def check_format(value: str, path: str, errors: List[str]) -> None:
+            if not format_fn(value):
+                errors.append(f"{path} invalid")
+
+        string_checks.append(check_format)
+    if string_checks:
+
+        def check_string(value: Any, path: str, errors: List[str]) -> None:
+            if isinstance(value, str):
+                for fn in string_checks:
+                    fn(value, path, errors)
+
+        checks.append(check_string)
+
+    if "minimum" in schema or "maximum" in schema:
+        minimum = schema.get("minimum")
+        maximum = schema.get("maximum")
+
+        def check_range(value: Any, path: str, errors: List[str]) -> None:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return
+            if minimum is not None and value < minimum:
+                errors.append(f"{path} must be >= {minimum}")
+            if maximum is not None and value > maximum:
+                errors.append(f"{path} must be <= {maximum}")
+
+        checks.append(check_range)
+
+    if "items" in schema or "minItems" in schema or "maxItems" in schema:
+        item_check = _compile(schema.get("items", True), root)
+        min_items = schema.get("minItems", 0)
+        max_items = schema.get("maxItems")
+
+        def check_array(value: Any, path: str, errors: List[str]) -> None:
+            if not isinstance(value, list):
+                return
+            if len(value) < min_items:
+                errors.append(f"{path} must have at least {min_items} items")
+            if max_items is not None and len(value) > max_items:
+                errors.append(f"{path} must have at most {max_items} items")
+            for idx, item in enumerate(value):
+                item_check(item, f"{path}[{idx}]", errors)
+
+        checks.append(check_array)
+
+    if any(k in schema for k in ("properties", "required", "additionalProperties")):
+        required = tuple(schema.get("required", ()))
+        properties = {key: _compile(sub, root) for key, sub in schema.get("properties", {}).items()}
+        additional = schema.get("additionalProperties", True)
+        additional_check = None if additional is True or additional is False else _compile(additional, root)
+
+        def check_object(value: Any, path: str, errors: List[str]) -> None:
+            if not isinstance(value, dict):
+                return
+            for key in required:
+                if key not in value:
+                    errors.append(f"{path}.{key} is required" if path else f"missing required key: {key}")
+            for key, item in value.items():
+                prop_check = properties.get(key)
+                if prop_check is not None:
+                    prop_check(item, _child(path, key), errors)
+                elif additional is False:
+                    errors.append(f"{_child(path, key)} is not allowed")
+                elif additional_check is not None:
+                    additional_check(item, _child(path, key), errors)
+
+        checks.append(check_object)
+
+    if not py_types and len(checks) == 1:
+        return checks[0]
+
+    def check(value: Any, path: str, errors: List[str]) -> None:
+        if py_types and (not isinstance(value, py_types) or (reject_bool and value.__class__ is bool)):
+            errors.append(f"{path or '<root>'} must be {type_label}")
+            return
+        for fn in checks:
+            fn(value, path, errors)
+
+    return check
+
+
+class CompiledSchemaValidator:
+    """
+    Draft 2020-12 JSON Schema validator compiled once into nested closures.
+    Covers the keywords used by contracts/*.schema.json (type, const, enum,
+    required, properties, additionalProperties, items, min/max*, pattern,
+    format, local $ref).
+    """
+
+    def __init__(self, schema: dict, source: str = ""):
+        self.schema = schema
+        self.source = source
+        self._check = _compile(schema, schema)
+
+    def validate(self, data: Any) -> List[str]:
+        errors: List[str] = []
+        self._check(data, "", errors)
+        return errors
+
+    def __call__(self, data: Any) -> Tuple[bool, List[str]]:
+        errors = self.validate(data)
+        return len(errors) == 0, errors
+
+
+_VALIDATOR_CACHE: CompiledFileCache[CompiledSchemaValidator] = CompiledFileCache(
+    lambda path, text, digest: CompiledSchemaValidator(json.loads(text), source=str(path))
+)
+
+
+def get_schema_validator(schema_path: str) -> CompiledSchemaValidator:
+    """Return the compiled validator for ``schema_path``; recompiled only when the file changes."""
+    return _VALIDATOR_CACHE.get(schema_path)
+
+
+def validator_cache_stats() -> FileCacheStats:
+    return _VALIDATOR_CACHE.stats()
+
+
+def validate_normalized_request(data: Dict[str, object], schema_path: str = NORMALIZED_REQUEST_SCHEMA) -> Tuple[bool, List[str]]:
+    with timed("validate.normalized_request"):
+        return get_schema_validator(schema_path)(data)
+
+
+def validate_semantic_plan(data: Dict[str, object], schema_path: str = SEMANTIC_PLAN_SCHEMA) -> Tuple[bool, List[str]]:
+    return get_schema_validator(schema_path)(data)
@@ -0,0 +1,13 @@
+from .metric_specs import MetricSpec, get_metric_specs
+from .plan_builder import PlanningError, build_semantic_plan
+from .sql_compiler import CompiledQuery, CompileError, compile_plan
+
+__all__ = [
+    "CompileError",
+    "CompiledQuery",
+    "MetricSpec",
+    "PlanningError",
+    "build_semantic_plan",
+    "compile_plan",
+    "get_metric_specs",
+]
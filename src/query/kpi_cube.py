@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+from array import array
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.normalization.metrics import incr, timed
+
+from .metric_specs import MetricSpec, get_metric_specs
+from .sql_compiler import BASE_SOURCES, SourceSpec, _filter_values, _joins, check_allowed, month_bounds, resolve_spec
+from .sqlite_engine import QueryResult
+
+SOURCE = "kpi_cube"
+# DECIMAL(18,2) amounts are held as int64 cents so sums stay exact
+AMOUNT_SCALE = 100
+_FETCH_ROWS = 100_000
+_EPOCH = date(1970, 1, 1)
+
+_SUM_RE = re.compile(r"^SUM\((.+)\)$", re.I)
+_COUNT_RE = re.compile(r"^COUNT\(\*\)$", re.I)
+
+
+def _day(iso: str) -> int:
+    return (date.fromisoformat(iso[:10]) - _EPOCH).days
+
+
+def _iso(day: int) -> str:
+    return (_EPOCH + timedelta(days=int(day))).isoformat()
+
+
+class _Encoder:
+    """Dictionary-encodes one column chunk by chunk; codes are renumbered in value order at the end."""
+
+    def __init__(self):
+        self.codes: Dict[Any, int] = {}
+        self.values = array("i")
+
+    def extend(self, column: Sequence[Any]) -> None:
+        codes = self.codes
+        self.values.extend(codes.setdefault(value, len(codes)) for value in column)
+
+    def finish(self) -> Tuple[Tuple[Any, ...], np.ndarray]:
+        dictionary = tuple(sorted(self.codes, key=lambda v: (v is None, v)))
+        remap = np.empty(len(dictionary), dtype=np.int32)
+        for new, value in enumerate(dictionary):
+            remap[self.codes[value]] = new
+        return dictionary, remap[np.frombuffer(self.values, dtype=np.intc)] if len(self.values) else np.zeros(0, np.int32)
+
+
+@dataclass
+class MetricCube:
+    """
+    One metric rolled up to its finest queryable grain (date x every
+    dimension of its base source). Cells are sorted by date so a time window
+    is a contiguous slice; dimensions are int32 codes into sorted
+    dictionaries, so code order is value order.
+    """
+
+    spec: MetricSpec
+    dates: np.ndarray
+    dims: Dict[str, np.ndarray]
+    dictionaries: Dict[str, Tuple[Any, ...]]
+    # measure -> int64 sums (amounts in cents); row_count backs COUNT(*) measures
+    sums: Dict[str, np.ndarray]
+    # measure -> rows per cell whose amount has cents; SQLite's SUM is an integer only when there are none
+    fractional: Dict[str, np.ndarray]
+    row_count: np.ndarray
+    count_measures: Tuple[str, ...]
+    fact_rows: int
+
+    @property
+    def cells(self) -> int:
+        return len(self.dates)
+
+    def measures(self) -> Tuple[str, ...]:
+        return (*self.sums, *self.count_measures)
+
+    def covers(self, dims: Sequence[str], measures: Sequence[str]) -> bool:
+        available = self.measures()
+        return all(d in self.dims for d in dims) and all(m in available for m in measures)
+
+
+def _measure_kinds(spec: MetricSpec) -> Tuple[Dict[str, str], List[str]]:
+    sums: Dict[str, str] = {}
+    counts: List[str] = []
+    for measure, sql in spec.measure_sql.items():
+        match = _SUM_RE.match(sql.strip())
+        if match:
+            sums[measure] = match.group(1)
+        elif _COUNT_RE.match(sql.strip()):
+            counts.append(measure)
+    return sums, counts
+
+
+def _extract_sql(spec: MetricSpec, source: SourceSpec, sums: Mapping[str, str]) -> Tuple[str, Tuple[Any, ...]]:
+    dims = [d for d in source.columns if d != "biz_date"]
+    select = [source.date_column, *(source.columns[d] for d in dims), *sums.values()]
+    where: List[str] = []
+    params: Tuple[Any, ...] = ()
+    if source.status_column and spec.include_status:
+        where.append(f"{source.status_column} IN ({', '.join('?' * len(spec.include_status))})")
+        params = spec.include_status
+    lines = ["SELECT " + ", ".join(select), f"FROM {source.name}"]
+    lines += [f"JOIN {join.table} ON {join.on}" for join in _joins(source, [*select, *where])]
+    if where:
+        lines.append("WHERE " + " AND ".join(where))
+    return "\n".join(lines), params
+
+
+def build_metric_cube(conn: sqlite3.Connection, spec: MetricSpec) -> Optional[MetricCube]:
+    """Scan the metric's base tables once and roll them up with np.add.reduceat. None when there is no base source."""
+    source = BASE_SOURCES.get(spec.preferred_source)
+    if source is None:
+        return None
+    sums, counts = _measure_kinds(spec)
+    dims = [d for d in source.columns if d != "biz_date"]
+    sql, params = _extract_sql(spec, source, sums)
+
+    day_of: Dict[str, int] = {}
+    days = array("i")
+    encoders = {d: _Encoder() for d in dims}
+    amounts: Dict[str, List[np.ndarray]] = {m: [] for m in sums}
+    fractions: Dict[str, List[np.ndarray]] = {m: [] for m in sums}
+    cursor = conn.execute(sql, params)
+    while True:
+        chunk = cursor.fetchmany(_FETCH_ROWS)
+        if not chunk:
+            break
+        columns = list(zip(*chunk))
+        days.extend(day_of[v] if v in day_of else day_of.setdefault(v, _day(v)) for v in columns[0])
+        for offset, dim in enumerate(dims, start=1):
+            encoders[dim].extend(columns[offset])
+        for offset, measure in enumerate(sums, start=1 + len(dims)):
+            values = np.asarray(columns[offset], dtype=np.float64)
+            cents = np.rint(values * AMOUNT_SCALE).astype(np.int64)
+            amounts[measure].append(cents)
+            fractions[measure].append((cents % AMOUNT_SCALE != 0).astype(np.int64))
+
+    dictionaries: Dict[str, Tuple[Any, ...]] = {}
+    codes: Dict[str, np.ndarray] = {}
+    for dim, encoder in encoders.items():
+        dictionaries[dim], codes[dim] = encoder.finish()
+    date_keys = np.frombuffer(days, dtype=np.intc).astype(np.int32) if len(days) else np.zeros(0, dtype=np.int32)
+    values = {m: np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64) for m, parts in amounts.items()}
+    fractional = {m: np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64) for m, parts in fractions.items()}
+    fact_rows = len(date_keys)
+
+    # composite key with the date as the most significant digit: sorting it orders cells by date
+    key = (date_keys.astype(np.int64) - (int(date_keys.min()) if fact_rows else 0))
+    for dim in dims:
+        key = key * max(1, len(dictionaries[dim])) + codes[dim]
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+    starts = np.flatnonzero(np.r_[True, sorted_key[1:] != sorted_key[:-1]]) if fact_rows else np.zeros(0, dtype=np.int64)
+    first = order[starts]
+
+    return MetricCube(
+        spec=spec,
+        dates=date_keys[first],
+        dims={dim: codes[dim][first] for dim in dims},
+        dictionaries=dictionaries,
+        sums={m: np.add.reduceat(v[order], starts) if fact_rows else v for m, v in values.items()},
+        fractional={m: np.add.reduceat(v[order], starts) if fact_rows else v for m, v in fractional.items()},
+        row_count=np.diff(np.r_[starts, fact_rows]).astype(np.int64),
+        count_measures=tuple(counts),
+        fact_rows=fact_rows,
+    )
+
+
+def _window(cube: MetricCube, time_window: Mapping[str, str]) -> Tuple[int, int]:
+    """[lo, hi) cell slice for the plan's time window."""
+    dates = cube.dates
+    if time_window["type"] == "latest_available_date":
+        idx = int(np.searchsorted(dates, _day(time_window["end_date"]), side="right"))
+        if idx == 0:
+            return 0, 0
+        start = end = int(dates[idx - 1])
+    else:
+        start, end = _day(time_window["start_date"]), _day(time_window["end_date"])
+    lo = int(np.searchsorted(dates, start, side="left"))
+    hi = int(np.searchsorted(dates, end, side="right"))
+    return lo, max(lo, hi)
+
+
+def _date_mask(dates: np.ndarray, values: Mapping[str, List[str]]) -> Optional[np.ndarray]:
+    """Cells matching every biz_date (IN list) and yyyy_mm (any of the months) filter, like the compiled SQL."""
+    mask: Optional[np.ndarray] = None
+    if "biz_date" in values:
+        wanted: List[int] = []
+        for value in values["biz_date"]:
+            try:
+                wanted.append(_day(value))
+            except ValueError:
+                continue  # matches no row in SQL either
+        mask = np.isin(dates, wanted)
+    if "yyyy_mm" in values:
+        in_months = np.zeros(len(dates), dtype=bool)
+        for value in values["yyyy_mm"]:
+            first, last = month_bounds(value)
+            in_months |= (dates >= (first - _EPOCH).days) & (dates <= (last - _EPOCH).days)
+        mask = in_months if mask is None else mask & in_months
+    return mask
+
+
+def query_cube(cube: MetricCube, plan: Mapping[str, Any]) -> QueryResult:
+    group_by = list(plan.get("group_by") or ())
+    measures = list(plan["measures"])
+    values = _filter_values(plan.get("filters") or {})
+    lo, hi = _window(cube, plan["time_window"])
+
+    mask = _date_mask(cube.dates[lo:hi], values)
+    for dim, wanted in values.items():
+        if dim in ("biz_date", "yyyy_mm"):
+            continue
+        dictionary = cube.dictionaries[dim]
+        # filter values arrive as text; dictionary values keep the column's type (e.g. int branch_id)
+        lookup = {str(v): code for code, v in enumerate(dictionary)}
+        wanted_codes = [lookup[v] for v in wanted if v in lookup]
+        hit = np.isin(cube.dims[dim][lo:hi], wanted_codes)
+        mask = hit if mask is None else mask & hit
+    rows = np.arange(lo, hi) if mask is None else lo + np.flatnonzero(mask)
+
+    # mixed-radix group key; biz_date codes are day offsets from the window start
+    radix: List[int] = []
+    key = np.zeros(len(rows), dtype=np.int64)
+    base_day = int(cube.dates[lo]) if hi > lo else 0
+    for dim in group_by:
+        if dim == "biz_date":
+            codes = cube.dates[rows].astype(np.int64) - base_day
+            size = (int(cube.dates[hi - 1]) - base_day + 1) if hi > lo else 1
+        else:
+            codes = cube.dims[dim][rows].astype(np.int64)
+            size = max(1, len(cube.dictionaries[dim]))
+        key = key * size + codes
+        radix.append(size)
+
+    # sort cells by group key and sum each run with reduceat: int64 all the way, so cent sums stay exact
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+    starts = np.flatnonzero(np.r_[True, sorted_key[1:] != sorted_key[:-1]]) if len(rows) else np.zeros(0, dtype=np.int64)
+    groups = sorted_key[starts]
+    counts = cube.row_count[rows]
+
+    def group_sum(weights: np.ndarray) -> np.ndarray:
+        return np.add.reduceat(weights[order], starts) if len(starts) else np.zeros(0, dtype=np.int64)
+
+    columns: Dict[str, List[Any]] = {}
+    for measure in measures:
+        if measure in cube.count_measures:
+            columns[measure] = group_sum(counts).tolist()
+            continue
+        # same type SQLite's SUM returns: int when every summed amount is whole, else float
+        cents = group_sum(cube.sums[measure][rows]).tolist()
+        fractional = group_sum(cube.fractional[measure][rows]).tolist()
+        columns[measure] = [c / AMOUNT_SCALE if f else c // AMOUNT_SCALE for c, f in zip(cents, fractional)]
+
+    decoded: List[np.ndarray] = []
+    remainder = groups.astype(np.int64)
+    for size in reversed(radix):
+        decoded.append(remainder % size)
+        remainder = remainder // size
+    decoded.reverse()
+
+    out_rows: List[Tuple[Any, ...]] = []
+    dim_values = []
+    for dim, codes in zip(group_by, decoded):
+        if dim == "biz_date":
+            dim_values.append([_iso(base_day + int(c)) for c in codes])
+        else:
+            dictionary = cube.dictionaries[dim]
+            dim_values.append([dictionary[int(c)] for c in codes])
+    measure_values = [columns[m] for m in measures]
+    for idx in range(len(groups)):
+        out_rows.append(tuple(col[idx] for col in dim_values) + tuple(col[idx] for col in measure_values))
+    return QueryResult(tuple(group_by + measures), tuple(out_rows), SOURCE)
+
+
+class KpiCube:
+    """
+    In-memory columnar cubes for every metric with a base source, built
+    from a local SQLite copy. ``answer`` returns None when a plan needs
+    something the cube does not hold, so callers fall back to SQL.
+    """
+
+    def __init__(self, cubes: Mapping[str, MetricCube], metrics_path: str = "semantic/metrics.yaml"):
+        self.cubes = dict(cubes)
+        self.metrics_path = metrics_path
+
+    @classmethod
+    def build(cls, conn: sqlite3.Connection, metrics_path: str = "semantic/metrics.yaml") -> "KpiCube":
+        cubes: Dict[str, MetricCube] = {}
+        with timed("cube.build"):
+            for spec in get_metric_specs(metrics_path):
+                cube = build_metric_cube(conn, spec)
+                if cube is not None:
+                    cubes[spec.metric_id] = cube
+        return cls(cubes, metrics_path)
+
+    def answer(self, plan: Mapping[str, Any]) -> Optional[QueryResult]:
+        _, spec = resolve_spec(plan, self.metrics_path)
+        values = _filter_values(plan.get("filters") or {})
+        group_by = list(plan.get("group_by") or ())
+        check_allowed(spec, group_by, list(values), plan["measures"])
+        cube = self.cubes.get(spec.metric_id)
+        dims = [*group_by, *(d for d in values if d not in ("biz_date", "yyyy_mm"))]
+        if cube is None or not cube.covers([d for d in dims if d != "biz_date"], plan["measures"]):
+            incr("cube.miss")
+            return None
+        incr("cube.hit")
+        with timed("cube.query"):
+            return query_cube(cube, plan)
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.normalization.metrics import incr, timed
+
+from .sql_compiler import VIEW_SOURCES, SourceSpec, materialized_source
+
+STATE_TABLE = "kpi_mv_state"
+# dates per DELETE/INSERT round; keeps IN lists well under SQLite's parameter limit
+_DATE_BATCH = 200
+
+
+@dataclass(frozen=True)
+class MaterializedView:
+    """
+    A vw_kpi_* view kept as a summary table clustered by ``key`` (biz_date
+    first, so each date is one contiguous partition). ``watermark_column``
+    is the fact column whose growth says which dates changed: ``txn_ts`` for
+    append-only transactions, ``biz_date`` for daily snapshots. ``select``
+    replaces the view as the row source when the table keeps an extra
+    ``status_column`` the view sums over.
+    """
+
+    view: str
+    table: str
+    key: Tuple[str, ...]
+    fact_table: str
+    watermark_column: str
+    select: Optional[str] = None
+    status_column: Optional[str] = None
+
+    @property
+    def relation(self) -> str:
+        return f"({self.select})" if self.select else self.view
+
+
+# vw_kpi_deposit_balance_by_branch_date per account status, so include_status can still be applied
+_DEPOSIT_BY_STATUS = (
+    "SELECT b.biz_date, a.branch_id, br.branch_name, br.region, a.currency, a.status, "
+    "SUM(b.end_balance) AS total_end_balance, SUM(b.available_bal) AS total_available_bal, "
+    "SUM(b.hold_amount) AS total_hold_amount, COUNT(DISTINCT a.account_id) AS accounts_cnt "
+    "FROM fact_account_balance_daily b "
+    "JOIN core_account a ON a.account_id = b.account_id "
+    "JOIN dim_branch br ON br.branch_id = a.branch_id "
+    "GROUP BY b.biz_date, a.branch_id, br.branch_name, br.region, a.currency, a.status"
+)
+
+
+MATERIALIZED_VIEWS: Tuple[MaterializedView, ...] = (
+    MaterializedView(
+        "vw_kpi_deposit_balance_by_branch_date",
+        "mv_kpi_deposit_balance_by_branch_date",
+        ("biz_date", "branch_id", "currency", "status"),
+        "fact_account_balance_daily",
+        "biz_date",
+        select=_DEPOSIT_BY_STATUS,
+        status_column="status",
+    ),
+    MaterializedView(
+        "vw_kpi_txn_by_channel_date",
+        "mv_kpi_txn_by_channel_date",
+        ("biz_date", "channel"),
+        "fact_transaction",
+        "txn_ts",
+    ),
+    MaterializedView(
+        "vw_kpi_loan_risk_by_branch_date",
+        "mv_kpi_loan_risk_by_branch_date",
+        ("biz_date", "branch_id"),
+        "fact_loan_balance_daily",
+        "biz_date",
+    ),
+)
+
+
+@dataclass(frozen=True)
+class RefreshStats:
+    table: str
+    dates_refreshed: int
+    rows_written: int
+    watermark: Optional[str]
+    elapsed_seconds: float
+    full: bool
+
+
+def _chunks(items: Sequence[Any], size: int) -> List[Sequence[Any]]:
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+class KpiMaterializer:
+    """
+    Incremental materialization of the vw_kpi_* views. Each refresh reads
+    the fact table's watermark, finds the biz_dates with rows at or past the
+    stored watermark, and rebuilds only those date partitions from the view.
+    A view is added to ``routes`` (pass ``LocalEngine.routes``) once its
+    table holds a refreshed watermark; plans compiled with those routes read
+    the summary table instead of the view.
+
+    Rows deleted from a fact table and dimension edits (branch renames) are
+    not visible through a watermark; ``refresh(full=True)`` or
+    ``refresh(dates=...)`` covers them.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        views: Sequence[MaterializedView] = MATERIALIZED_VIEWS,
+        *,
+        lookback_days: int = 0,
+        routes: Optional[Dict[str, SourceSpec]] = None,
+    ):
+        self.conn = conn
+        self.views = tuple(views)
+        # snapshot tables re-check this many dates before the watermark for late corrections
+        self.lookback_days = max(0, lookback_days)
+        self.routes: Dict[str, SourceSpec] = routes if routes is not None else {}
+
+    def install(self) -> None:
+        with self.conn:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {STATE_TABLE} ("
+                "table_name TEXT PRIMARY KEY, watermark TEXT, refreshed_at TEXT NOT NULL)"
+            )
+            for mv in self.views:
+                columns = [col[0] for col in self.conn.execute(f"SELECT * FROM {mv.relation} LIMIT 0").description]
+                self.conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {mv.table} ({', '.join(columns)}, "
+                    f"PRIMARY KEY ({', '.join(mv.key)})) WITHOUT ROWID"
+                )
+                if mv.watermark_column != "biz_date":
+                    # the watermark scan must not read the whole fact table
+                    self.conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_{mv.fact_table}_{mv.watermark_column} "
+                        f"ON {mv.fact_table} ({mv.watermark_column}, biz_date)"
+                    )
+        # tables refreshed by an earlier process can serve plans right away
+        for mv in self.views:
+            if self.watermark(mv) is not None:
+                self._route(mv)
+
+    def uninstall(self) -> None:
+        for mv in self.views:
+            self.routes.pop(mv.view, None)
+
+    def _route(self, mv: MaterializedView) -> None:
+        if mv.view in VIEW_SOURCES:
+            self.routes[mv.view] = materialized_source(mv.view, mv.table, mv.status_column)
+
+    def watermark(self, mv: MaterializedView) -> Optional[str]:
+        row = self.conn.execute(f"SELECT watermark FROM {STATE_TABLE} WHERE table_name = ?", (mv.table,)).fetchone()
+        return row[0] if row else None
+
+    def _changed_dates(self, mv: MaterializedView, old: Optional[str], new: str) -> List[str]:
+        # ">=": rows can land with the same value as the stored watermark, so the
+        # boundary dates are always rebuilt again (a rebuild is idempotent)
+        if old is None:
+            sql, params = f"SELECT DISTINCT biz_date FROM {mv.fact_table}", ()
+        elif mv.watermark_column == "biz_date":
+            since = (date.fromisoformat(old) - timedelta(days=self.lookback_days)).isoformat()
+            sql = f"SELECT DISTINCT biz_date FROM {mv.fact_table} WHERE biz_date >= ? AND biz_date <= ?"
+            params = (since, new)
+        else:
+            sql = (
+                f"SELECT DISTINCT biz_date FROM {mv.fact_table} "
+                f"WHERE {mv.watermark_column} >= ? AND {mv.watermark_column} <= ?"
+            )
+            params = (old, new)
+        return sorted(row[0] for row in self.conn.execute(sql, params))
+
+    def _rebuild(self, mv: MaterializedView, dates: Sequence[str]) -> int:
+        written = 0
+        for batch in _chunks(list(dates), _DATE_BATCH):
+            marks = ", ".join("?" * len(batch))
+            self.conn.execute(f"DELETE FROM {mv.table} WHERE biz_date IN ({marks})", batch)
+            cursor = self.conn.execute(f"INSERT INTO {mv.table} SELECT * FROM {mv.relation} WHERE biz_date IN ({marks})", batch)
+            written += cursor.rowcount
+        return written
+
+    def refresh_view(self, mv: MaterializedView, *, full: bool = False, dates: Optional[Sequence[str]] = None) -> RefreshStats:
+        start = time.perf_counter()
+        with timed("mv.refresh"), self.conn:
+            # read the new watermark first: rows landing during the refresh are picked up next time
+            new = self.conn.execute(f"SELECT MAX({mv.watermark_column}) FROM {mv.fact_table}").fetchone()[0]
+            old = None if full else self.watermark(mv)
+            if dates is not None and not full:
+                # an explicit repair leaves the watermark where it was
+                changed, new = sorted(set(dates)), old
+            elif new is None:
+                changed = []
+            else:
+                changed = self._changed_dates(mv, old, new)
+            if full:
+                self.conn.execute(f"DELETE FROM {mv.table}")
+            written = self._rebuild(mv, changed)
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO {STATE_TABLE} (table_name, watermark, refreshed_at) VALUES (?, ?, ?)",
+                (mv.table, new, datetime.now().isoformat(timespec="seconds")),
+            )
+        incr("mv.dates_refreshed", len(changed))
+        if new is not None:
+            self._route(mv)
+        return RefreshStats(mv.table, len(changed), written, new, time.perf_counter() - start, full or old is None)
+
+    def refresh(self, *, full: bool = False, dates: Optional[Sequence[str]] = None) -> Dict[str, RefreshStats]:
+        return {mv.table: self.refresh_view(mv, full=full, dates=dates) for mv in self.views}
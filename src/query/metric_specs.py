@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+from functools import cached_property
+from pathlib import Path
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, Iterator, List, Mapping, Optional, Tuple
+
+from src.normalization.file_cache import CompiledFileCache, FileCacheStats
+
+if TYPE_CHECKING:
+    from .plan_builder import MetricPlanTables
+
+_KEY_RE = re.compile(r"^([^\s:#\-\"'][^:]*?):(?:\s+(.*))?$")
+
+
+@dataclass
+class _Line:
+    indent: int
+    content: str
+
+
+def _scalar(raw: str) -> Any:
+    raw = raw.strip()
+    if raw.startswith('"') and raw.endswith('"') and len(raw) >= 2:
+        return json.loads(raw)
+    if raw.startswith("'") and raw.endswith("'") and len(raw) >= 2:
+        return raw[1:-1].replace("''", "'")
+    if raw.startswith("[") and raw.endswith("]"):
+        return [_scalar(item) for item in _split_flow(raw[1:-1])]
+    if raw in ("true", "false"):
+        return raw == "true"
+    if raw in ("null", "~", ""):
+        return None
+    if re.fullmatch(r"-?\d+", raw):
+        return int(raw)
+    if re.fullmatch(r"-?\d+\.\d*", raw):
+        return float(raw)
+    return raw
+
+
+def _split_flow(body: str) -> List[str]:
+    items, current, quote = [], [], ""
+    for ch in body:
+        if quote:
+            current.append(ch)
+            if ch == quote:
+                quote = ""
+        elif ch in "\"'":
+            quote = ch
+            current.append(ch)
+        elif ch == ",":
+            items.append("".join(current))
+            current = []
+        else:
+            current.append(ch)
+    if "".join(current).strip():
+        items.append("".join(current))
+    return [item.strip() for item in items]
+
+
+class _YamlSubsetParser:
+    """
+    Block mappings, block lists (of scalars or mappings), flow lists, quoted
+    scalars and ``|`` literals: the YAML used by semantic/*.yaml, without a
+    PyYAML dependency.
+    """
+
+    def __init__(self, text: str):
+        self.raw = text.splitlines()
+        self.pos = 0
+
+    def _next(self) -> Optional[_Line]:
+        while self.pos < len(self.raw):
+            line = self.raw[self.pos]
+            stripped = line.strip()
+            if stripped and not stripped.startswith("#"):
+                return _Line(len(line) - len(line.lstrip(" ")), stripped)
+            self.pos += 1
+        return None
+
+    def parse(self) -> Any:
+        line = self._next()
+        return None if line is None else self._block(line.indent)
+
+    def _block(self, indent: int) -> Any:
+        line = self._next()
+        if line is not None and line.content.startswith("-"):
+            return self._list(indent)
+        return self._mapping(indent)
+
+    def _mapping(self, indent: int, first: Optional[str] = None) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        while True:
+            if first is not None:
+                content, first = first, None
+            else:
+                line = self._next()
+                if line is None or line.indent != indent or line.content.startswith("-"):
+                    return out
+                content = line.content
+                self.pos += 1
+            m = _KEY_RE.match(content)
+            if m is None:
+                raise ValueError(f"unsupported YAML line: {content!r}")
+            key, rest = m.group(1).strip(), (m.group(2) or "").strip()
+            if rest in ("|", "|-"):
+                out[key] = self._literal(indent, keep_newline=rest == "|")
+            elif rest:
+                out[key] = _scalar(rest)
+            else:
+                nxt = self._next()
+                if nxt is not None and (nxt.indent > indent or (nxt.indent == indent and nxt.content.startswith("-"))):
+                    out[key] = self._block(nxt.indent)
+                else:
+                    out[key] = None
+
+    def _list(self, indent: int) -> List[Any]:
+        out: List[Any] = []
+        while True:
+            line = self._next()
+            if line is None or line.indent != indent or not line.content.startswith("-"):
+                return out
+            self.pos += 1
+            item = line.content[1:].strip()
+            if not item:
+                nxt = self._next()
+                out.append(self._block(nxt.indent) if nxt is not None and nxt.indent > indent else None)
+            elif _KEY_RE.match(item) and not item.startswith(("[", '"', "'")):
+                # "- key: value" opens a mapping whose keys sit two columns in
+                out.append(self._mapping(indent + 2, first=item))
+            else:
+                out.append(_scalar(item))
+
+    def _literal(self, indent: int, keep_newline: bool) -> str:
+        lines: List[str] = []
+        block_indent: Optional[int] = None
+        while self.pos < len(self.raw):
+            line = self.raw[self.pos]
+            if line.strip():
+                current = len(line) - len(line.lstrip(" "))
+                if current <= indent:
+                    break
+                block_indent = current if block_indent is None else block_indent
+                lines.append(line[block_indent:])
+            else:
+                lines.append("")
+            self.pos += 1
+        while lines and not lines[-1]:
+            lines.pop()
+        return "\n".join(lines) + ("\n" if keep_newline and lines else "")
+
+
+def parse_yaml_subset(text: str) -> Any:
+    return _YamlSubsetParser(text).parse()
+
+
+def _strings(value: Any) -> Tuple[str, ...]:
+    if value is None:
+        return ()
+    if isinstance(value, (list, tuple)):
+        return tuple(str(v) for v in value)
+    return (str(value),)
+
+
+@dataclass(frozen=True)
+class MetricSpec:
+    """
+    Planner/compiler view of one metrics.yaml entry. Membership tests the
+    planner runs per request are precomputed as frozensets.
+    """
+
+    metric_key: str
+    metric_id: str
+    name_zh: str
+    grain: Tuple[str, ...]
+    required_dimensions: Tuple[str, ...]
+    measures: Tuple[str, ...]
+    allowed_group_by: FrozenSet[str]
+    disallowed_group_by: FrozenSet[str]
+    allowed_filters: FrozenSet[str]
+    disallowed_filters: FrozenSet[str]
+    time_supports: FrozenSet[str]
+    default_window: str
+    date_field: str
+    preferred_source: str
+    fallback_sql: str
+    include_status: Tuple[str, ...] = ()
+    # measure -> column in the preferred source, when it differs from the measure name
+    column_mapping: Mapping[str, str] = field(default_factory=dict)
+    # measure -> aggregate over the base tables (calc_rule.expression_sql / <measure>_sql)
+    measure_sql: Mapping[str, str] = field(default_factory=dict)
+    # currency_policy forbids summing across currencies: without a currency filter, group by it
+    split_currency: bool = False
+
+
+def _metric_spec(key: str, raw: Mapping[str, Any], defaults: Mapping[str, Any]) -> MetricSpec:
+    dimensions = raw.get("dimensions") or {}
+    filters = raw.get("filters") or {}
+    time_semantics = raw.get("time_semantics") or {}
+    source = raw.get("source") or {}
+    calc_rule = raw.get("calc_rule") or {}
+    currency_policy = defaults.get("currency_policy") or {}
+    grain = _strings(raw.get("grain"))
+    mapping = {
+        measure: str(column).rsplit(".", 1)[-1]
+        for measure, column in (calc_rule.get("view_column_mapping") or {}).items()
+    }
+    measures = _strings(raw.get("measures"))
+    measure_sql = {m: str(calc_rule[f"{m}_sql"]) for m in measures if calc_rule.get(f"{m}_sql")}
+    if len(measures) == 1 and calc_rule.get("expression_sql"):
+        measure_sql.setdefault(measures[0], str(calc_rule["expression_sql"]))
+    return MetricSpec(
+        metric_key=key,
+        metric_id=str(raw.get("concept_id") or key),
+        name_zh=str(raw.get("name_zh", "")),
+        grain=grain,
+        required_dimensions=_strings(dimensions.get("required")),
+        measures=measures,
+        allowed_group_by=frozenset(_strings(raw.get("allowed_group_by"))),
+        disallowed_group_by=frozenset(_strings(raw.get("disallowed_group_by"))),
+        allowed_filters=frozenset(_strings(filters.get("allowed"))),
+        disallowed_filters=frozenset(_strings(filters.get("disallowed"))),
+        time_supports=frozenset(_strings(time_semantics.get("supports"))),
+        default_window=str(time_semantics.get("default_window") or "latest_available_date"),
+        date_field=str(time_semantics.get("date_field") or "biz_date"),
+        preferred_source=str(source.get("preferred", "")),
+        fallback_sql=str(source.get("fallback_sql", "")),
+        include_status=_strings(calc_rule.get("include_status")),
+        column_mapping=MappingProxyType(mapping),
+        measure_sql=MappingProxyType(measure_sql),
+        split_currency="currency" in grain and not currency_policy.get("allow_cross_currency_aggregation", True),
+    )
+
+
+@dataclass(frozen=True)
+class CompiledMetricSpecs:
+    source_path: str
+    digest: str
+    specs: Mapping[str, MetricSpec]
+
+    def __iter__(self) -> Iterator[MetricSpec]:
+        return iter(self.specs.values())
+
+    def __len__(self) -> int:
+        return len(self.specs)
+
+    def get(self, metric_id: str) -> Optional[MetricSpec]:
+        return self.specs.get(metric_id)
+
+    @cached_property
+    def plan_tables(self) -> Dict[str, "MetricPlanTables"]:
+        from .plan_builder import build_plan_tables
+
+        return build_plan_tables(self)
+
+
+def compile_metric_specs(path: Path, text: str, digest: str) -> CompiledMetricSpecs:
+    document = parse_yaml_subset(text) or {}
+    defaults = document.get("defaults") or {}
+    specs = {}
+    for key, raw in (document.get("metrics") or {}).items():
+        spec = _metric_spec(key, raw or {}, defaults)
+        specs[spec.metric_id] = spec
+    return CompiledMetricSpecs(source_path=str(path), digest=digest, specs=MappingProxyType(specs))
+
+
+_SPEC_CACHE: CompiledFileCache[CompiledMetricSpecs] = CompiledFileCache(compile_metric_specs)
+
+
+def get_metric_specs(metrics_path: str = "semantic/metrics.yaml") -> CompiledMetricSpecs:
+    """Metric specs keyed by concept id (the ids ``metric_hints`` carry); re-parsed only when the file changes."""
+    return _SPEC_CACHE.get(metrics_path)
+
+
+def spec_cache_stats() -> FileCacheStats:
+    return _SPEC_CACHE.stats()
+
+
+def clear_spec_cache() -> None:
+    _SPEC_CACHE.clear()
@@ -0,0 +1,361 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from functools import partial
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from src.normalization.config import NormalizationSettings, get_settings
+from src.normalization.deadline import call_with_deadline
+from src.normalization.llm_enricher import _call_llm
+from src.normalization.metrics import incr, timed
+from src.normalization.text_matcher import KeywordAutomaton
+from src.normalization.validator import validate_semantic_plan
+
+from .metric_specs import CompiledMetricSpecs, MetricSpec, get_metric_specs
+
+PLAN_VERSION = "1.0"
+# metric_id / measure placeholder when the question names no metric; always paired with needs_clarification
+UNRESOLVED = "unresolved"
+
+# phrase -> dimension to group by
+GROUP_BY_PHRASES: Tuple[Tuple[str, str], ...] = (
+    ("各分行", "branch_id"),
+    ("分行", "branch_id"),
+    ("by branch", "branch_id"),
+    ("per branch", "branch_id"),
+    ("分行名稱", "branch_name"),
+    ("各區", "region"),
+    ("區域", "region"),
+    ("by region", "region"),
+    ("各幣別", "currency"),
+    ("幣別", "currency"),
+    ("幣種", "currency"),
+    ("by currency", "currency"),
+    ("各渠道", "channel"),
+    ("渠道", "channel"),
+    ("通路", "channel"),
+    ("by channel", "channel"),
+    ("交易類型", "txn_type"),
+    ("by txn type", "txn_type"),
+    ("每日", "biz_date"),
+    ("每天", "biz_date"),
+    ("逐日", "biz_date"),
+    ("daily", "biz_date"),
+)
+
+# phrase -> (dimension, value) filter
+FILTER_PHRASES: Tuple[Tuple[str, str, str], ...] = (
+    ("澳門半島", "region", "澳門半島"),
+    ("氹仔", "region", "氹仔"),
+    ("路氹城", "region", "路氹城"),
+    ("路環", "region", "路環"),
+    ("mop", "currency", "MOP"),
+    ("澳門幣", "currency", "MOP"),
+    ("澳元", "currency", "MOP"),
+    ("hkd", "currency", "HKD"),
+    ("港幣", "currency", "HKD"),
+    ("港元", "currency", "HKD"),
+    ("atm", "channel", "ATM"),
+    ("櫃檯", "channel", "BRANCH"),
+    ("櫃台", "channel", "BRANCH"),
+    ("手機", "channel", "MOBILE"),
+    ("mobile", "channel", "MOBILE"),
+    ("網銀", "channel", "WEB"),
+    ("網上銀行", "channel", "WEB"),
+    ("api", "channel", "API"),
+    ("提款", "txn_type", "WITHDRAW"),
+    ("轉入", "txn_type", "TRANSFER_IN"),
+    ("轉出", "txn_type", "TRANSFER_OUT"),
+    ("手續費", "txn_type", "FEE"),
+    ("服務費", "txn_type", "FEE"),
+    ("利息", "txn_type", "INTEREST"),
+)
+
+# phrase -> measure; a metric answers with all its measures when none is named
+MEASURE_PHRASES: Tuple[Tuple[str, str], ...] = (
+    ("筆數", "txn_count"),
+    ("次數", "txn_count"),
+    ("count", "txn_count"),
+    ("淨額", "txn_amount_net"),
+    ("金額", "txn_amount_net"),
+    ("net amount", "txn_amount_net"),
+    ("餘額", "total_end_balance"),
+    ("balance", "total_end_balance"),
+)
+
+DETAIL_RISK_FLAGS = ("pii_requested", "account_level_detail_requested", "customer_level_detail_requested")
+
+
+class PlanningError(Exception):
+    pass
+
+
+class PhraseScanner:
+    """
+    Every planner phrase in one automaton. ``scan`` keeps the longest
+    non-overlapping hits, so "分行名稱" is not also read as "分行".
+    """
+
+    def __init__(self):
+        phrases: List[str] = []
+        self.kinds: List[Tuple[str, Tuple[str, ...]]] = []
+        for phrase, dim in GROUP_BY_PHRASES:
+            phrases.append(phrase)
+            self.kinds.append(("group_by", (dim,)))
+        for phrase, dim, value in FILTER_PHRASES:
+            phrases.append(phrase)
+            self.kinds.append(("filter", (dim, value)))
+        for phrase, measure in MEASURE_PHRASES:
+            phrases.append(phrase)
+            self.kinds.append(("measure", (measure,)))
+        self._automaton = KeywordAutomaton(phrases)
+
+    def scan(self, lowered_text: str) -> List[int]:
+        keywords = self._automaton.keywords
+        hits = sorted(self._automaton.finditer(lowered_text), key=lambda hit: (hit[0], -len(keywords[hit[1]])))
+        kept: List[int] = []
+        covered_to = 0
+        for start, phrase_id in hits:
+            if start >= covered_to:
+                kept.append(phrase_id)
+                covered_to = start + len(keywords[phrase_id])
+        return kept
+
+
+SCANNER = PhraseScanner()
+
+
+@dataclass(frozen=True)
+class MetricPlanTables:
+    """Phrase ids a metric can use, resolved once per catalog version."""
+
+    spec: MetricSpec
+    group_by: Mapping[int, str]
+    filters: Mapping[int, Tuple[str, str]]
+    measures: Mapping[int, str]
+    # filter / group-by phrases for dimensions this metric cannot filter or group on
+    rejected_filters: Mapping[int, Tuple[str, str]] = field(default_factory=dict)
+    rejected_group_by: Mapping[int, str] = field(default_factory=dict)
+
+    def relevance(self, phrase_ids: Sequence[int]) -> int:
+        return sum(1 for i in phrase_ids if i in self.group_by or i in self.filters or i in self.measures)
+
+
+def build_plan_tables(specs: CompiledMetricSpecs) -> Dict[str, MetricPlanTables]:
+    tables: Dict[str, MetricPlanTables] = {}
+    for spec in specs:
+        group_by: Dict[int, str] = {}
+        filters: Dict[int, Tuple[str, str]] = {}
+        rejected: Dict[int, Tuple[str, str]] = {}
+        rejected_group_by: Dict[int, str] = {}
+        measures: Dict[int, str] = {}
+        for phrase_id, (kind, payload) in enumerate(SCANNER.kinds):
+            if kind == "group_by":
+                (group_by if payload[0] in spec.allowed_group_by else rejected_group_by)[phrase_id] = payload[0]
+            elif kind == "filter":
+                (filters if payload[0] in spec.allowed_filters else rejected)[phrase_id] = payload
+            elif kind == "measure" and payload[0] in spec.measures:
+                measures[phrase_id] = payload[0]
+        tables[spec.metric_id] = MetricPlanTables(spec, group_by, filters, measures, rejected, rejected_group_by)
+    return tables
+
+
+@dataclass
+class _Draft:
+    assumptions: List[str] = field(default_factory=list)
+    uncertain: int = 0
+    clarification: Optional[str] = None
+
+    def assume(self, text: str, uncertain: bool = False) -> None:
+        self.assumptions.append(text)
+        self.uncertain += uncertain
+
+    def ask(self, question: str) -> None:
+        # the first blocking problem is the one worth asking about
+        if self.clarification is None:
+            self.clarification = question
+
+
+def _request_date(normalized: Mapping[str, Any]) -> date:
+    request_ts = (normalized.get("request_context") or {}).get("request_ts")
+    if isinstance(request_ts, str):
+        try:
+            return datetime.fromisoformat(request_ts).date()
+        except ValueError:
+            pass
+    return date.today()
+
+
+def _disambiguation_prompt(text: str, candidates: Sequence[MetricSpec]) -> str:
+    options = [{"metric_id": spec.metric_id, "name_zh": spec.name_zh, "measures": list(spec.measures)} for spec in candidates]
+    return (
+        "Choose the single metric that answers the question. "
+        'Reply with JSON only: {"metric_id": "<one of the candidate ids>"}.\n'
+        f"question: {text}\n"
+        f"candidates: {json.dumps(options, ensure_ascii=False)}"
+    )
+
+
+def _ask_llm_for_metric(
+    text: str, candidates: Sequence[MetricSpec], llm_client: Any, settings: NormalizationSettings
+) -> Optional[MetricSpec]:
+    incr("plan.llm_disambiguation")
+    prompt = _disambiguation_prompt(text, candidates)
+    timeout = settings.completion_timeout_seconds
+    try:
+        with timed("plan.llm_call"):
+            raw = call_with_deadline(partial(_call_llm, llm_client, prompt, timeout), timeout)
+        chosen = json.loads(raw).get("metric_id")
+    except Exception:
+        incr("plan.llm_disambiguation_failed")
+        return None
+    return next((spec for spec in candidates if spec.metric_id == chosen), None)
+
+
+def _choose_metric(
+    normalized: Mapping[str, Any],
+    text: str,
+    phrase_ids: Sequence[int],
+    tables: Mapping[str, MetricPlanTables],
+    llm_client: Any,
+    settings: NormalizationSettings,
+    draft: _Draft,
+) -> Optional[MetricPlanTables]:
+    hints = [h for h in dict.fromkeys(normalized.get("metric_hints") or []) if h in tables]
+    if len(hints) == 1:
+        return tables[hints[0]]
+
+    # no or several candidates: the question's dimensions/filters/measures usually fit only one metric
+    scored = sorted(((tables[h].relevance(phrase_ids), h) for h in hints or tables), key=lambda item: -item[0])
+    if scored and scored[0][0] > 0 and (len(scored) == 1 or scored[0][0] > scored[1][0]):
+        chosen = tables[scored[0][1]]
+        draft.assume(f"依查詢條件選用指標 {chosen.spec.name_zh}", uncertain=True)
+        return chosen
+    if not hints:
+        draft.ask("請問要查詢哪一個指標？例如：" + "、".join(t.spec.name_zh for t in tables.values()))
+        return None
+
+    candidates = [tables[h].spec for h in hints]
+    if llm_client is not None and settings.completion_enabled:
+        spec = _ask_llm_for_metric(text, candidates, llm_client, settings)
+        if spec is not None:
+            draft.assume(f"指標由 LLM 從候選中選定：{spec.name_zh}", uncertain=True)
+            return tables[spec.metric_id]
+
+    draft.ask("請問要查詢哪一個指標：" + "、".join(spec.name_zh for spec in candidates) + "？")
+    return None
+
+
+def _time_window(normalized: Mapping[str, Any], spec: Optional[MetricSpec], draft: _Draft) -> Dict[str, str]:
+    resolved = (normalized.get("time_context") or {}).get("resolved")
+    if isinstance(resolved, dict):
+        window = {"type": resolved["type"], "start_date": resolved["start_date"], "end_date": resolved["end_date"]}
+        if spec is not None and window["type"] not in spec.time_supports and "date_range" in spec.time_supports:
+            draft.assume(f"此指標不支援 {window['type']}，改以同區間 date_range 查詢")
+            window["type"] = "date_range"
+        return window
+
+    ref = _request_date(normalized).isoformat()
+    default_window = spec.default_window if spec is not None else "latest_available_date"
+    draft.assume(f"未指定時間，使用 {default_window}（不晚於 {ref}）", uncertain=True)
+    return {"type": default_window, "start_date": ref, "end_date": ref}
+
+
+def _ordered(dims: Sequence[str], spec: MetricSpec) -> List[str]:
+    order = {dim: idx for idx, dim in enumerate((spec.date_field, *spec.grain))}
+    return sorted(dict.fromkeys(dims), key=lambda dim: (order.get(dim, len(order)), dim))
+
+
+def build_semantic_plan(
+    normalized: Mapping[str, Any],
+    *,
+    metrics_path: str = "semantic/metrics.yaml",
+    llm_client: Any = None,
+    settings: Optional[NormalizationSettings] = None,
+) -> Dict[str, Any]:
+    """
+    Map a NormalizedRequest onto a SemanticPlan using the metric specs in
+    ``metrics_path``. Fully rule-driven; ``llm_client`` is only asked to pick
+    between several candidate metrics that the question's wording cannot
+    separate. Problems that need the user (no metric, detail/PII requests,
+    regions outside ``allowed_regions``) set ``needs_clarification``.
+    """
+    settings = settings or get_settings()
+    incr("plan.requests")
+    with timed("plan.build"):
+        specs = get_metric_specs(metrics_path)
+        tables = specs.plan_tables
+        query = normalized.get("query_context") or {}
+        text = str(query.get("normalized_text") or query.get("raw_text") or "")
+        phrase_ids = SCANNER.scan(text.lower())
+        draft = _Draft()
+
+        risk_flags = (normalized.get("risk_context") or {}).get("risk_flags") or []
+        if any(flag in risk_flags for flag in DETAIL_RISK_FLAGS) or query.get("intent") == "detail_request":
+            draft.ask("僅能提供聚合結果，無法輸出帳戶／客戶明細或個人資料；是否改為按分行、日期彙總？")
+
+        chosen = _choose_metric(normalized, text, phrase_ids, tables, llm_client, settings, draft)
+        spec = chosen.spec if chosen is not None else None
+        time_window = _time_window(normalized, spec, draft)
+
+        filters: Dict[str, str] = {}
+        group_by: List[str] = []
+        measures: List[str] = []
+        if chosen is not None:
+            values: Dict[str, List[str]] = {}
+            for phrase_id in phrase_ids:
+                if phrase_id in chosen.group_by:
+                    group_by.append(chosen.group_by[phrase_id])
+                elif phrase_id in chosen.rejected_group_by:
+                    draft.assume(f"此指標無法按 {chosen.rejected_group_by[phrase_id]} 分組，已忽略", uncertain=True)
+                elif phrase_id in chosen.filters:
+                    dim, value = chosen.filters[phrase_id]
+                    values.setdefault(dim, [])
+                    if value not in values[dim]:
+                        values[dim].append(value)
+                elif phrase_id in chosen.rejected_filters:
+                    dim, value = chosen.rejected_filters[phrase_id]
+                    draft.assume(f"{dim}={value} 不適用於此指標，已忽略", uncertain=True)
+                elif phrase_id in chosen.measures:
+                    measures.append(chosen.measures[phrase_id])
+
+            for dim, dim_values in values.items():
+                # filters hold scalars: several values become an IN list, reported per value
+                filters[dim] = ",".join(dim_values)
+                if len(dim_values) > 1:
+                    group_by.append(dim)
+
+            allowed_regions = (normalized.get("user_context") or {}).get("allowed_regions") or []
+            denied = [v for v in values.get("region", []) if allowed_regions and v not in allowed_regions]
+            if denied:
+                draft.ask(f"您沒有查詢 {'、'.join(denied)} 的權限，是否改查 {'、'.join(allowed_regions)}？")
+
+            group_by.extend(spec.required_dimensions)
+            if spec.split_currency and len(values.get("currency", [])) != 1 and "currency" not in group_by:
+                group_by.append("currency")
+                draft.assume("不同幣別不可直接加總，結果按幣別分列")
+            group_by = _ordered(group_by, spec)
+            measures = list(dict.fromkeys(measures)) or list(spec.measures)
+
+        plan = {
+            "plan_version": PLAN_VERSION,
+            "request_id": str(normalized.get("request_id") or UNRESOLVED),
+            "metric_id": spec.metric_id if spec is not None else UNRESOLVED,
+            "filters": filters,
+            "group_by": group_by,
+            "measures": measures or [UNRESOLVED],
+            "time_window": time_window,
+            "assumptions": draft.assumptions,
+            "confidence": round(max(0.0, 1.0 - 0.15 * draft.uncertain), 2) if draft.clarification is None else 0.0,
+            "needs_clarification": draft.clarification is not None,
+            "clarification_question": draft.clarification,
+        }
+
+    if plan["needs_clarification"]:
+        incr("plan.needs_clarification")
+    ok, errors = validate_semantic_plan(plan)
+    if not ok:
+        raise PlanningError("; ".join(errors))
+    return plan
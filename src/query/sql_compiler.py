@@ -0,0 +1,389 @@
+from __future__ import annotations
+
+import calendar
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import date
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+
+from src.normalization.metrics import incr, timed
+
+from .metric_specs import MetricSpec, get_metric_specs
+
+# MySQL drivers (PyMySQL, mysqlclient) use the "format" paramstyle
+PARAM = "%s"
+
+_TABLE_REF_RE = re.compile(r"\b([A-Za-z_][A-Za-z0-9_]*)\.")
+_YYYY_MM_RE = re.compile(r"^(\d{4})-(\d{1,2})$")
+
+
+class CompileError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Join:
+    table: str
+    on: str
+
+
+@dataclass(frozen=True)
+class SourceSpec:
+    """
+    One relation a metric can be answered from. ``columns`` maps plan
+    dimensions to SQL expressions and ``date_column`` is the indexed date
+    column the time predicate is pushed onto. Joins are only emitted when a
+    selected column, predicate or later join references their table.
+    """
+
+    name: str
+    columns: Mapping[str, str]
+    date_column: str
+    cost: int
+    joins: Tuple[Join, ...] = ()
+    # views already hold the metric's aggregates; measures are re-summed view columns
+    pre_aggregated: bool = False
+    # base rejoins apply the metric's include_status on this column
+    status_column: Optional[str] = None
+    # summary table kept in sync with a view by src/query/materialize.py
+    materialized: bool = False
+
+
+def _view(name: str, *dims: str) -> SourceSpec:
+    return SourceSpec(name, {dim: dim for dim in dims}, "biz_date", cost=1, pre_aggregated=True)
+
+
+VIEW_SOURCES: Dict[str, SourceSpec] = {
+    view.name: view
+    for view in (
+        _view("vw_kpi_deposit_balance_by_branch_date", "biz_date", "branch_id", "branch_name", "region", "currency"),
+        _view("vw_kpi_txn_by_channel_date", "biz_date", "channel"),
+    )
+}
+
+# base-table rejoin behind each view, for plans the view's grain or filters cannot answer
+BASE_SOURCES: Dict[str, SourceSpec] = {
+    "vw_kpi_deposit_balance_by_branch_date": SourceSpec(
+        "fact_account_balance_daily",
+        {
+            "biz_date": "fact_account_balance_daily.biz_date",
+            "branch_id": "core_account.branch_id",
+            "branch_name": "dim_branch.branch_name",
+            "region": "dim_branch.region",
+            "currency": "core_account.currency",
+        },
+        # leading column of PRIMARY KEY (biz_date, account_id)
+        "fact_account_balance_daily.biz_date",
+        cost=10,
+        joins=(
+            Join("core_account", "core_account.account_id = fact_account_balance_daily.account_id"),
+            Join("dim_branch", "dim_branch.branch_id = core_account.branch_id"),
+        ),
+        status_column="core_account.status",
+    ),
+    "vw_kpi_txn_by_channel_date": SourceSpec(
+        "fact_transaction",
+        {
+            "biz_date": "fact_transaction.biz_date",
+            "channel": "fact_transaction.channel",
+            "txn_type": "fact_transaction.txn_type",
+        },
+        # idx_txn_date (biz_date); idx_txn_type (txn_type, biz_date) when txn_type is filtered
+        "fact_transaction.biz_date",
+        cost=10,
+    ),
+}
+
+
+
+def materialized_source(view: str, table: str, status_column: Optional[str] = None) -> SourceSpec:
+    """
+    Source for a summary table holding ``view``'s columns (plus ``status_column``
+    when it keeps rows per account status). Routes are passed to compile_plan
+    per database, since only the connection that maintains the table has it.
+    """
+    return replace(VIEW_SOURCES[view], name=table, cost=0, status_column=status_column, materialized=True)
+
+
+@dataclass(frozen=True)
+class SqlTemplate:
+    """
+    Compiled SQL for one plan shape. ``slots`` say where each ``%s`` takes
+    its value from: ("time", "start_date"|"end_date"), ("filter", dim, i),
+    ("month_start"|"month_end", dim, i) or ("const", value).
+    """
+
+    sql: str
+    source: str
+    slots: Tuple[Tuple[Any, ...], ...]
+
+
+@dataclass(frozen=True)
+class CompiledQuery:
+    sql: str
+    params: Tuple[Any, ...]
+    source: str
+
+
+@dataclass(frozen=True)
+class TemplateCacheStats:
+    hits: int
+    misses: int
+    entries: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class TemplateCache:
+    """LRU of compiled SQL templates keyed by plan shape (everything but the bound values)."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Hashable, SqlTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: Hashable) -> Optional[SqlTemplate]:
+        with self._lock:
+            template = self._entries.get(key)
+            if template is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return template
+
+    def put(self, key: Hashable, template: SqlTemplate) -> None:
+        with self._lock:
+            self._entries[key] = template
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> TemplateCacheStats:
+        with self._lock:
+            return TemplateCacheStats(self._hits, self._misses, len(self._entries))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = 0
+
+
+_TEMPLATES = TemplateCache()
+
+
+def template_cache_stats() -> TemplateCacheStats:
+    return _TEMPLATES.stats()
+
+
+def clear_template_cache() -> None:
+    _TEMPLATES.clear()
+
+
+def _time_shape(time_window: Mapping[str, str]) -> str:
+    if time_window["type"] == "latest_available_date":
+        return "latest"
+    return "eq" if time_window["start_date"] == time_window["end_date"] else "range"
+
+
+def _filter_values(filters: Mapping[str, Any]) -> Dict[str, List[str]]:
+    # the planner joins several values of one dimension with commas (an IN list)
+    values = {dim: [part.strip() for part in str(value).split(",") if part.strip()] for dim, value in filters.items()}
+    return {dim: parts for dim, parts in values.items() if parts}
+
+
+def _sources_for(spec: MetricSpec, routes: Mapping[str, SourceSpec]) -> List[SourceSpec]:
+    sources = [
+        routes.get(spec.preferred_source),
+        VIEW_SOURCES.get(spec.preferred_source),
+        BASE_SOURCES.get(spec.preferred_source),
+    ]
+    return sorted((source for source in sources if source is not None), key=lambda source: source.cost)
+
+
+def _measure_sql(spec: MetricSpec, source: SourceSpec, measure: str) -> Optional[str]:
+    if source.pre_aggregated:
+        return f"SUM({spec.column_mapping.get(measure, measure)})"
+    return spec.measure_sql.get(measure)
+
+
+def _covers(spec: MetricSpec, source: SourceSpec, dims: Sequence[str], measures: Sequence[str]) -> bool:
+    # a source that cannot apply include_status (the vw_kpi_* views sum every account) would overcount
+    if spec.include_status and not source.status_column:
+        return False
+    return all(dim in source.columns for dim in dims) and all(_measure_sql(spec, source, m) for m in measures)
+
+
+def month_bounds(value: str) -> Tuple[date, date]:
+    """First and last day of a ``YYYY-MM`` filter value."""
+    match = _YYYY_MM_RE.match(value)
+    year, month = (int(part) for part in match.groups()) if match else (0, 0)
+    if not (1 <= year <= 9999 and 1 <= month <= 12):
+        raise CompileError(f"yyyy_mm filter must look like YYYY-MM, got {value!r}")
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _date_column(source: SourceSpec, dim: str) -> str:
+    return source.date_column if dim in ("biz_date", "yyyy_mm") else source.columns[dim]
+
+
+def _latest_date_sql(spec: MetricSpec, source: SourceSpec) -> str:
+    # MAX over the base fact table's date index, not over the (aggregating) view; a summary
+    # table answers from its own dates so a refresh in flight never points at a missing day
+    base = source if source.materialized else BASE_SOURCES.get(spec.preferred_source, source)
+    column = base.date_column
+    table = column.split(".", 1)[0] if "." in column else base.name
+    return f"(SELECT MAX({column}) FROM {table} WHERE {column} <= {PARAM})"
+
+
+def _joins(source: SourceSpec, expressions: Sequence[str]) -> List[Join]:
+    needed = {table for expr in expressions for table in _TABLE_REF_RE.findall(expr)}
+    kept: List[Join] = []
+    for join in reversed(source.joins):
+        if join.table in needed:
+            kept.append(join)
+            needed.update(_TABLE_REF_RE.findall(join.on))
+    return kept[::-1]
+
+
+def check_allowed(spec: MetricSpec, group_by: Sequence[str], filter_dims: Sequence[str], measures: Sequence[str]) -> None:
+    """Raise CompileError unless metrics.yaml allows every group_by, filter and measure of the plan."""
+    bad_group_by = [d for d in group_by if d not in spec.allowed_group_by or d in spec.disallowed_group_by]
+    bad_filters = [d for d in filter_dims if d not in spec.allowed_filters or d in spec.disallowed_filters]
+    bad_measures = [m for m in measures if m not in spec.measures]
+    if bad_group_by or bad_filters or bad_measures:
+        raise CompileError(
+            f"plan not allowed for {spec.metric_id}: group_by={bad_group_by} filters={bad_filters} measures={bad_measures}"
+        )
+
+
+def resolve_spec(plan: Mapping[str, Any], metrics_path: str) -> Tuple[str, MetricSpec]:
+    """(metrics.yaml digest, spec) for a plan that is ready to run."""
+    if plan.get("needs_clarification"):
+        raise CompileError(f"plan needs clarification: {plan.get('clarification_question')}")
+    specs = get_metric_specs(metrics_path)
+    spec = specs.get(str(plan.get("metric_id")))
+    if spec is None:
+        raise CompileError(f"unknown metric_id: {plan.get('metric_id')!r}")
+    return specs.digest, spec
+
+
+def _build_template(
+    spec: MetricSpec,
+    group_by: Sequence[str],
+    filter_counts: Sequence[Tuple[str, int]],
+    measures: Sequence[str],
+    time_shape: str,
+    routes: Mapping[str, SourceSpec],
+) -> SqlTemplate:
+    check_allowed(spec, group_by, [d for d, _ in filter_counts], measures)
+    dims = [*group_by, *(d for d, _ in filter_counts if d not in ("biz_date", "yyyy_mm"))]
+    source = next((s for s in _sources_for(spec, routes) if _covers(spec, s, dims, measures)), None)
+    if source is None:
+        raise CompileError(f"no source for {spec.metric_id} covers dimensions {dims} and measures {list(measures)}")
+
+    select = [f"{source.columns[d]} AS {d}" if source.columns[d] != d else d for d in group_by]
+    select += [f"{_measure_sql(spec, source, m)} AS {m}" for m in measures]
+
+    # the date predicate comes first and stays on the bare indexed column so MySQL can range-scan
+    where: List[str] = []
+    slots: List[Tuple[Any, ...]] = []
+    if time_shape == "latest":
+        where.append(f"{source.date_column} = {_latest_date_sql(spec, source)}")
+        slots.append(("time", "end_date"))
+    elif time_shape == "eq":
+        where.append(f"{source.date_column} = {PARAM}")
+        slots.append(("time", "start_date"))
+    else:
+        where.append(f"{source.date_column} BETWEEN {PARAM} AND {PARAM}")
+        slots += [("time", "start_date"), ("time", "end_date")]
+
+    for dim, count in filter_counts:
+        column = _date_column(source, dim)
+        if dim == "yyyy_mm":
+            # one range per month keeps every branch on the bare indexed date column
+            ranges = [f"{column} BETWEEN {PARAM} AND {PARAM}"] * count
+            where.append(ranges[0] if count == 1 else "(" + " OR ".join(ranges) + ")")
+            for i in range(count):
+                slots += [("month_start", dim, i), ("month_end", dim, i)]
+        elif count == 1:
+            where.append(f"{column} = {PARAM}")
+            slots.append(("filter", dim, 0))
+        else:
+            where.append(f"{column} IN ({', '.join([PARAM] * count)})")
+            slots += [("filter", dim, i) for i in range(count)]
+
+    if source.status_column and spec.include_status:
+        where.append(f"{source.status_column} IN ({', '.join([PARAM] * len(spec.include_status))})")
+        slots += [("const", status) for status in spec.include_status]
+
+    group_columns = [source.columns[d] for d in group_by]
+    joins = _joins(source, [*select, *where, *group_columns])
+    lines = ["SELECT " + ", ".join(select), f"FROM {source.name}"]
+    lines += [f"JOIN {join.table} ON {join.on}" for join in joins]
+    lines.append("WHERE " + " AND ".join(where))
+    if group_by:
+        lines.append("GROUP BY " + ", ".join(group_columns))
+        lines.append("ORDER BY " + ", ".join(group_columns))
+    return SqlTemplate("\n".join(lines), source.name, tuple(slots))
+
+
+def _bind(template: SqlTemplate, time_window: Mapping[str, str], values: Mapping[str, List[str]]) -> Tuple[Any, ...]:
+    params: List[Any] = []
+    for slot in template.slots:
+        kind = slot[0]
+        if kind == "time":
+            params.append(time_window[slot[1]])
+        elif kind == "filter":
+            params.append(values[slot[1]][slot[2]])
+        elif kind in ("month_start", "month_end"):
+            first, last = month_bounds(values[slot[1]][slot[2]])
+            params.append((first if kind == "month_start" else last).isoformat())
+        else:
+            params.append(slot[1])
+    return tuple(params)
+
+
+def compile_plan(
+    plan: Mapping[str, Any],
+    *,
+    metrics_path: str = "semantic/metrics.yaml",
+    routes: Optional[Mapping[str, SourceSpec]] = None,
+) -> CompiledQuery:
+    """
+    Compile a SemanticPlan into parameterized MySQL. The cheapest source that
+    covers the plan's dimensions and measures wins (a summary table from
+    ``routes``, keyed by the view it replaces, then the metric's vw_kpi_*
+    view, else the base-table rejoin behind it). Templates are cached by plan
+    shape, route and metrics.yaml digest; repeated shapes only bind parameters.
+    """
+    digest, spec = resolve_spec(plan, metrics_path)
+    values = _filter_values(plan.get("filters") or {})
+    time_window = plan["time_window"]
+    routes = routes or {}
+    route = routes.get(spec.preferred_source)
+    key = (
+        digest,
+        spec.metric_id,
+        tuple(plan.get("group_by") or ()),
+        tuple((dim, len(values[dim])) for dim in sorted(values)),
+        tuple(plan["measures"]),
+        _time_shape(time_window),
+        (route.name, route.status_column) if route else None,
+    )
+    template = _TEMPLATES.get(key)
+    if template is None:
+        incr("sql.template_miss")
+        with timed("sql.compile"):
+            template = _build_template(spec, key[2], key[3], key[4], key[5], routes)
+        _TEMPLATES.put(key, template)
+    else:
+        incr("sql.template_hit")
+    return CompiledQuery(template.sql, _bind(template, time_window, values), template.source)
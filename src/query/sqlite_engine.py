@@ -0,0 +1,487 @@
+from __future__ import annotations
+
+import os
+import random
+import re
+import sqlite3
+import threading
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from src.normalization.file_cache import CompiledFileCache
+from src.normalization.metrics import timed
+
+from .sql_compiler import PARAM, CompiledQuery, SourceSpec, compile_plan
+
+DEFAULT_SQL_PATH = "exmaple_data.sql"
+
+_CREATE_TABLE_RE = re.compile(r"^CREATE\s+TABLE\s+(\w+)\s*\((.*)\)\s*(?:ENGINE\s*=\s*\w+)?\s*$", re.I | re.S)
+_CREATE_VIEW_RE = re.compile(r"^CREATE\s+(?:OR\s+REPLACE\s+)?VIEW\s+(\w+)\s+AS\s+(.*)$", re.I | re.S)
+_INSERT_RE = re.compile(r"^INSERT\s+INTO\s+(\w+)", re.I)
+_INDEX_RE = re.compile(r"^(?:INDEX|KEY)\s+(\w+)\s*\(([^)]*)\)$", re.I)
+_FK_RE = re.compile(r"^CONSTRAINT\s+(\w+)\s+FOREIGN\s+KEY\s*\(([^)]*)\)", re.I)
+_PK_RE = re.compile(r"^PRIMARY\s+KEY\s*\(([^)]*)\)$", re.I)
+_SKIPPED_RE = re.compile(r"^(?:DROP\s+DATABASE|CREATE\s+DATABASE|USE|SET)\b", re.I)
+
+
+@dataclass(frozen=True)
+class TranslatedScript:
+    """exmaple_data.sql rewritten for SQLite, grouped so bulk loads can run before indexing."""
+
+    source_path: str
+    digest: str
+    tables: Tuple[str, ...]
+    inserts: Tuple[Tuple[str, str], ...]
+    indexes: Tuple[str, ...]
+    views: Tuple[str, ...]
+
+
+def split_statements(script: str) -> Iterator[str]:
+    """Split on ``;`` outside string literals, dropping ``--`` comments."""
+    current: List[str] = []
+    quote = ""
+    i = 0
+    while i < len(script):
+        ch = script[i]
+        if quote:
+            current.append(ch)
+            if ch == quote:
+                quote = ""
+        elif ch == "'" or ch == '"':
+            quote = ch
+            current.append(ch)
+        elif script.startswith("--", i):
+            end = script.find("\n", i)
+            i = len(script) if end < 0 else end
+            continue
+        elif ch == ";":
+            statement = "".join(current).strip()
+            if statement:
+                yield statement
+            current = []
+        else:
+            current.append(ch)
+        i += 1
+    statement = "".join(current).strip()
+    if statement:
+        yield statement
+
+
+def _split_items(body: str) -> List[str]:
+    items, current, depth, quote = [], [], 0, ""
+    for ch in body:
+        if quote:
+            quote = "" if ch == quote else quote
+        elif ch == "'":
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            items.append("".join(current).strip())
+            current = []
+            continue
+        current.append(ch)
+    if "".join(current).strip():
+        items.append("".join(current).strip())
+    return items
+
+
+def _columns(raw: str) -> Tuple[str, ...]:
+    return tuple(col.strip() for col in raw.split(","))
+
+
+def _translate_table(name: str, body: str) -> Tuple[str, List[str]]:
+    columns: List[str] = []
+    indexes: List[str] = []
+    # leading columns already indexed; InnoDB adds an index for every FK without one, SQLite does not
+    indexed: List[Tuple[str, ...]] = []
+    foreign_keys: List[Tuple[str, Tuple[str, ...]]] = []
+    for item in _split_items(body):
+        index = _INDEX_RE.match(item)
+        if index:
+            indexes.append(f"CREATE INDEX IF NOT EXISTS {index.group(1)} ON {name} ({index.group(2)})")
+            indexed.append(_columns(index.group(2)))
+            continue
+        pk = _PK_RE.match(item)
+        if pk:
+            indexed.append(_columns(pk.group(1)))
+        fk = _FK_RE.match(item)
+        if fk:
+            foreign_keys.append((fk.group(1), _columns(fk.group(2))))
+        if re.search(r"\bPRIMARY\s+KEY\b", item, re.I) and not pk:
+            indexed.append((item.split()[0],))
+        item = re.sub(r"\bENUM\s*\([^)]*\)", "TEXT", item, flags=re.I)
+        # INTEGER PRIMARY KEY makes the key the rowid instead of a second b-tree
+        item = re.sub(r"\b(?:BIG)?INT\s+PRIMARY\s+KEY\b", "INTEGER PRIMARY KEY", item, flags=re.I)
+        columns.append(item)
+
+    for constraint, cols in foreign_keys:
+        if not any(existing[: len(cols)] == cols for existing in indexed):
+            indexes.append(f"CREATE INDEX IF NOT EXISTS {constraint} ON {name} ({', '.join(cols)})")
+            indexed.append(cols)
+    return f"CREATE TABLE {name} (\n  " + ",\n  ".join(columns) + "\n)", indexes
+
+
+def translate_mysql_script(path: Path, text: str, digest: str) -> TranslatedScript:
+    tables: List[str] = []
+    inserts: List[Tuple[str, str]] = []
+    indexes: List[str] = []
+    views: List[str] = []
+    for statement in split_statements(text):
+        if _SKIPPED_RE.match(statement):
+            continue
+        table = _CREATE_TABLE_RE.match(statement)
+        if table:
+            ddl, table_indexes = _translate_table(table.group(1), table.group(2))
+            tables.append(ddl)
+            indexes.extend(table_indexes)
+            continue
+        view = _CREATE_VIEW_RE.match(statement)
+        if view:
+            views.append(f"CREATE VIEW {view.group(1)} AS {view.group(2)}")
+            continue
+        insert = _INSERT_RE.match(statement)
+        if insert:
+            inserts.append((insert.group(1), statement))
+            continue
+        raise ValueError(f"unsupported statement in {path}: {statement[:60]!r}")
+    return TranslatedScript(str(path), digest, tuple(tables), tuple(inserts), tuple(indexes), tuple(views))
+
+
+_SCRIPT_CACHE: CompiledFileCache[TranslatedScript] = CompiledFileCache(translate_mysql_script)
+
+
+def get_translated_script(sql_path: str = DEFAULT_SQL_PATH) -> TranslatedScript:
+    return _SCRIPT_CACHE.get(sql_path)
+
+
+@dataclass(frozen=True)
+class SyntheticScale:
+    """Replaces the seed rows with ``branches`` x ``days`` x ``accounts`` generated data."""
+
+    branches: int = 4
+    days: int = 31
+    accounts: int = 100
+    txns_per_account_day: float = 1.0
+    loans: Optional[int] = None
+    start_date: str = "2026-01-01"
+    seed: int = 7
+
+    @classmethod
+    def parse(cls, spec: str) -> "SyntheticScale":
+        """``"N,M,K"`` -> branches, days, accounts."""
+        branches, days, accounts = (int(part) for part in spec.split(","))
+        return cls(branches=branches, days=days, accounts=accounts)
+
+    def describe(self) -> str:
+        return ",".join(f"{key}={value}" for key, value in asdict(self).items())
+
+
+REGIONS = ("澳門半島", "氹仔", "路氹城", "路環")
+CHANNELS = ("BRANCH", "ATM", "MOBILE", "WEB", "API")
+TXN_TYPES = ("DEPOSIT", "WITHDRAW", "TRANSFER_IN", "TRANSFER_OUT", "FEE", "INTEREST")
+# seed tables kept as-is when scaling
+_STATIC_TABLES = frozenset({"dim_product"})
+_BATCH = 5_000
+
+
+def _batched(rows: Iterable[Sequence[Any]]) -> Iterator[List[Sequence[Any]]]:
+    batch: List[Sequence[Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= _BATCH:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert_rows(conn: sqlite3.Connection, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> None:
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    for batch in _batched(rows):
+        conn.executemany(sql, batch)
+
+
+def _load_synthetic(conn: sqlite3.Connection, scale: SyntheticScale) -> None:
+    rng = random.Random(scale.seed)
+    start = date.fromisoformat(scale.start_date)
+    days = [start + timedelta(days=i) for i in range(scale.days)]
+    day_strs = [d.isoformat() for d in days]
+
+    _insert_rows(
+        conn,
+        "dim_branch",
+        ("branch_id", "branch_code", "branch_name", "region", "city", "opened_date"),
+        (
+            (b, f"MO-SYN-{b:04d}", f"合成分行{b:04d}", REGIONS[(b - 1) % len(REGIONS)], "澳門", "2010-01-01")
+            for b in range(1, scale.branches + 1)
+        ),
+    )
+    _insert_rows(
+        conn,
+        "dim_calendar",
+        ("biz_date", "year", "month", "day", "yyyy_mm", "is_month_end"),
+        (
+            (d.isoformat(), d.year, d.month, d.day, d.strftime("%Y-%m"), int((d + timedelta(days=1)).day == 1))
+            for d in days
+        ),
+    )
+
+    accounts = []
+    for i in range(scale.accounts):
+        account_id = 20001 + i
+        status = rng.choices(("ACTIVE", "FROZEN", "CLOSED"), (90, 5, 5))[0]
+        accounts.append(
+            (
+                account_id,
+                f"ACCT-SYN-{i:07d}",
+                10001 + i,
+                rng.randint(1, scale.branches),
+                rng.choice((101, 102, 103)),
+                "MOP" if rng.random() < 0.7 else "HKD",
+                status,
+                "2025-01-01 09:00:00",
+            )
+        )
+    _insert_rows(
+        conn,
+        "core_customer",
+        ("customer_id", "customer_no", "full_name", "id_no"),
+        ((10001 + i, f"CUST-SYN-{i:07d}", f"合成客戶{i}", f"S{i:07d}") for i in range(scale.accounts)),
+    )
+    _insert_rows(
+        conn,
+        "core_account",
+        ("account_id", "account_no", "customer_id", "branch_id", "product_id", "currency", "status", "opened_at"),
+        accounts,
+    )
+
+    opening = [round(rng.uniform(1_000, 500_000), 2) for _ in accounts]
+
+    def balances() -> Iterator[Tuple[Any, ...]]:
+        current = list(opening)
+        for day in day_strs:
+            for idx, account in enumerate(accounts):
+                current[idx] = round(max(0.0, current[idx] + rng.uniform(-2_000, 2_000)), 2)
+                hold = 0.0 if account[6] != "FROZEN" else current[idx]
+                yield (day, account[0], current[idx], current[idx] - hold, hold)
+
+    _insert_rows(
+        conn,
+        "fact_account_balance_daily",
+        ("biz_date", "account_id", "end_balance", "available_bal", "hold_amount"),
+        balances(),
+    )
+
+    per_day = max(0, round(scale.accounts * scale.txns_per_account_day))
+
+    def transactions() -> Iterator[Tuple[Any, ...]]:
+        txn_id = 90001
+        for day in day_strs:
+            for _ in range(per_day):
+                txn_type = rng.choice(TXN_TYPES)
+                amount = round(rng.uniform(10, 20_000), 2)
+                if txn_type in ("WITHDRAW", "TRANSFER_OUT", "FEE"):
+                    amount = -amount
+                seconds = rng.randrange(86_400)
+                yield (
+                    txn_id,
+                    day,
+                    accounts[rng.randrange(len(accounts))][0],
+                    f"{day} {seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}",
+                    txn_type,
+                    rng.choice(CHANNELS),
+                    amount,
+                )
+                txn_id += 1
+
+    _insert_rows(
+        conn,
+        "fact_transaction",
+        ("txn_id", "biz_date", "account_id", "txn_ts", "txn_type", "channel", "amount"),
+        transactions(),
+    )
+
+    n_loans = scale.loans if scale.loans is not None else max(1, scale.accounts // 10)
+    loans = [
+        (
+            30001 + i,
+            f"LOAN-SYN-{i:07d}",
+            10001 + rng.randrange(scale.accounts),
+            rng.randint(1, scale.branches),
+            rng.choice((201, 202)),
+            round(rng.uniform(50_000, 5_000_000), 2),
+            0.05,
+            "2024-01-01",
+            "2044-01-01",
+            "ACTIVE",
+        )
+        for i in range(n_loans)
+    ]
+    _insert_rows(
+        conn,
+        "core_loan",
+        (
+            "loan_id",
+            "loan_no",
+            "customer_id",
+            "branch_id",
+            "product_id",
+            "principal_amt",
+            "interest_rate",
+            "start_date",
+            "end_date",
+            "status",
+        ),
+        loans,
+    )
+
+    def loan_balances() -> Iterator[Tuple[Any, ...]]:
+        for offset, day in enumerate(day_strs):
+            for loan in loans:
+                overdue_days = 0 if rng.random() < 0.9 else rng.randint(1, 120)
+                outstanding = round(loan[5] * (1 - offset / 10_000), 2)
+                yield (day, loan[0], outstanding, overdue_days, round(outstanding * 0.01, 2) if overdue_days else 0.0)
+
+    _insert_rows(
+        conn,
+        "fact_loan_balance_daily",
+        ("biz_date", "loan_id", "outstanding_bal", "overdue_days", "overdue_amt"),
+        loan_balances(),
+    )
+
+
+def _build_signature(script: TranslatedScript, scale: Optional[SyntheticScale]) -> str:
+    return f"{script.digest}|{scale.describe() if scale else 'seed'}"
+
+
+def _stored_signature(conn: sqlite3.Connection) -> Optional[str]:
+    try:
+        row = conn.execute("SELECT value FROM _smartbi_meta WHERE key = 'signature'").fetchone()
+    except sqlite3.DatabaseError:
+        return None
+    return row[0] if row else None
+
+
+def build_database(conn: sqlite3.Connection, script: TranslatedScript, scale: Optional[SyntheticScale] = None) -> None:
+    """Tables, then rows, then indexes (cheaper than maintaining them during the load), then views."""
+    with conn:
+        for ddl in script.tables:
+            conn.execute(ddl)
+        for table, insert in script.inserts:
+            if scale is None or table in _STATIC_TABLES:
+                conn.execute(insert)
+        if scale is not None:
+            _load_synthetic(conn, scale)
+        for ddl in script.indexes:
+            conn.execute(ddl)
+        for ddl in script.views:
+            conn.execute(ddl)
+        conn.execute("CREATE TABLE _smartbi_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute(
+            "INSERT INTO _smartbi_meta (key, value) VALUES ('signature', ?), ('built_at', ?)",
+            (_build_signature(script, scale), datetime.now().isoformat(timespec="seconds")),
+        )
+    conn.execute("ANALYZE")
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    # statement cache sized for every template shape the compiler is likely to produce
+    return sqlite3.connect(path, check_same_thread=False, cached_statements=512)
+
+
+def open_local_db(
+    path: str = ":memory:",
+    *,
+    sql_path: str = DEFAULT_SQL_PATH,
+    scale: Optional[SyntheticScale] = None,
+) -> sqlite3.Connection:
+    """
+    SQLite copy of ``sql_path``. A file database is built once and reused
+    while the script digest and scale match; otherwise it is rebuilt into a
+    temporary file and swapped in.
+    """
+    script = get_translated_script(sql_path)
+    if path == ":memory:":
+        conn = _connect(path)
+        build_database(conn, script, scale)
+        return conn
+
+    if os.path.exists(path):
+        conn = _connect(path)
+        if _stored_signature(conn) == _build_signature(script, scale):
+            return conn
+        conn.close()
+
+    tmp_path = f"{path}.building"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        build_database(conn, script, scale)
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    return _connect(path)
+
+
+@lru_cache(maxsize=512)
+def to_sqlite_sql(sql: str) -> str:
+    """Compiled MySQL templates only differ from SQLite in the placeholder style."""
+    return sql.replace(PARAM, "?")
+
+
+@dataclass(frozen=True)
+class QueryResult:
+    columns: Tuple[str, ...]
+    rows: Tuple[Tuple[Any, ...], ...]
+    source: str
+
+    def records(self) -> List[Dict[str, Any]]:
+        return [dict(zip(self.columns, row)) for row in self.rows]
+
+
+class LocalEngine:
+    """Runs compiled SemanticPlans against a local SQLite copy of the demo database."""
+
+    def __init__(self, conn: sqlite3.Connection, metrics_path: str = "semantic/metrics.yaml"):
+        self.conn = conn
+        self.metrics_path = metrics_path
+        # view -> summary table on this connection (see src/query/materialize.py)
+        self.routes: Dict[str, SourceSpec] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(
+        cls,
+        path: str = ":memory:",
+        *,
+        sql_path: str = DEFAULT_SQL_PATH,
+        scale: Optional[SyntheticScale] = None,
+        metrics_path: str = "semantic/metrics.yaml",
+    ) -> "LocalEngine":
+        return cls(open_local_db(path, sql_path=sql_path, scale=scale), metrics_path)
+
+    def execute(self, query: CompiledQuery) -> QueryResult:
+        with timed("sql.execute"), self._lock:
+            cursor = self.conn.execute(to_sqlite_sql(query.sql), query.params)
+            rows = tuple(cursor.fetchall())
+        return QueryResult(tuple(col[0] for col in cursor.description), rows, query.source)
+
+    def answer(self, plan: Mapping[str, Any]) -> QueryResult:
+        return self.execute(compile_plan(plan, metrics_path=self.metrics_path, routes=self.routes))
+
+    def explain(self, query: CompiledQuery) -> List[str]:
+        with self._lock:
+            rows = self.conn.execute("EXPLAIN QUERY PLAN " + to_sqlite_sql(query.sql), query.params).fetchall()
+        return [row[-1] for row in rows]
+
+    def close(self) -> None:
+        self.conn.close()
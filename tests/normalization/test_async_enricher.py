@@ -0,0 +1,105 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+
+from src.normalization import anormalize_input, llm_enricher
+from src.normalization.config import NormalizationSettings
+
+SETTINGS = NormalizationSettings(completion_allowed_fields=("metric_hints",), completion_timeout_seconds=1)
+
+
+class FakeAsyncLLM:
+    """Local fake LLM with configurable latency that tracks in-flight calls."""
+
+    def __init__(self, latency: float, response=None):
+        self.latency = latency
+        self.response = response or {"completed": {"metric_hints": ["m1"]}}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+
+    async def acomplete(self, prompt, timeout):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            return json.dumps(self.response)
+        finally:
+            self.in_flight -= 1
+
+
+def test_aenrich_draft_applies_completion(monkeypatch):
+    monkeypatch.setattr(llm_enricher, "validate_normalized_request", lambda payload: (True, []))
+    llm = FakeAsyncLLM(latency=0.01)
+
+    enriched = asyncio.run(
+        llm_enricher.aenrich_draft({"metric_hints": []}, None, [], llm_client=llm, settings=SETTINGS)
+    )
+
+    assert enriched["metric_hints"] == ["m1"]
+
+
+def test_concurrency_is_capped_by_semaphore(monkeypatch):
+    monkeypatch.setattr(llm_enricher, "validate_normalized_request", lambda payload: (True, []))
+    llm = FakeAsyncLLM(latency=0.05)
+
+    async def run():
+        semaphore = asyncio.Semaphore(10)
+        drafts = [{"metric_hints": [], "n": i} for i in range(100)]
+        return await asyncio.gather(
+            *(llm_enricher.aenrich_draft(d, None, [], llm_client=llm, settings=SETTINGS, semaphore=semaphore) for d in drafts)
+        )
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    assert len(results) == 100 and all(r["metric_hints"] == ["m1"] for r in results)
+    assert llm.max_in_flight == 10
+    assert elapsed < 2.0  # 10 waves of 50ms, far below 100 sequential calls
+
+
+def test_slow_call_is_cancelled_and_falls_back(monkeypatch):
+    monkeypatch.setattr(llm_enricher, "validate_normalized_request", lambda payload: (True, []))
+    settings = NormalizationSettings(completion_allowed_fields=("metric_hints",), completion_timeout_seconds=0.05)
+    llm = FakeAsyncLLM(latency=5)
+    draft = {"metric_hints": []}
+
+    start = time.perf_counter()
+    enriched = asyncio.run(llm_enricher.aenrich_draft(draft, None, [], llm_client=llm, settings=settings))
+
+    assert enriched == draft
+    assert time.perf_counter() - start < 1
+    assert llm.in_flight == 0
+
+
+def test_sync_client_is_run_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(llm_enricher, "validate_normalized_request", lambda payload: (True, []))
+
+    def sync_client(_prompt, timeout):
+        time.sleep(0.01)
+        return json.dumps({"completed": {"metric_hints": ["m2"]}})
+
+    enriched = asyncio.run(llm_enricher.aenrich_draft({"metric_hints": []}, None, [], llm_client=sync_client, settings=SETTINGS))
+
+    assert enriched["metric_hints"] == ["m2"]
+
+
+def test_anormalize_input_end_to_end():
+    llm = FakeAsyncLLM(latency=0.01, response={"completed": {"metric_hints": ["metric.txn.volume_by_channel"]}})
+
+    out = asyncio.run(
+        anormalize_input(
+            "澳門半島存款餘額",
+            {"user_id": "u-1", "role": "analyst", "data_scope": ["AGGREGATED_ONLY"], "allowed_regions": []},
+            {"request_id": "req-1", "request_ts": "2026-02-11T10:00:00+08:00"},
+            now=datetime(2026, 2, 11, 10, 0),
+            llm_client=llm,
+            settings=SETTINGS,
+        )
+    )
+
+    assert out["metric_hints"] == ["metric.txn.volume_by_channel"]
+    assert out["request_id"] == "req-1"
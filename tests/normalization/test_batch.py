@@ -0,0 +1,47 @@
+import json
+from datetime import datetime
+
+from src.normalization.batch import BatchOptions, normalize_jsonl, normalize_many
+
+NOW = datetime.fromisoformat("2026-02-11T10:00:00+08:00")
+QUERIES = ["昨天澳門半島存款餘額", "近7天 ATM 與櫃檯交易量", "列出每個account_no的明細"]
+
+
+def test_normalize_many_preserves_order_and_reports_errors():
+    records = [{"raw_text": q} for q in QUERIES] + ["not json", {"other": "x"}]
+
+    out = list(normalize_many(records, options=BatchOptions(now=NOW)))
+
+    assert [item["seq"] for item in out] == [0, 1, 2, 3, 4]
+    assert [item["ok"] for item in out] == [True, True, True, False, False]
+    assert out[0]["result"]["request_id"] == "batch-0"
+    assert out[0]["result"]["request_context"]["channel"] == "batch"
+    assert out[1]["result"]["metric_hints"] == ["metric.txn.volume_by_channel"]
+    assert out[3]["error"].startswith("JSONDecodeError")
+    assert "no text field" in out[4]["error"]
+
+
+def test_process_pool_matches_in_process_results():
+    records = [json.dumps({"text": QUERIES[i % 3], "request_id": f"r{i}"}, ensure_ascii=False) for i in range(40)]
+    options = BatchOptions(now=NOW)
+
+    serial = list(normalize_many(records, options=options))
+    pooled = list(normalize_many(records, workers=2, chunk_size=3, max_pending_chunks=2, options=options))
+
+    assert pooled == serial
+
+
+def test_normalize_jsonl_streams_file(tmp_path):
+    src = tmp_path / "in.jsonl"
+    dst = tmp_path / "out.jsonl"
+    src.write_text(
+        "\n".join(json.dumps({"title": q}, ensure_ascii=False) for q in QUERIES) + "\n\n",
+        encoding="utf-8",
+    )
+
+    stats = normalize_jsonl(str(src), str(dst), options=BatchOptions(now=NOW, text_field="title"))
+
+    lines = [json.loads(line) for line in dst.read_text(encoding="utf-8").splitlines()]
+    assert (stats.records, stats.succeeded, stats.failed) == (3, 3, 0)
+    assert stats.records_per_second > 0
+    assert [line["result"]["query_context"]["raw_text"] for line in lines] == QUERIES
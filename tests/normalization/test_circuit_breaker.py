@@ -0,0 +1,220 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from src.normalization import llm_enricher, metrics
+from src.normalization.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakerRegistry
+from src.normalization.config import NormalizationSettings
+from src.normalization.deadline import Deadline
+
+SETTINGS = NormalizationSettings(
+    completion_allowed_fields=("metric_hints",),
+    completion_timeout_seconds=0.05,
+    breaker_window=10,
+    breaker_min_calls=4,
+    breaker_failure_rate=0.5,
+    breaker_open_seconds=60,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FlippingLLM:
+    """Fake provider whose ``mode`` can be flipped between "ok", "error" and "stall" mid-test."""
+
+    model_id = "fake-model"
+
+    def __init__(self, mode="ok"):
+        self.mode = mode
+        self.calls = 0
+
+    def __call__(self, _prompt, timeout):
+        self.calls += 1
+        if self.mode == "error":
+            raise ConnectionError("provider down")
+        if self.mode == "stall":
+            time.sleep(1)
+        return json.dumps({"completed": {"metric_hints": ["m1"]}})
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    monkeypatch.setattr(llm_enricher, "validate_normalized_request", lambda payload: (True, []))
+    clock = FakeClock()
+    registry = CircuitBreakerRegistry()
+    original_get = registry.get
+    monkeypatch.setattr(registry, "get", lambda model_id, **kwargs: original_get(model_id, clock=clock, **kwargs))
+    monkeypatch.setattr(llm_enricher, "_breakers", registry)
+    sink = metrics.InProcessMetrics()
+    previous = metrics.set_metrics(sink)
+    yield sink, clock
+    metrics.set_metrics(previous)
+
+
+def _enrich(llm):
+    return llm_enricher.enrich_draft({"metric_hints": []}, None, [], llm_client=llm, settings=SETTINGS)
+
+
+def test_breaker_opens_on_failure_rate_and_recovers_through_half_open():
+    clock = FakeClock()
+    breaker = CircuitBreaker("m", window=10, min_calls=4, failure_rate=0.5, open_seconds=30, clock=clock)
+
+    for failed in (False, True, False, True):
+        assert breaker.allow()
+        breaker.record_failure() if failed else breaker.record_success()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    clock.now = 30
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # one probe at a time
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now = 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.record_failure()  # fresh window after closing
+    assert breaker.state == CLOSED
+
+
+def test_breaker_needs_min_calls_and_forgets_old_outcomes():
+    breaker = CircuitBreaker("m", window=4, min_calls=4, failure_rate=0.75)
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == CLOSED  # below min_calls
+
+    breaker.record_success()
+    for _ in range(3):
+        breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED  # the early failures slid out of the window
+
+
+def test_open_breaker_skips_llm_and_returns_rule_draft(recorder):
+    sink, clock = recorder
+    llm = FlippingLLM("error")
+
+    for _ in range(4):
+        assert _enrich(llm) == {"metric_hints": []}
+    assert llm.calls == 4
+    assert llm_enricher.circuit_states() == {"fake-model": OPEN}
+
+    start = time.perf_counter()
+    assert _enrich(llm) == {"metric_hints": []}
+    assert time.perf_counter() - start < 0.5
+    assert llm.calls == 4
+    assert sink.counters()["enrich.skipped_circuit_open"] == 1
+    assert sink.gauges()["circuit_state.fake-model"] == 2
+
+
+def test_stalls_trip_the_breaker_and_recovery_closes_it(recorder):
+    sink, clock = recorder
+    llm = FlippingLLM("stall")
+    for _ in range(4):
+        _enrich(llm)
+    assert llm_enricher.circuit_states() == {"fake-model": OPEN}
+
+    llm.mode = "ok"
+    assert _enrich(llm) == {"metric_hints": []}  # still open, provider not called
+    assert llm.calls == 4
+
+    clock.now = SETTINGS.breaker_open_seconds
+    assert _enrich(llm)["metric_hints"] == ["m1"]  # half-open probe succeeds
+    assert llm_enricher.circuit_states() == {"fake-model": CLOSED}
+    assert sink.gauges()["circuit_state.fake-model"] == 0
+    assert sink.counters()["circuit.half_open"] == 1 and sink.counters()["circuit.closed"] == 1
+    assert 'smartbi_normalization_state{name="circuit_state.fake-model"} 0' in sink.to_prometheus()
+
+
+def test_breakers_are_per_model(recorder):
+    broken, healthy = FlippingLLM("error"), FlippingLLM("ok")
+    healthy.model_id = "other-model"
+    for _ in range(4):
+        _enrich(broken)
+
+    assert _enrich(healthy)["metric_hints"] == ["m1"]
+    assert llm_enricher.circuit_states() == {"fake-model": OPEN, "other-model": CLOSED}
+
+
+def test_disabled_breaker_always_calls_the_llm(recorder):
+    llm = FlippingLLM("error")
+    settings = NormalizationSettings(completion_allowed_fields=("metric_hints",), breaker_enabled=False)
+    for _ in range(6):
+        llm_enricher.enrich_draft({"metric_hints": []}, None, [], llm_client=llm, settings=settings)
+
+    assert llm.calls == 6
+    assert llm_enricher.circuit_states() == {}
+
+
+def test_released_probe_frees_the_half_open_slot():
+    clock = FakeClock()
+    breaker = CircuitBreaker("m", window=4, min_calls=1, failure_rate=0.5, open_seconds=30, clock=clock)
+    breaker.record_failure()
+    clock.now = 30
+    assert breaker.allow() and not breaker.allow()
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def test_cancelled_probe_does_not_wedge_the_breaker(recorder):
+    _, clock = recorder
+    for _ in range(4):
+        _enrich(FlippingLLM("error"))
+    clock.now = SETTINGS.breaker_open_seconds
+
+    class StallingAsyncLLM:
+        model_id = "fake-model"
+
+        async def acomplete(self, prompt, timeout):
+            await asyncio.sleep(10)
+
+    async def cancel_probe():
+        settings = NormalizationSettings(
+            completion_allowed_fields=("metric_hints",), completion_timeout_seconds=10, breaker_window=10, breaker_min_calls=4
+        )
+        task = asyncio.ensure_future(
+            llm_enricher.aenrich_draft({"metric_hints": []}, None, [], llm_client=StallingAsyncLLM(), settings=settings)
+        )
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_probe())
+    assert llm_enricher.circuit_states() == {"fake-model": HALF_OPEN}
+    assert _enrich(FlippingLLM("ok"))["metric_hints"] == ["m1"]
+    assert llm_enricher.circuit_states() == {"fake-model": CLOSED}
+
+
+def test_timeouts_from_tight_caller_deadlines_do_not_trip_the_breaker(recorder):
+    sink, _ = recorder
+    llm = FlippingLLM("stall")
+    settings = NormalizationSettings(
+        completion_allowed_fields=("metric_hints",),
+        completion_timeout_seconds=5,
+        completion_min_attempt_seconds=0.01,
+        breaker_window=10,
+        breaker_min_calls=4,
+    )
+    for _ in range(6):
+        deadline = Deadline.after(0.05)
+        assert llm_enricher.enrich_draft({"metric_hints": []}, None, [], llm_client=llm, settings=settings, deadline=deadline) == {
+            "metric_hints": []
+        }
+
+    assert llm.calls == 6
+    assert sink.counters()["enrich.failure.llm_timeout"] == 6
+    assert llm_enricher.circuit_states() == {"fake-model": CLOSED}
@@ -0,0 +1,91 @@
+import json
+
+from src.normalization import llm_enricher
+from src.normalization.completion_cache import CompletionCache, completion_cache_key
+from src.normalization.config import NormalizationSettings
+
+SETTINGS = NormalizationSettings(completion_allowed_fields=("metric_hints",))
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _draft(request_id):
+    return {
+        "request_id": request_id,
+        "request_context": {"request_ts": f"2026-02-11T10:00:0{request_id[-1]}+08:00", "timezone": "Asia/Macau"},
+        "query_context": {"normalized_text": "昨天存款餘額"},
+        "metric_hints": [],
+    }
+
+
+def test_identical_question_is_answered_from_cache(monkeypatch):
+    monkeypatch.setattr(llm_enricher, "validate_normalized_request", lambda payload: (True, []))
+    cache = CompletionCache()
+    calls = []
+
+    def stub_client(prompt, timeout):
+        calls.append(prompt)
+        return json.dumps({"completed": {"metric_hints": ["metric.deposit.total_end_balance"]}})
+
+    first = llm_enricher.enrich_draft(_draft("req-1"), None, [], stub_client, settings=SETTINGS, cache=cache)
+    second = llm_enricher.enrich_draft(_draft("req-2"), None, [], stub_client, settings=SETTINGS, cache=cache)
+
+    assert len(calls) == 1
+    assert "req-1" not in calls[0]
+    assert second["metric_hints"] == first["metric_hints"]
+    assert second["request_id"] == "req-2"
+    assert cache.stats().hits == 1 and cache.stats().hit_rate == 0.5
+
+
+def test_unusable_responses_are_not_cached(monkeypatch):
+    monkeypatch.setattr(llm_enricher, "validate_normalized_request", lambda payload: (True, []))
+    cache = CompletionCache()
+    responses = iter(["not-json", json.dumps({"completed": {"metric_hints": ["m1"]}})])
+
+    def stub_client(prompt, timeout):
+        return next(responses)
+
+    assert llm_enricher.enrich_draft(_draft("req-1"), None, [], stub_client, settings=SETTINGS, cache=cache)["metric_hints"] == []
+    assert llm_enricher.enrich_draft(_draft("req-1"), None, [], stub_client, settings=SETTINGS, cache=cache)["metric_hints"] == ["m1"]
+    assert cache.stats().stores == 1
+
+
+def test_model_id_is_part_of_the_key():
+    assert completion_cache_key("p", "model-a") != completion_cache_key("p", "model-b")
+
+
+def test_memory_lru_and_ttl():
+    clock = _Clock()
+    cache = CompletionCache(max_memory_entries=2, ttl_seconds=60, clock=clock)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"
+    cache.put("c", "3")  # evicts b, the least recently used
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    clock.now += 61
+    assert cache.get("a") is None
+
+
+def test_disk_store_survives_restart_and_is_size_bounded(tmp_path):
+    path = str(tmp_path / "completions.sqlite")
+    clock = _Clock()
+    cache = CompletionCache(path, max_memory_entries=1, max_disk_entries=3, clock=clock)
+    for i in range(5):
+        clock.now += 1
+        cache.put(f"k{i}", f"v{i}")
+    cache.trim()
+    cache.close()
+
+    reopened = CompletionCache(path, clock=clock)
+    assert reopened.get("k4") == "v4"
+    assert reopened.get("k2") == "v2"
+    assert reopened.get("k1") is None
+    assert reopened.stats().disk_hits == 2
@@ -0,0 +1,59 @@
+from datetime import datetime
+
+from src.normalization import confidence, llm_enricher
+from src.normalization.config import NormalizationSettings
+from src.normalization.rule_engine import build_normalized_request
+
+NOW = datetime(2026, 2, 11, 10, 0)
+
+
+def _build(text):
+    return build_normalized_request(text, {"user_id": "u-1"}, {"request_id": "r-1"}, now=NOW)
+
+
+def test_complete_kpi_draft_scores_full_confidence():
+    result = confidence.score_draft(_build("昨天澳門半島存款餘額"))
+    assert result.score == 1.0
+    assert result.gaps == ()
+
+
+def test_gaps_lower_the_score():
+    result = confidence.score_draft(_build("澳門半島的情況"))
+    assert result.score == 0.0
+    assert result.gaps == ("metric", "time", "intent", "missing_required_fields")
+
+    ambiguous = confidence.score_draft({**_build("昨天存款餘額"), "metric_hints": ["a", "b"]})
+    assert ambiguous.score < 1.0
+    assert "ambiguous_metric" in ambiguous.gaps
+
+
+def test_enrich_draft_skips_llm_for_complete_drafts():
+    confidence.reset_enrichment_gate_stats()
+    calls = []
+
+    def stub_client(prompt, timeout):
+        calls.append(prompt)
+        return '{"completed": {}}'
+
+    complete = _build("昨天澳門半島存款餘額")
+    incomplete = _build("澳門半島存款餘額")
+    settings = NormalizationSettings()
+
+    assert llm_enricher.enrich_draft(complete, None, [], stub_client, settings=settings) is complete
+    llm_enricher.enrich_draft(incomplete, None, [], stub_client, settings=settings)
+
+    assert len(calls) == 1
+    assert confidence.enrichment_gate_stats() == confidence.EnrichmentGateStats(skipped=1, performed=1)
+
+
+def test_threshold_above_one_disables_the_gate():
+    calls = []
+
+    def stub_client(prompt, timeout):
+        calls.append(prompt)
+        return '{"completed": {}}'
+
+    settings = NormalizationSettings(completion_skip_confidence=1.01)
+    llm_enricher.enrich_draft(_build("昨天澳門半島存款餘額"), None, [], stub_client, settings=settings)
+
+    assert len(calls) == 1
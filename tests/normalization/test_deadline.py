@@ -0,0 +1,179 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.normalization import llm_enricher, metrics, normalize_input
+from src.normalization.circuit_breaker import CircuitBreakerRegistry
+from src.normalization.config import NormalizationSettings
+from src.normalization.deadline import Deadline, LatencyTracker
+
+RESPONSE = json.dumps({"completed": {"metric_hints": ["m1"]}})
+
+
+class StallingLLM:
+    """Local fake LLM: call N sleeps ``latencies[N]`` seconds (the last value repeats); errors raise."""
+
+    def __init__(self, *latencies):
+        self.latencies = list(latencies)
+        self.calls = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def _next_latency(self):
+        with self._lock:
+            latency = self.latencies[min(self.calls, len(self.latencies) - 1)]
+            self.calls += 1
+        return latency
+
+    def __call__(self, _prompt, timeout):
+        latency = self._next_latency()
+        if isinstance(latency, Exception):
+            raise latency
+        time.sleep(latency)
+        return RESPONSE
+
+    async def acomplete(self, prompt, timeout):
+        latency = self._next_latency()
+        self.in_flight += 1
+        try:
+            await asyncio.sleep(latency)
+            return RESPONSE
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    monkeypatch.setattr(llm_enricher, "validate_normalized_request", lambda payload: (True, []))
+    monkeypatch.setattr(llm_enricher, "_latencies", LatencyTracker())
+    monkeypatch.setattr(llm_enricher, "_breakers", CircuitBreakerRegistry())
+    sink = metrics.InProcessMetrics()
+    previous = metrics.set_metrics(sink)
+    yield sink
+    metrics.set_metrics(previous)
+
+
+def _settings(**kwargs):
+    return NormalizationSettings(completion_allowed_fields=("metric_hints",), **kwargs)
+
+
+def test_stalled_sync_call_is_abandoned_at_timeout(recorder):
+    llm = StallingLLM(5)
+    draft = {"metric_hints": []}
+
+    start = time.perf_counter()
+    enriched = llm_enricher.enrich_draft(draft, None, [], llm_client=llm, settings=_settings(completion_timeout_seconds=0.05))
+
+    assert enriched == draft
+    assert time.perf_counter() - start < 1
+    assert recorder.counters()["enrich.failure.llm_timeout"] == 1
+
+
+def test_retry_is_skipped_when_deadline_budget_is_spent(recorder):
+    llm = StallingLLM(5)
+    settings = _settings(completion_max_attempts=2, completion_min_attempt_seconds=0.05)
+
+    start = time.perf_counter()
+    llm_enricher.enrich_draft({"metric_hints": []}, None, [], llm_client=llm, settings=settings, deadline=Deadline.after(0.1))
+
+    assert time.perf_counter() - start < 1
+    assert llm.calls == 1
+    counters = recorder.counters()
+    assert counters["enrich.failure.llm_timeout"] == 1
+    assert counters["enrich.failure.deadline_exhausted"] == 1
+
+
+def test_retry_runs_while_budget_remains(recorder):
+    llm = StallingLLM(RuntimeError("provider 503"), 0.01)
+    settings = _settings(completion_max_attempts=2)
+
+    enriched = llm_enricher.enrich_draft(
+        {"metric_hints": []}, None, [], llm_client=llm, settings=settings, deadline=Deadline.after(2)
+    )
+
+    assert enriched["metric_hints"] == ["m1"]
+    assert llm.calls == 2
+
+
+def test_hedged_request_wins_over_stalled_primary(recorder):
+    llm = StallingLLM(5, 0.01)
+    settings = _settings(completion_hedge_enabled=True, completion_hedge_after_seconds=0.05)
+
+    start = time.perf_counter()
+    enriched = llm_enricher.enrich_draft({"metric_hints": []}, None, [], llm_client=llm, settings=settings)
+
+    assert enriched["metric_hints"] == ["m1"]
+    assert time.perf_counter() - start < 1
+    counters = recorder.counters()
+    assert counters["enrich.hedged"] == 1
+    assert counters["enrich.hedge_won"] == 1
+
+
+def test_hedge_threshold_follows_observed_latency_quantile(recorder):
+    tracker = llm_enricher._latencies
+    for _ in range(tracker.min_samples):
+        tracker.record("", 0.02)
+    settings = _settings(completion_hedge_enabled=True, completion_hedge_after_seconds=10)
+
+    assert llm_enricher._hedge_after(StallingLLM(0), settings) == pytest.approx(0.02)
+    assert llm_enricher._hedge_after(StallingLLM(0), _settings()) is None
+
+
+def test_async_hedge_cancels_the_loser(recorder):
+    llm = StallingLLM(5, 0.01)
+    settings = _settings(completion_hedge_enabled=True, completion_hedge_after_seconds=0.05)
+
+    start = time.perf_counter()
+    enriched = asyncio.run(llm_enricher.aenrich_draft({"metric_hints": []}, None, [], llm_client=llm, settings=settings))
+
+    assert enriched["metric_hints"] == ["m1"]
+    assert time.perf_counter() - start < 1
+    assert llm.calls == 2 and llm.in_flight == 0
+    assert recorder.counters()["enrich.hedge_won"] == 1
+
+
+def test_async_deadline_caps_the_per_call_timeout(recorder):
+    llm = StallingLLM(5)
+    settings = _settings(completion_timeout_seconds=5, completion_max_attempts=2, completion_min_attempt_seconds=0.05)
+
+    start = time.perf_counter()
+    asyncio.run(
+        llm_enricher.aenrich_draft(
+            {"metric_hints": []}, None, [], llm_client=llm, settings=settings, deadline=Deadline.after(0.1)
+        )
+    )
+
+    assert time.perf_counter() - start < 1
+    assert llm.calls == 1 and llm.in_flight == 0
+
+
+def test_deadline_from_request_context():
+    assert Deadline.from_request_context({}) is None
+    assert 0 < Deadline.from_request_context({}, default_seconds=3).remaining() <= 3
+    assert 0.4 < Deadline.from_request_context({"deadline_ms": 500}).remaining() <= 0.5
+    assert 1 < Deadline.from_request_context({"deadline": time.time() + 2}).remaining() <= 2
+    iso = (datetime.now().astimezone() + timedelta(seconds=2)).isoformat()
+    assert 1 < Deadline.from_request_context({"deadline": iso}).remaining() <= 2
+    assert Deadline.from_request_context({"deadline": "not a date"}) is None
+
+
+def test_normalize_input_honours_request_deadline(recorder):
+    llm = StallingLLM(5)
+
+    start = time.perf_counter()
+    out = normalize_input(
+        "澳門半島存款餘額",
+        {"user_id": "u-1", "role": "analyst", "data_scope": ["AGGREGATED_ONLY"], "allowed_regions": []},
+        {"request_id": "req-1", "request_ts": "2026-02-11T10:00:00+08:00", "deadline_ms": 100},
+        now=datetime(2026, 2, 11, 10, 0),
+        llm_client=llm,
+        settings=_settings(completion_timeout_seconds=5, completion_min_attempt_seconds=0.05),
+    )
+
+    assert time.perf_counter() - start < 1
+    assert out["request_id"] == "req-1"
+    assert recorder.counters()["enrich.failure.llm_timeout"] == 1
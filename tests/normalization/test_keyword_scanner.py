@@ -0,0 +1,79 @@
+import re
+
+from src.normalization import rule_engine
+from src.normalization.keyword_scanner import SCANNER, normalize_text, scan_keywords
+
+CORPUS = [
+    "澳門半島存款餘額",
+    "  上月   ATM 與櫃檯   transaction volume  ",
+    "transaction\t\tvolume trend vs last year",
+    "列出每個account_no的明細",
+    "客戶明細 customer_id",
+    "帳戶明細 account detail",
+    "total deposit balance",
+    "總餘額 MOP",
+    "總和 by currency",
+    "期末餘額 比較 同比",
+    "Phone and EMAIL of customers",
+    "canvas kpi",
+    "weather today",
+    "",
+]
+
+
+def _legacy_normalize(raw_text):
+    text = re.sub(r"\s+", " ", raw_text.strip())
+    for src, dst in {"期末餘額": "存款餘額", "transaction volume": "交易量"}.items():
+        text = text.replace(src, dst)
+    return text
+
+
+def _legacy_intent(text):
+    t = text.lower()
+    if any(k in t for k in ["明細", "detail", "列出每個", "list all"]):
+        return "detail_request"
+    if any(k in t for k in ["趨勢", "trend"]):
+        return "trend"
+    if any(k in t for k in ["比較", "vs", "對比", "同比", "環比"]):
+        return "comparison"
+    if any(k in t for k in ["存款", "交易", "餘額", "kpi", "balance", "volume"]):
+        return "kpi_query"
+    return "out_of_scope"
+
+
+def _legacy_risk_flags(text, time_resolved):
+    lowered = text.lower()
+    flags = []
+    if any(term.lower() in lowered for term in rule_engine.SENSITIVE_TERMS):
+        flags.append("pii_requested")
+    if any(k in lowered for k in ["帳戶明細", "account detail", "account_id"]):
+        flags.append("account_level_detail_requested")
+    if any(k in lowered for k in ["客戶明細", "customer detail", "customer_id"]):
+        flags.append("customer_level_detail_requested")
+    if time_resolved is None:
+        flags.append("missing_time_filter")
+    if any(k in lowered for k in ["總餘額", "總和", "total"]) and not any(
+        k in lowered for k in ["mop", "hkd", "幣別", "currency"]
+    ):
+        flags.append("cross_currency_aggregation_risk")
+    dedup = list(dict.fromkeys(flags))
+    return {"contains_sensitive_terms": any("requested" in f for f in dedup), "risk_flags": dedup}
+
+
+def test_single_pass_matches_legacy_rules():
+    for raw in CORPUS:
+        text = normalize_text(raw)
+        assert text == _legacy_normalize(raw), raw
+        hits = scan_keywords(text.lower())
+        assert rule_engine._detect_intent(text, hits) == _legacy_intent(text), raw
+        for resolved in (None, {"start": "2026-01-01", "end": "2026-01-31"}):
+            assert rule_engine._risk_flags(text, resolved, hits) == _legacy_risk_flags(text, resolved), raw
+
+
+def test_overlapping_keywords_hit_every_group():
+    hits = SCANNER.scan("帳戶明細")
+    assert {"intent:detail_request", "risk:sensitive", "risk:account_detail"} <= hits
+
+
+def test_detail_intent_takes_precedence_over_trend():
+    assert rule_engine._detect_intent("存款 趨勢 明細") == "detail_request"
@@ -1,6 +1,6 @@
 import json
 
-from src.normalization import llm_enricher
+from src.normalization import config, llm_enricher
 
 
 def test_success_path_fills_missing_allowed_fields(monkeypatch):
@@ -15,7 +15,7 @@ def test_success_path_fills_missing_allowed_fields(monkeypatch):
         assert timeout > 0
         return json.dumps({"completed": {"metric_hints": ["metric.deposit.total_end_balance"]}})
 
-    enriched = llm_enricher.enrich_draft(draft, time_resolved=None, risk_flags=[], llm_client=stub_client)
+    enriched = llm_enricher.enrich_draft(draft, time_resolved=None, risk_flags=[], llm_client=stub_client, settings=config.load_settings())
 
     assert enriched["metric_hints"] == ["metric.deposit.total_end_balance"]
     assert enriched["raw_text"] == "query"
@@ -30,7 +30,7 @@ def test_invalid_json_response_falls_back_to_original(monkeypatch):
     def stub_client(_prompt, timeout):
         return "not-json"
 
-    enriched = llm_enricher.enrich_draft(draft, time_resolved=None, risk_flags=[], llm_client=stub_client)
+    enriched = llm_enricher.enrich_draft(draft, time_resolved=None, risk_flags=[], llm_client=stub_client, settings=config.load_settings())
     assert enriched == draft
 
 
@@ -45,7 +45,7 @@ def test_overwrite_attempt_on_protected_field_is_reverted(monkeypatch):
     def stub_client(_prompt, timeout):
         return json.dumps({"completed": {"raw_text": "tampered", "metric_hints": ["m1"]}})
 
-    enriched = llm_enricher.enrich_draft(draft, time_resolved=None, risk_flags=[], llm_client=stub_client)
+    enriched = llm_enricher.enrich_draft(draft, time_resolved=None, risk_flags=[], llm_client=stub_client, settings=config.load_settings())
     assert enriched["raw_text"] == "original"
     assert enriched["metric_hints"] == ["m1"]
 
@@ -68,7 +68,7 @@ def test_non_allowed_field_modification_is_reverted(monkeypatch):
             }
         )
 
-    enriched = llm_enricher.enrich_draft(draft, time_resolved=None, risk_flags=[], llm_client=stub_client)
+    enriched = llm_enricher.enrich_draft(draft, time_resolved=None, risk_flags=[], llm_client=stub_client, settings=config.load_settings())
     assert enriched["metric_hints"] == ["m1"]
     assert enriched["intent"] == "kpi_query"
 
@@ -83,5 +83,68 @@ def test_enabled_by_default_without_env(monkeypatch):
     def stub_client(_prompt, timeout):
         return json.dumps({"completed": {"metric_hints": ["m2"]}})
 
-    enriched = llm_enricher.enrich_draft(draft, time_resolved=None, risk_flags=[], llm_client=stub_client)
+    enriched = llm_enricher.enrich_draft(draft, time_resolved=None, risk_flags=[], llm_client=stub_client, settings=config.load_settings())
     assert enriched["metric_hints"] == ["m2"]
+
+
+def test_settings_snapshot_is_not_reparsed_until_reload(monkeypatch):
+    monkeypatch.setenv("ENABLE_LLM_COMPLETION", "false")
+    config.reload_settings()
+    monkeypatch.setenv("ENABLE_LLM_COMPLETION", "true")
+    monkeypatch.setattr(llm_enricher, "validate_normalized_request", lambda payload: (True, []))
+
+    draft = {"metric_hints": []}
+    calls = []
+
+    def stub_client(_prompt, timeout):
+        calls.append(timeout)
+        return json.dumps({"completed": {"metric_hints": ["m3"]}})
+
+    try:
+        assert llm_enricher.enrich_draft(draft, time_resolved=None, risk_flags=[], llm_client=stub_client) == draft
+        assert calls == []
+
+        config.reload_settings()
+        enriched = llm_enricher.enrich_draft(draft, time_resolved=None, risk_flags=[], llm_client=stub_client)
+        assert enriched["metric_hints"] == ["m3"]
+    finally:
+        monkeypatch.undo()
+        config.reload_settings()
+
+
+def test_load_settings_reads_explicit_mapping():
+    settings = config.load_settings(
+        {
+            "ENABLE_LLM_COMPLETION": "no",
+            "LLM_COMPLETION_TIMEOUT_SECONDS": "9",
+            "LLM_COMPLETION_MAX_ATTEMPTS": "7",
+            "LLM_COMPLETION_ALLOWED_FIELDS": " metric_hints , ",
+        }
+    )
+
+    assert settings.completion_enabled is False
+    assert settings.completion_timeout_seconds == 9
+    assert settings.completion_max_attempts == 2
+    assert settings.completion_allowed_fields == ("metric_hints",)
+    assert settings.completion_protected_fields == config.LLM_COMPLETION_PROTECTED_FIELDS
+
+
+def test_reply_with_filter_hints_keeps_the_allowed_completion(monkeypatch):
+    from tests.normalization.test_validator import _valid_request
+
+    monkeypatch.setenv("ENABLE_LLM_COMPLETION", "true")
+    monkeypatch.delenv("LLM_COMPLETION_ALLOWED_FIELDS", raising=False)
+    monkeypatch.delenv("LLM_COMPLETION_PROTECTED_FIELDS", raising=False)
+
+    draft = _valid_request()
+    draft["metric_hints"] = []
+
+    def stub_client(_prompt, timeout):
+        return json.dumps(
+            {"completed": {"metric_hints": ["metric.deposit.total_end_balance"], "filter_hints": {"currency": "MOP"}}}
+        )
+
+    enriched = llm_enricher.enrich_draft(draft, time_resolved=None, risk_flags=[], llm_client=stub_client, settings=config.load_settings())
+
+    assert enriched["metric_hints"] == ["metric.deposit.total_end_balance"]
+    assert "filter_hints" not in enriched
@@ -0,0 +1,86 @@
+import json
+from datetime import datetime
+
+from src.normalization import llm_enricher, llm_prompt
+from src.normalization.config import NormalizationSettings, load_settings
+from src.normalization.rule_engine import build_normalized_request
+
+
+def _draft():
+    return build_normalized_request(
+        "澳門半島存款餘額",
+        {"user_id": "u-1", "role": "analyst", "data_scope": ["AGGREGATED_ONLY"], "allowed_regions": ["澳門半島"]},
+        {"request_id": "req-1", "request_ts": "2026-02-11T10:00:00+08:00"},
+        now=datetime(2026, 2, 11, 10, 0),
+    )
+
+
+def test_compact_prompt_sends_only_allowed_fields():
+    prompt = llm_prompt.build_compact_completion_prompt(
+        _draft(), time_resolved=None, risk_flags=["missing_time_filter"], allowed_fields=("metric_hints", "time_context")
+    )
+    payload = json.loads(prompt.split("Input JSON:\n", 1)[1])
+
+    assert set(payload["fields"]) == {"metric_hints", "time_context"}
+    assert payload["context"]["normalized_text"] == "澳門半島存款餘額"
+    assert "user_context" not in prompt and "req-1" not in prompt
+
+
+def test_compact_prompt_is_much_smaller_than_full():
+    draft = _draft()
+    allowed = NormalizationSettings().completion_allowed_fields
+    protected = NormalizationSettings().completion_protected_fields
+    full = llm_prompt.measure_prompt(llm_prompt.build_json_completion_prompt(draft, None, [], allowed, protected))
+    compact = llm_prompt.measure_prompt(llm_prompt.build_compact_completion_prompt(draft, None, [], allowed))
+
+    assert compact.chars < full.chars * 0.6
+    assert compact.estimated_tokens < full.estimated_tokens
+
+
+def test_estimate_tokens_counts_cjk_per_character():
+    assert llm_prompt.estimate_tokens("存款餘額") == 4
+    assert llm_prompt.estimate_tokens("abcdefgh") == 2
+
+
+def test_estimate_tokens_treats_non_cjk_multibyte_text_as_other_characters():
+    # Latin accents and Greek are 2 bytes in UTF-8, emoji 4; none of them count as CJK
+    assert llm_prompt.estimate_tokens("café crème") == 3
+    assert llm_prompt.estimate_tokens("αβγδεζηθ") == 2
+    assert llm_prompt.estimate_tokens("🙂🙂🙂🙂") == 1
+    assert llm_prompt.estimate_tokens("餘額 ok，") == 4  # full-width comma is CJK punctuation
+
+
+def test_delta_response_is_merged_onto_full_draft(monkeypatch):
+    monkeypatch.setattr(llm_enricher, "validate_normalized_request", lambda payload: (True, []))
+    draft = _draft()
+    prompts = []
+
+    def stub_client(prompt, timeout):
+        prompts.append(prompt)
+        return json.dumps({"completed": {"missing_required_fields": ["time_window"], "user_context": {}}})
+
+    before = llm_enricher.prompt_size_stats()["prompts"]
+    enriched = llm_enricher.enrich_draft(draft, None, [], stub_client, settings=NormalizationSettings(completion_prompt_mode="compact"))
+
+    assert prompts[0].startswith("# JSON Completion Prompt (Compact)")
+    assert enriched["user_context"] == draft["user_context"]
+    assert enriched["metric_hints"] == draft["metric_hints"]
+    assert llm_enricher.prompt_size_stats()["prompts"] == before + 1
+
+
+def test_full_prompt_is_the_default_mode():
+    assert NormalizationSettings().completion_prompt_mode == "full"
+    assert load_settings({}).completion_prompt_mode == "full"
+
+
+def test_partial_object_in_compact_reply_keeps_the_other_keys():
+    draft = _draft()
+
+    def stub_client(prompt, timeout):
+        return json.dumps({"completed": {"query_context": {"intent": "trend"}}})
+
+    settings = NormalizationSettings(completion_prompt_mode="compact")
+    enriched = llm_enricher.enrich_draft(draft, None, [], stub_client, settings=settings)
+
+    assert enriched["query_context"] == {**draft["query_context"], "intent": "trend"}
+    assert "Every field you return must be COMPLETE" in llm_prompt.load_json_completion_prompt(compact=True)
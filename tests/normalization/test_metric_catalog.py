@@ -0,0 +1,147 @@
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from src.normalization import metric_catalog
+from src.normalization.metric_hint_retriever import load_metric_catalog, retrieve_metric_hints
+
+METRICS_YAML = """metrics:
+  deposit_total_end_balance:
+    concept_id: "metric.deposit.total_end_balance"
+    name_zh: "存款期末餘額總和"
+    aliases:
+      - "存款餘額"
+"""
+
+
+@pytest.fixture
+def cache():
+    metric_catalog.clear_catalog_cache()
+    yield
+    metric_catalog.clear_catalog_cache()
+
+
+def test_catalog_matches_plain_loader():
+    compiled = metric_catalog.compile_metric_catalog(Path("semantic/metrics.yaml"), Path("semantic/metrics.yaml").read_text(encoding="utf-8"), "x")
+    plain = load_metric_catalog("semantic/metrics.yaml")
+
+    assert [dict(m, aliases=list(m["aliases"])) for m in compiled] == plain
+
+
+def test_repeated_lookups_hit_without_reparse(cache, tmp_path, monkeypatch):
+    path = tmp_path / "metrics.yaml"
+    path.write_text(METRICS_YAML, encoding="utf-8")
+    calls = []
+    original = metric_catalog.parse_metric_catalog
+    monkeypatch.setattr(metric_catalog, "parse_metric_catalog", lambda text: calls.append(1) or original(text))
+
+    first = metric_catalog.get_metric_catalog(str(path))
+    for _ in range(5):
+        assert metric_catalog.get_metric_catalog(str(path)) is first
+
+    stats = metric_catalog.catalog_cache_stats()
+    assert (stats.misses, stats.hits, stats.reloads) == (1, 5, 0)
+    assert len(calls) == 1
+
+
+def test_concurrent_lookups_count_every_hit(cache, tmp_path):
+    path = tmp_path / "metrics.yaml"
+    path.write_text(METRICS_YAML, encoding="utf-8")
+    metric_catalog.get_metric_catalog(str(path))
+
+    def lookups():
+        for _ in range(2_000):
+            metric_catalog.get_metric_catalog(str(path))
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = metric_catalog.catalog_cache_stats()
+    assert (stats.misses, stats.hits) == (1, 16_000)
+
+
+def test_content_change_triggers_reload(cache, tmp_path):
+    path = tmp_path / "metrics.yaml"
+    path.write_text(METRICS_YAML, encoding="utf-8")
+    first = metric_catalog.get_metric_catalog(str(path))
+
+    path.write_text(METRICS_YAML.replace("存款餘額", "存款總額"), encoding="utf-8")
+    os.utime(path, ns=(1, 1))
+    second = metric_catalog.get_metric_catalog(str(path))
+
+    assert second is not first
+    assert second[0]["aliases"] == ("存款總額",)
+    assert metric_catalog.catalog_cache_stats().reloads == 1
+
+
+def test_touch_without_content_change_keeps_compiled_catalog(cache, tmp_path):
+    path = tmp_path / "metrics.yaml"
+    path.write_text(METRICS_YAML, encoding="utf-8")
+    first = metric_catalog.get_metric_catalog(str(path))
+
+    os.utime(path, ns=(1, 1))
+
+    assert metric_catalog.get_metric_catalog(str(path)) is first
+    assert metric_catalog.catalog_cache_stats().reloads == 0
+
+
+def test_compiled_catalog_is_read_only(cache):
+    catalog = metric_catalog.get_metric_catalog("semantic/metrics.yaml")
+    with pytest.raises(TypeError):
+        catalog[0]["name_zh"] = "tampered"
+
+
+def test_indexed_hints_match_linear_scan():
+    catalog = metric_catalog.get_metric_catalog("semantic/metrics.yaml")
+    plain = load_metric_catalog("semantic/metrics.yaml")
+    queries = [
+        "昨天澳門半島存款餘額",
+        "查昨天各分行的存款餘額",
+        "近7天 ATM 與櫃檯交易量",
+        "total deposit balance by branch",
+        "channel transaction volume last 7 days",
+        "交易 存款",
+        "a e 餘",
+        "weather tomorrow",
+        "",
+    ]
+    for query in queries:
+        for top_k in (1, 3):
+            assert retrieve_metric_hints(query, catalog, top_k=top_k) == retrieve_metric_hints(
+                query, plain, top_k=top_k
+            ), query
+
+
+def test_indexed_hints_match_linear_scan_on_overlapping_aliases():
+    plain = [
+        {"metric_id": "m.a", "name_zh": "存款", "aliases": ["存款", "存款"]},
+        {"metric_id": "m.b", "name_en": "Deposit Balance", "aliases": ["存款餘額", "balance"]},
+        {"metric_id": "m.c", "definition_zh": "餘額", "aliases": ["", "款餘"]},
+    ]
+    compiled = metric_catalog.CompiledMetricCatalog(source_path="", digest="", metrics=tuple(plain))
+    for query in ["存款餘額", "deposit balance 存款", "餘 額", "款餘 款餘", "BALANCE"]:
+        assert retrieve_metric_hints(query, compiled, top_k=5) == retrieve_metric_hints(query, plain, top_k=5), query
+
+
+def test_ngram_mode_recalls_spaceless_query_without_literal_alias():
+    catalog = metric_catalog.get_metric_catalog("semantic/metrics.yaml")
+    query = "各分行存款總額"
+
+    assert retrieve_metric_hints(query, catalog) == []
+    assert retrieve_metric_hints(query, catalog, mode="ngram")[0] == "metric.deposit.total_end_balance"
+    assert retrieve_metric_hints("近30天各渠道交易筆數", catalog, mode="ngram")[0] == "metric.txn.volume_by_channel"
+
+
+def test_ngram_mode_returns_nothing_for_unrelated_text():
+    catalog = metric_catalog.get_metric_catalog("semantic/metrics.yaml")
+    assert retrieve_metric_hints("weather tomorrow?", catalog, mode="ngram", top_k=3) == []
+
+
+def test_unknown_retrieval_mode_is_rejected():
+    with pytest.raises(ValueError):
+        retrieve_metric_hints("存款", [], mode="bm25")
@@ -0,0 +1,78 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from src.normalization import config, llm_enricher, metrics, normalize_input
+
+
+@pytest.fixture
+def recorder():
+    sink = metrics.InProcessMetrics()
+    previous = metrics.set_metrics(sink)
+    yield sink
+    metrics.set_metrics(previous)
+
+
+def _normalize(text, **kwargs):
+    return normalize_input(
+        text,
+        {"user_id": "u-1", "role": "analyst", "data_scope": ["AGGREGATED_ONLY"], "allowed_regions": ["澳門半島"]},
+        {"request_id": "req-1", "request_ts": "2026-02-11T10:00:00+08:00"},
+        now=datetime(2026, 2, 11, 10, 0),
+        **kwargs,
+    )
+
+
+def test_normalize_input_records_every_stage(recorder):
+    for _ in range(3):
+        _normalize("昨天澳門半島存款餘額", settings=config.NormalizationSettings(completion_enabled=False))
+
+    summary = recorder.stage_summary()
+    for stage in (
+        "build.text_rules",
+        "build.time_parse",
+        "build.catalog_load",
+        "build.hint_retrieval",
+        "build.risk",
+        "normalize.build",
+        "normalize.enrich",
+        "normalize.validate",
+        "validate.normalized_request",
+    ):
+        assert summary[stage]["count"] == 3, stage
+        assert 0 <= summary[stage]["p50"] <= summary[stage]["p99"]
+    assert recorder.counters()["normalize.requests"] == 3
+
+
+def test_enrichment_stages_and_failure_counters(recorder):
+    settings = config.NormalizationSettings(completion_skip_confidence=2.0)
+    _normalize("澳門半島存款餘額", llm_client=lambda prompt, timeout: "not-json", settings=settings)
+
+    summary = recorder.stage_summary()
+    assert summary["enrich.prompt_build"]["count"] == 1
+    assert summary["enrich.llm_call"]["count"] == 1
+    assert summary["enrich.parse"]["count"] == 1
+    assert recorder.counters()["enrich.failure.llm_or_parse_failure"] == 1
+
+
+def test_prometheus_text_output(recorder):
+    recorder.observe("build.risk", 0.0002)
+    recorder.observe("build.risk", 3.0)
+    recorder.incr("normalize.requests", 2)
+
+    text = recorder.to_prometheus()
+    assert 'smartbi_normalization_events_total{event="normalize.requests"} 2' in text
+    assert 'smartbi_normalization_stage_seconds_bucket{stage="build.risk",le="0.00025"} 1' in text
+    assert 'smartbi_normalization_stage_seconds_bucket{stage="build.risk",le="+Inf"} 2' in text
+    assert 'smartbi_normalization_stage_seconds_count{stage="build.risk"} 2' in text
+
+
+def test_disabled_metrics_share_a_noop_timer():
+    previous = metrics.set_metrics(None)
+    try:
+        assert not metrics.get_metrics().enabled
+        assert metrics.timed("a") is metrics.timed("b")
+        llm_enricher._record_enrichment_failure("llm_timeout")
+    finally:
+        metrics.set_metrics(previous)
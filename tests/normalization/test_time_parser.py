@@ -0,0 +1,62 @@
+from datetime import datetime
+
+from src.normalization.time_parser import TimePhraseMatcher, parse_time_phrase
+
+NOW = datetime(2026, 2, 11, 10, 0)
+
+
+def _window(text, now=NOW):
+    result = parse_time_phrase(text, now=now)
+    if result.resolved is None:
+        return result.original_phrase, None
+    r = result.resolved
+    return result.original_phrase, (r["type"], r["start_date"], r["end_date"])
+
+
+def test_existing_phrases_keep_rule_and_keyword_precedence():
+    assert _window("昨天存款") == ("昨天", ("single_date", "2026-02-10", "2026-02-10"))
+    # rule order wins over position in the text, keyword order within a rule
+    assert _window("上月 vs 今天") == ("今天", ("single_date", "2026-02-11", "2026-02-11"))
+    assert _window("today 今天") == ("今天", ("single_date", "2026-02-11", "2026-02-11"))
+    assert _window("LAST MONTH volume") == ("last month", ("date_range", "2026-01-01", "2026-01-31"))
+    assert _window("最近7天") == ("近7天", ("date_range", "2026-02-05", "2026-02-11"))
+    assert _window("存款餘額") == (None, None)
+
+
+def test_relative_phrases():
+    assert _window("最近30天交易量") == ("最近30天", ("date_range", "2026-01-13", "2026-02-11"))
+    assert _window("last 14 days") == ("last 14 days", ("date_range", "2026-01-29", "2026-02-11"))
+    assert _window("上季存款") == ("上季", ("date_range", "2025-10-01", "2025-12-31"))
+    assert _window("本季度") == ("本季度", ("date_range", "2026-01-01", "2026-02-11"))
+    assert _window("去年同期") == ("去年同期", ("date_range", "2025-01-01", "2025-02-11"))
+    assert _window("去年同期", datetime(2024, 2, 29)) == ("去年同期", ("date_range", "2023-01-01", "2023-02-28"))
+    assert _window("近0天") == (None, None)
+
+
+def test_explicit_dates():
+    assert _window("2025-12 存款") == ("2025-12", ("date_range", "2025-12-01", "2025-12-31"))
+    assert _window("2026-01-05 至 2026-01-20") == (
+        "2026-01-05 至 2026-01-20",
+        ("date_range", "2026-01-05", "2026-01-20"),
+    )
+    assert _window("2026-01-20到2026-01-05") == (None, None)
+    assert _window("2026-13") == (None, None)
+    assert _window("0000-01 存款") == (None, None)
+    assert _window("0000-01-01 至 2026-01-05") == (None, None)
+
+
+def test_windows_are_memoized_per_day():
+    matcher = TimePhraseMatcher()
+    for _ in range(100):
+        matcher.parse("昨天", NOW.date())
+        matcher.parse("最近30天", NOW.date())
+    assert matcher.cache_info().misses == 2
+
+    matcher.parse("昨天", datetime(2026, 2, 12).date())
+    assert matcher.cache_info().misses == 3
+
+
+def test_resolved_dict_is_not_shared_between_calls():
+    first = parse_time_phrase("昨天", now=NOW)
+    first.resolved["start_date"] = "mutated"
+    assert parse_time_phrase("昨天", now=NOW).resolved["start_date"] == "2026-02-10"
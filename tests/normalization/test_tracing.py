@@ -0,0 +1,105 @@
+import json
+import logging
+from datetime import datetime
+
+import pytest
+
+from src.normalization import normalize_input, tracing
+from src.normalization.config import NormalizationSettings
+
+SETTINGS = NormalizationSettings(completion_enabled=False)
+
+
+@pytest.fixture
+def sink():
+    ring = tracing.RingBufferSink(capacity=2)
+    previous = tracing.set_trace_sink(ring)
+    yield ring
+    tracing.set_trace_sink(previous)
+
+
+def _normalize(text, request_id="req-1", settings=SETTINGS):
+    return normalize_input(
+        text,
+        {"user_id": "u-1", "role": "analyst", "data_scope": ["AGGREGATED_ONLY"], "allowed_regions": []},
+        {"request_id": request_id, "request_ts": "2026-02-11T10:00:00+08:00"},
+        now=datetime(2026, 2, 11, 10, 0),
+        settings=settings,
+    )
+
+
+def test_ring_buffer_keeps_recent_traces_with_stage_snapshots(sink):
+    for i in range(3):
+        _normalize("昨天存款餘額", request_id=f"req-{i}")
+
+    traces = sink.recent()
+    assert [t.request_id for t in traces] == ["req-1", "req-2"]
+    assert [s.stage for s in traces[-1].stages] == [
+        "build_normalized_request",
+        "enrich_draft",
+        "validate_normalized_request",
+    ]
+    assert traces[-1].diff("build_normalized_request", "enrich_draft") == []
+
+
+def test_retained_trace_is_isolated_from_caller_mutation(sink):
+    result = _normalize("昨天存款餘額")
+    result["metric_hints"].append("mutated")
+
+    trace = sink.recent()[-1]
+    assert "mutated" not in trace.payload("enrich_draft")["metric_hints"]
+    assert trace.payload("validate_normalized_request")["validated"] is trace.payload("enrich_draft")
+
+
+def test_no_trace_when_not_sampled(sink):
+    _normalize("昨天存款餘額", settings=NormalizationSettings(completion_enabled=False, trace_sample_rate=0.0))
+    assert sink.recent() == []
+
+
+def test_diff_is_lazy_and_cached():
+    trace = tracing.NormalizationTrace("req-1")
+    trace.record("build_normalized_request", {"a": 1, "b": [1]})
+    trace.record("enrich_draft", {"a": 2, "b": [1, 2]})
+    assert trace._diffs == {}
+    assert trace.diff("build_normalized_request", "enrich_draft") == ["a", "b[1] (added)"]
+    assert ("build_normalized_request", "enrich_draft") in trace._diffs
+
+
+def test_jsonl_and_logger_sinks(tmp_path, caplog):
+    trace = tracing.NormalizationTrace("req-9")
+    trace.record("build_normalized_request", {"x": "澳門"})
+    trace.record("enrich_draft", {"x": "澳門"})
+
+    path = tmp_path / "traces.jsonl"
+    tracing.JsonlFileSink(str(path)).emit(trace)
+    tracing.JsonlFileSink(str(path), include_payloads=False).emit(trace)
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert lines[0]["stages"][0]["payload"] == {"x": "澳門"}
+    assert "payload" not in lines[1]["stages"][0]
+    assert lines[1]["build_to_enrich_diff"] == []
+
+    with caplog.at_level(logging.DEBUG, logger="smartbi.normalization.trace"):
+        tracing.LoggerSink().emit(trace)
+    assert '"request_id": "req-9"' in caplog.text
+
+
+def test_failed_request_still_emits_its_trace(sink, monkeypatch):
+    from src.normalization import normalizer
+
+    monkeypatch.setattr(normalizer, "validate_normalized_request", lambda payload: (False, ["metric_hints invalid"]))
+    with pytest.raises(normalizer.NormalizationError):
+        _normalize("昨天存款餘額", request_id="req-bad")
+
+    def broken_build(**_kwargs):
+        raise RuntimeError("metrics.yaml unreadable")
+
+    monkeypatch.setattr(normalizer, "build_normalized_request", broken_build)
+    with pytest.raises(RuntimeError):
+        _normalize("昨天存款餘額", request_id="req-broken")
+
+    invalid, broken = sink.recent()
+    assert invalid.error == "NormalizationError: metric_hints invalid"
+    assert [s.stage for s in invalid.stages][-1] == "validate_normalized_request"
+    assert broken.error == "RuntimeError: metrics.yaml unreadable"
+    assert broken.stages == []
+    assert broken.to_dict()["error"] == "RuntimeError: metrics.yaml unreadable"
@@ -0,0 +1,102 @@
+import copy
+
+from src.normalization import validator
+
+
+def _valid_request():
+    return {
+        "schema_version": "1.0",
+        "request_id": "req-1",
+        "request_context": {"request_ts": "2026-02-11T10:00:00+08:00", "timezone": "Asia/Macau", "channel": "api"},
+        "user_context": {"user_id": "u-1", "role": "analyst", "data_scope": ["AGGREGATED_ONLY"], "allowed_regions": []},
+        "query_context": {"raw_text": "昨天存款餘額", "normalized_text": "昨天存款餘額", "language": "zh-TW", "intent": "kpi_query"},
+        "time_context": {
+            "original_phrase": "昨天",
+            "resolved": {"type": "single_date", "start_date": "2026-02-10", "end_date": "2026-02-10"},
+        },
+        "risk_context": {"contains_sensitive_terms": False, "risk_flags": []},
+        "metric_hints": ["metric.deposit.total_end_balance"],
+        "normalization_trace": [],
+        "missing_required_fields": [],
+    }
+
+
+def test_valid_request_passes():
+    assert validator.validate_normalized_request(_valid_request()) == (True, [])
+
+
+def test_full_schema_is_enforced():
+    data = _valid_request()
+    data["filter_hints"] = {}
+    data["request_context"]["request_ts"] = "yesterday"
+    data["request_context"]["channel"] = "fax"
+    data["user_context"]["data_scope"] = []
+    data["risk_context"]["risk_flags"] = ["unknown_flag"]
+    data["time_context"]["resolved"]["start_date"] = "2026/02/10"
+    del data["request_id"]
+
+    ok, errors = validator.validate_normalized_request(data)
+
+    assert not ok
+    assert set(errors) == {
+        "missing required key: request_id",
+        "filter_hints is not allowed",
+        "request_context.request_ts invalid",
+        "request_context.channel invalid",
+        "user_context.data_scope must have at least 1 items",
+        "risk_context.risk_flags[0] invalid",
+        "time_context.resolved.start_date invalid",
+    }
+
+
+def test_type_errors_use_existing_messages():
+    data = _valid_request()
+    data["schema_version"] = "2.0"
+    data["query_context"] = "text"
+    data["time_context"]["resolved"] = "yesterday"
+
+    _, errors = validator.validate_normalized_request(data)
+
+    assert "schema_version must be 1.0" in errors
+    assert "query_context must be object" in errors
+    assert "time_context.resolved must be object|null" in errors
+
+
+def test_semantic_plan_schema():
+    plan = {
+        "plan_version": "1.0",
+        "request_id": "req-1",
+        "metric_id": "metric.deposit.total_end_balance",
+        "filters": {"region": "澳門半島"},
+        "group_by": ["biz_date"],
+        "measures": ["total_end_balance"],
+        "time_window": {"type": "single_date", "start_date": "2026-02-10", "end_date": "2026-02-10"},
+        "assumptions": [],
+        "confidence": 0.9,
+        "needs_clarification": False,
+        "clarification_question": None,
+    }
+    assert validator.validate_semantic_plan(plan) == (True, [])
+
+    broken = copy.deepcopy(plan)
+    broken["measures"] = []
+    broken["confidence"] = 1.5
+    broken["filters"]["region"] = ["a", "b"]
+    _, errors = validator.validate_semantic_plan(broken)
+    assert set(errors) == {
+        "measures must have at least 1 items",
+        "confidence must be <= 1",
+        "filters.region must be string|number|boolean",
+    }
+
+
+def test_schema_compiled_once_and_reloaded_on_change(tmp_path):
+    path = tmp_path / "schema.json"
+    path.write_text('{"type": "object", "required": ["a"]}', encoding="utf-8")
+
+    first = validator.get_schema_validator(str(path))
+    assert validator.get_schema_validator(str(path)) is first
+    assert validator.validate_normalized_request({}, schema_path=str(path)) == (False, ["missing required key: a"])
+
+    path.write_text('{"type": "object", "required": ["bb"]}', encoding="utf-8")
+    assert validator.validate_normalized_request({}, schema_path=str(path)) == (False, ["missing required key: bb"])
@@ -0,0 +1,117 @@
+import dataclasses
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.query.kpi_cube import KpiCube, query_cube  # noqa: E402
+from src.query.sqlite_engine import LocalEngine, SyntheticScale  # noqa: E402
+from tests.query.test_sql_compiler import DEPOSIT, TXN, _plan  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def engines():
+    engine = LocalEngine.open(scale=SyntheticScale(branches=5, days=20, accounts=80, txns_per_account_day=2))
+    yield engine, KpiCube.build(engine.conn)
+    engine.close()
+
+
+def _same(cube_result, sql_result):
+    assert cube_result.columns == sql_result.columns
+    assert len(cube_result.rows) == len(sql_result.rows)
+    for cube_row, sql_row in zip(cube_result.rows, sql_result.rows):
+        for cube_value, sql_value in zip(cube_row, sql_row):
+            assert type(cube_value) is type(sql_value)
+            assert cube_value == (pytest.approx(sql_value) if isinstance(sql_value, float) else sql_value)
+
+
+@pytest.mark.parametrize(
+    "plan",
+    [
+        _plan(TXN, ["biz_date", "channel"], ["txn_count", "txn_amount_net"], {"channel": "ATM,WEB"}, start="2026-01-03", end="2026-01-09"),
+        _plan(TXN, ["txn_type"], ["txn_count"], {"txn_type": "FEE"}, start="2026-01-01", end="2026-01-20"),
+        _plan(TXN, [], ["txn_amount_net"], start="2026-01-05", end="2026-01-05"),
+        _plan(DEPOSIT, ["biz_date", "region", "currency"], ["total_end_balance"], start="2026-01-05", end="2026-01-07"),
+        _plan(DEPOSIT, ["branch_id", "currency"], ["total_end_balance"], {"region": "氹仔", "currency": "MOP"}, start="2026-01-05", end="2026-01-05"),
+        _plan(DEPOSIT, ["biz_date", "branch_name"], ["total_end_balance"], {"branch_id": "2"}, start="2026-01-02", end="2026-01-03"),
+        _plan(DEPOSIT, ["currency"], ["total_end_balance"], {"yyyy_mm": "2026-01"}, start="2026-01-01", end="2026-01-31"),
+        _plan(DEPOSIT, ["biz_date", "currency"], ["total_end_balance"], start="2026-03-01", end="2026-03-01", window="latest_available_date"),
+        _plan(TXN, ["biz_date", "channel"], ["txn_count"], {"biz_date": "2026-01-07,2026-01-09"}, start="2026-01-01", end="2026-01-20"),
+        _plan(DEPOSIT, ["currency"], ["total_end_balance"], {"biz_date": "2026-01-03,2026-01-05,2026-02-30"}, start="2026-01-01", end="2026-01-20"),
+        _plan(TXN, ["channel"], ["txn_amount_net"], {"yyyy_mm": "2025-12,2026-01"}, start="2025-12-20", end="2026-01-10"),
+        _plan(DEPOSIT, ["biz_date", "currency"], ["total_end_balance"], {"biz_date": "2026-01-09,2026-01-10"}, window="latest_available_date", start="2026-01-10", end="2026-01-10"),
+    ],
+)
+def test_cube_matches_sql(engines, plan):
+    engine, cube = engines
+    result = cube.answer(plan)
+    assert result.source == "kpi_cube"
+    _same(result, engine.answer(plan))
+
+
+def test_cube_and_sql_both_exclude_closed_balances(engines):
+    engine, cube = engines
+    closed = engine.conn.execute(
+        "SELECT COUNT(*), SUM(b.end_balance) FROM fact_account_balance_daily b "
+        "JOIN core_account a ON a.account_id = b.account_id WHERE a.status = 'CLOSED' AND b.biz_date = '2026-01-05'"
+    ).fetchone()
+    assert closed[0] > 0 and closed[1] > 0
+
+    plan = _plan(DEPOSIT, ["currency"], ["total_end_balance"], start="2026-01-05", end="2026-01-05")
+    sql_result = engine.answer(plan)
+    _same(cube.answer(plan), sql_result)
+    view_total = engine.conn.execute(
+        "SELECT SUM(total_end_balance) FROM vw_kpi_deposit_balance_by_branch_date WHERE biz_date = '2026-01-05'"
+    ).fetchone()[0]
+    assert sum(row[1] for row in sql_result.rows) == pytest.approx(view_total - closed[1])
+
+
+def test_whole_amounts_sum_to_int_like_sql():
+    engine = LocalEngine.open()
+    try:
+        plan = _plan(DEPOSIT, ["branch_id", "currency"], ["total_end_balance"], start="2026-01-02", end="2026-01-02")
+        cube_result, sql_result = KpiCube.build(engine.conn).answer(plan), engine.answer(plan)
+        assert any(isinstance(row[2], int) for row in sql_result.rows)
+        _same(cube_result, sql_result)
+    finally:
+        engine.close()
+
+
+def test_cent_sums_stay_exact_past_float_precision(engines):
+    _, cube = engines
+    txn = cube.cubes[TXN]
+    big = 2**53 + 1  # not representable as float64
+    huge = dataclasses.replace(
+        txn,
+        sums={m: np.full(txn.cells, big, dtype=np.int64) for m in txn.sums},
+        fractional={m: np.zeros(txn.cells, dtype=np.int64) for m in txn.sums},
+    )
+    plan = _plan(TXN, ["channel"], ["txn_amount_net"], start="2026-01-05", end="2026-01-05")
+    cells = query_cube(huge, plan)
+    day_codes = txn.dims["channel"][txn.dates == txn.dates.min() + 4]
+    codes, cells_per_channel = np.unique(day_codes, return_counts=True)
+    expected = {txn.dictionaries["channel"][c]: int(n) * big // 100 for c, n in zip(codes, cells_per_channel)}
+    assert dict(cells.rows) == expected
+
+
+def test_cube_rolls_facts_up_to_grain(engines):
+    engine, cube = engines
+    txn = cube.cubes[TXN]
+    assert txn.fact_rows == 20 * 160
+    assert txn.cells <= 20 * 5 * 6  # date x channel x txn_type
+    assert np.all(np.diff(txn.dates) >= 0)
+    assert txn.dictionaries["channel"] == tuple(sorted(txn.dictionaries["channel"]))
+    assert int(txn.row_count.sum()) == txn.fact_rows
+    assert txn.sums["txn_amount_net"].dtype == np.int64
+
+
+def test_unknown_filter_value_and_empty_window(engines):
+    _, cube = engines
+    assert cube.answer(_plan(TXN, ["channel"], ["txn_count"], {"channel": "FAX"})).rows == ()
+    assert cube.answer(_plan(TXN, ["channel"], ["txn_count"], start="2030-01-01", end="2030-01-02")).rows == ()
+
+
+def test_plans_outside_the_cube_fall_back(engines, monkeypatch):
+    _, cube = engines
+    monkeypatch.delitem(cube.cubes, TXN)
+    assert cube.answer(_plan(TXN, ["channel"], ["txn_count"])) is None
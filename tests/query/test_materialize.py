@@ -0,0 +1,169 @@
+import pytest
+
+from src.query import compile_plan
+from src.query.materialize import MATERIALIZED_VIEWS, KpiMaterializer
+from src.query.sqlite_engine import LocalEngine, SyntheticScale
+from tests.query.test_sql_compiler import DEPOSIT, TXN, _plan
+
+SCALE = SyntheticScale(branches=3, days=10, accounts=30, txns_per_account_day=2)
+TXN_MV = next(mv for mv in MATERIALIZED_VIEWS if mv.watermark_column == "txn_ts")
+DEPOSIT_MV = next(mv for mv in MATERIALIZED_VIEWS if mv.table == "mv_kpi_deposit_balance_by_branch_date")
+
+
+@pytest.fixture
+def materialized():
+    engine = LocalEngine.open(scale=SCALE)
+    materializer = KpiMaterializer(engine.conn, routes=engine.routes)
+    materializer.install()
+    materializer.refresh()
+    yield engine, materializer
+    engine.close()
+
+
+def _rows(engine, sql):
+    return sorted(engine.conn.execute(sql).fetchall())
+
+
+def _same_rows(left, right):
+    assert len(left) == len(right)
+    for left_row, right_row in zip(left, right):
+        assert left_row == pytest.approx(right_row)
+
+
+def _insert_txn(engine, biz_date, ts_sql="datetime(MAX(txn_ts), '+1 second')"):
+    with engine.conn:
+        engine.conn.execute(
+            "INSERT INTO fact_transaction (txn_id, biz_date, account_id, txn_ts, txn_type, channel, amount) "
+            f"SELECT MAX(txn_id) + 1, ?, 20001, {ts_sql}, 'DEPOSIT', 'ATM', 12345 FROM fact_transaction",
+            (biz_date,),
+        )
+
+
+def _in_sync(engine, mv):
+    return _rows(engine, f"SELECT * FROM {mv.table}") == _rows(engine, f"SELECT * FROM {mv.relation}")
+
+
+def test_summary_tables_match_views(materialized):
+    engine, _ = materialized
+    for mv in MATERIALIZED_VIEWS:
+        assert _in_sync(engine, mv)
+    # the deposit table keeps rows per account status; rolled up it is the view
+    rolled_up = _rows(
+        engine,
+        "SELECT biz_date, branch_id, branch_name, region, currency, SUM(total_end_balance), SUM(total_available_bal), "
+        "SUM(total_hold_amount), SUM(accounts_cnt) FROM mv_kpi_deposit_balance_by_branch_date "
+        "GROUP BY biz_date, branch_id, branch_name, region, currency",
+    )
+    _same_rows(rolled_up, _rows(engine, "SELECT * FROM vw_kpi_deposit_balance_by_branch_date"))
+
+
+def test_compiler_routes_to_summary_tables(materialized):
+    engine, materializer = materialized
+    plans = [
+        _plan(TXN, ["biz_date", "channel"], ["txn_count", "txn_amount_net"], start="2026-01-02", end="2026-01-06"),
+        _plan(DEPOSIT, ["region", "currency"], ["total_end_balance"], start="2026-01-03", end="2026-01-03"),
+        _plan(DEPOSIT, ["biz_date", "currency"], ["total_end_balance"], start="2026-02-01", end="2026-02-01", window="latest_available_date"),
+    ]
+    routed = [engine.answer(plan) for plan in plans]
+    assert [r.source for r in routed] == ["mv_kpi_txn_by_channel_date"] + ["mv_kpi_deposit_balance_by_branch_date"] * 2
+    latest = compile_plan(plans[2], routes=engine.routes)
+    assert "status IN (%s, %s)" in latest.sql
+    assert "FROM mv_kpi_deposit_balance_by_branch_date WHERE biz_date <= %s" in latest.sql
+
+    materializer.uninstall()
+    direct = [engine.answer(plan) for plan in plans]
+    assert [r.source for r in direct] == ["vw_kpi_txn_by_channel_date"] + ["fact_account_balance_daily"] * 2
+    for routed_result, direct_result in zip(routed, direct):
+        _same_rows(routed_result.rows, direct_result.rows)
+    assert direct[2].rows[0][0] == "2026-01-10"
+
+
+def test_routes_wait_for_first_refresh():
+    engine = LocalEngine.open(scale=SCALE)
+    try:
+        materializer = KpiMaterializer(engine.conn, routes=engine.routes)
+        materializer.install()
+        assert engine.routes == {}
+        plan = _plan(TXN, ["channel"], ["txn_count"], start="2026-01-01", end="2026-01-10")
+        assert engine.answer(plan).source == "vw_kpi_txn_by_channel_date" and engine.answer(plan).rows
+
+        materializer.refresh_view(TXN_MV)
+        assert set(engine.routes) == {TXN_MV.view}
+        assert engine.answer(plan).source == TXN_MV.table
+
+        # a later install on the same database routes the already refreshed table at once
+        again = KpiMaterializer(engine.conn)
+        again.install()
+        assert set(again.routes) == {TXN_MV.view}
+    finally:
+        engine.close()
+
+
+def test_routes_are_per_connection(materialized):
+    engine, _ = materialized
+    other = LocalEngine.open(scale=SCALE)
+    try:
+        plan = _plan(TXN, ["channel"], ["txn_count"], start="2026-01-01", end="2026-01-10")
+        assert other.answer(plan).source == "vw_kpi_txn_by_channel_date"
+        assert engine.answer(plan).source == TXN_MV.table
+        assert other.answer(plan).rows == engine.answer(plan).rows
+    finally:
+        other.close()
+
+
+def test_noop_refresh_only_rechecks_the_watermark_date(materialized):
+    _, materializer = materialized
+    stats = materializer.refresh()
+    assert {s.dates_refreshed for s in stats.values()} == {1}
+    assert not any(s.full for s in stats.values())
+
+
+def test_backdated_transaction_refreshes_its_date(materialized):
+    engine, materializer = materialized
+    _insert_txn(engine, "2026-01-03")
+    stats = materializer.refresh()
+    # the back-dated day plus the previous watermark's day
+    assert stats[TXN_MV.table].dates_refreshed == 2
+    assert _in_sync(engine, TXN_MV)
+
+
+def test_row_landing_on_the_watermark_is_not_lost(materialized):
+    engine, materializer = materialized
+    _insert_txn(engine, "2026-01-03", ts_sql="MAX(txn_ts)")
+    assert materializer.refresh_view(TXN_MV).dates_refreshed == 2
+    assert _in_sync(engine, TXN_MV)
+
+
+def test_new_snapshot_date_and_lookback(materialized):
+    engine, materializer = materialized
+    with engine.conn:
+        engine.conn.execute(
+            "INSERT INTO fact_account_balance_daily SELECT '2026-01-11', account_id, end_balance, available_bal, hold_amount "
+            "FROM fact_account_balance_daily WHERE biz_date = '2026-01-10'"
+        )
+    assert materializer.refresh_view(DEPOSIT_MV).dates_refreshed == 2
+    assert materializer.watermark(DEPOSIT_MV) == "2026-01-11"
+
+    # a late correction inside the lookback window is picked up without a new date
+    with engine.conn:
+        engine.conn.execute("UPDATE fact_account_balance_daily SET end_balance = end_balance + 1 WHERE biz_date = '2026-01-09'")
+    assert KpiMaterializer(engine.conn, [DEPOSIT_MV], lookback_days=2).refresh_view(DEPOSIT_MV).dates_refreshed == 3
+    assert _in_sync(engine, DEPOSIT_MV)
+
+
+def test_explicit_dates_and_full_refresh(materialized):
+    engine, materializer = materialized
+    with engine.conn:
+        engine.conn.execute("DELETE FROM fact_transaction WHERE biz_date = '2026-01-04' AND channel = 'ATM'")
+    watermark = materializer.watermark(TXN_MV)
+    # deletes do not move the watermark
+    materializer.refresh_view(TXN_MV)
+    assert not _in_sync(engine, TXN_MV)
+
+    repaired = materializer.refresh_view(TXN_MV, dates=["2026-01-04"])
+    assert (repaired.dates_refreshed, repaired.watermark) == (1, watermark)
+    assert _in_sync(engine, TXN_MV)
+
+    full = materializer.refresh(full=True, dates=["2026-01-04"])
+    assert all(s.full and s.dates_refreshed == 10 for s in full.values())
+    assert materializer.watermark(TXN_MV) == watermark
@@ -0,0 +1,220 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from src.normalization import metrics
+from src.normalization.config import NormalizationSettings
+from src.normalization.rule_engine import build_normalized_request
+from src.normalization.validator import validate_semantic_plan
+from src.query import build_semantic_plan, get_metric_specs
+from src.query.metric_specs import parse_yaml_subset
+
+DEPOSIT = "metric.deposit.total_end_balance"
+TXN = "metric.txn.volume_by_channel"
+USER = {"user_id": "u-1", "role": "analyst", "data_scope": ["AGGREGATED_ONLY"], "allowed_regions": []}
+
+OVERLAPPING_METRICS = """
+defaults:
+  currency_policy:
+    allow_cross_currency_aggregation: false
+metrics:
+  loan_balance:
+    concept_id: "metric.loan.balance"
+    name_zh: "貸款餘額"
+    grain: ["biz_date", "branch_id"]
+    dimensions:
+      required: ["biz_date"]
+    measures: ["total_end_balance"]
+    allowed_group_by: ["biz_date", "branch_id"]
+    filters:
+      allowed: ["biz_date", "branch_id"]
+    time_semantics:
+      supports: ["single_date", "date_range"]
+      default_window: "latest_available_date"
+  deposit_balance:
+    concept_id: "metric.deposit.balance"
+    name_zh: "存款餘額"
+    grain: ["biz_date", "branch_id"]
+    dimensions:
+      required: ["biz_date"]
+    measures: ["total_end_balance"]
+    allowed_group_by: ["biz_date", "branch_id"]
+    filters:
+      allowed: ["biz_date", "branch_id"]
+    time_semantics:
+      supports: ["single_date", "date_range"]
+      default_window: "latest_available_date"
+"""
+
+
+class PickingLLM:
+    def __init__(self, metric_id):
+        self.metric_id = metric_id
+        self.prompts = []
+
+    def __call__(self, prompt, timeout):
+        self.prompts.append(prompt)
+        return json.dumps({"metric_id": self.metric_id})
+
+
+def _normalized(text, allowed_regions=()):
+    return build_normalized_request(
+        raw_text=text,
+        user_context={**USER, "allowed_regions": list(allowed_regions)},
+        request_context={"request_id": "req-1", "request_ts": "2026-02-11T10:00:00+08:00"},
+        now=datetime(2026, 2, 11, 10, 0),
+    )
+
+
+def _plan(text, **kwargs):
+    return build_semantic_plan(_normalized(text), settings=NormalizationSettings(), **kwargs)
+
+
+@pytest.mark.parametrize(
+    "text, metric_id, group_by, measures",
+    [
+        ("查昨天各分行的存款餘額", DEPOSIT, ["biz_date", "branch_id", "currency"], ["total_end_balance"]),
+        ("近7天 ATM 與櫃檯交易量", TXN, ["biz_date", "channel"], ["txn_count", "txn_amount_net"]),
+        ("今天各渠道交易淨額", TXN, ["biz_date", "channel"], ["txn_amount_net"]),
+    ],
+)
+def test_metrics_yaml_examples(text, metric_id, group_by, measures):
+    plan = _plan(text)
+
+    assert not plan["needs_clarification"]
+    assert plan["metric_id"] == metric_id
+    assert plan["group_by"] == group_by
+    assert plan["measures"] == measures
+    assert validate_semantic_plan(plan) == (True, [])
+
+
+def test_filters_and_multi_value_in_list():
+    plan = _plan("近7天 ATM 與櫃檯交易量")
+    assert plan["filters"] == {"channel": "ATM,BRANCH"}
+    assert plan["time_window"]["type"] == "date_range"
+
+    plan = _plan("昨天澳門半島 MOP 存款餘額")
+    assert plan["filters"] == {"region": "澳門半島", "currency": "MOP"}
+    assert plan["group_by"] == ["biz_date"]  # a single currency needs no split
+    assert plan["time_window"]["start_date"] == "2026-02-10"
+
+
+def test_unsupported_group_by_is_recorded_as_assumption():
+    plan = _plan("最近7天 各分行 交易筆數")
+    assert plan["metric_id"] == TXN
+    assert plan["group_by"] == ["biz_date"]
+    assert plan["assumptions"] == ["此指標無法按 branch_id 分組，已忽略"]
+    assert plan["confidence"] < 1.0
+
+
+def test_currency_split_is_recorded_as_assumption():
+    plan = _plan("昨天存款餘額")
+    assert "currency" in plan["group_by"]
+    assert any("幣別" in a for a in plan["assumptions"])
+
+
+@pytest.mark.parametrize("text", ["列出每個account_no的明細", "給我各分行存款餘額和客戶 phone"])
+def test_detail_and_pii_requests_need_clarification(text):
+    plan = _plan(text)
+    assert plan["needs_clarification"]
+    assert plan["confidence"] == 0.0
+    assert "聚合" in plan["clarification_question"]
+
+
+def test_question_without_metric_needs_clarification():
+    plan = _plan("昨天怎麼樣")
+    assert plan["needs_clarification"]
+    assert plan["metric_id"] == "unresolved"
+    assert validate_semantic_plan(plan) == (True, [])
+
+
+def test_region_outside_allowed_regions_needs_clarification():
+    normalized = _normalized("昨天氹仔存款餘額", allowed_regions=["澳門半島"])
+    plan = build_semantic_plan(normalized, settings=NormalizationSettings())
+    assert plan["needs_clarification"]
+    assert "氹仔" in plan["clarification_question"]
+
+
+def test_unsupported_time_type_falls_back_to_date_range():
+    plan = _plan("今年交易量")
+    assert plan["metric_id"] == TXN
+    assert plan["time_window"]["type"] == "date_range"
+    assert plan["time_window"]["start_date"] == "2026-01-01"
+
+
+def test_llm_only_breaks_ties_between_candidates(tmp_path):
+    path = tmp_path / "metrics.yaml"
+    path.write_text(OVERLAPPING_METRICS, encoding="utf-8")
+    sink = metrics.InProcessMetrics()
+    previous = metrics.set_metrics(sink)
+    try:
+        llm = PickingLLM("metric.deposit.balance")
+        normalized = {**_normalized("昨天各分行餘額"), "metric_hints": ["metric.loan.balance", "metric.deposit.balance"]}
+        plan = build_semantic_plan(normalized, metrics_path=str(path), llm_client=llm, settings=NormalizationSettings())
+
+        assert plan["metric_id"] == "metric.deposit.balance"
+        assert plan["group_by"] == ["biz_date", "branch_id"]
+        assert len(llm.prompts) == 1 and "metric.loan.balance" in llm.prompts[0]
+        assert sink.counters()["plan.llm_disambiguation"] == 1
+
+        build_semantic_plan(
+            {**normalized, "metric_hints": ["metric.deposit.balance"]},
+            metrics_path=str(path),
+            llm_client=llm,
+            settings=NormalizationSettings(),
+        )
+        assert len(llm.prompts) == 1  # a single candidate never reaches the LLM
+    finally:
+        metrics.set_metrics(previous)
+
+
+def test_ambiguous_metric_without_llm_asks_the_user(tmp_path):
+    path = tmp_path / "metrics.yaml"
+    path.write_text(OVERLAPPING_METRICS, encoding="utf-8")
+    normalized = {**_normalized("昨天餘額"), "metric_hints": ["metric.loan.balance", "metric.deposit.balance"]}
+
+    plan = build_semantic_plan(normalized, metrics_path=str(path), settings=NormalizationSettings())
+
+    assert plan["needs_clarification"]
+    assert "貸款餘額" in plan["clarification_question"] and "存款餘額" in plan["clarification_question"]
+
+
+def test_metric_specs_from_repo_yaml():
+    specs = get_metric_specs()
+    deposit, txn = specs.get(DEPOSIT), specs.get(TXN)
+
+    assert deposit.split_currency and not txn.split_currency
+    assert deposit.include_status == ("ACTIVE", "FROZEN")
+    assert deposit.preferred_source == "vw_kpi_deposit_balance_by_branch_date"
+    assert txn.column_mapping == {"txn_count": "txn_cnt", "txn_amount_net": "net_amount"}
+    assert "GROUP BY t.biz_date, t.channel" in txn.fallback_sql
+    assert get_metric_specs() is specs
+
+
+def test_yaml_subset_parser():
+    parsed = parse_yaml_subset(
+        """
+# comment
+a: 1
+b: "x: y"
+c: [one, "two, three", 3]
+d:
+  - p
+  - q: 1
+    r: [true, null]
+e: |
+  line 1
+  line 2
+f:
+  g: 'it''s'
+"""
+    )
+    assert parsed == {
+        "a": 1,
+        "b": "x: y",
+        "c": ["one", "two, three", 3],
+        "d": ["p", {"q": 1, "r": [True, None]}],
+        "e": "line 1\nline 2\n",
+        "f": {"g": "it's"},
+    }
@@ -0,0 +1,143 @@
+import pytest
+
+from src.normalization import metrics
+from src.query import CompileError, compile_plan
+from src.query import sql_compiler
+
+DEPOSIT = "metric.deposit.total_end_balance"
+TXN = "metric.txn.volume_by_channel"
+
+
+def _plan(metric_id, group_by, measures, filters=None, start="2026-02-05", end="2026-02-11", window="date_range"):
+    return {
+        "plan_version": "1.0",
+        "request_id": "req-1",
+        "metric_id": metric_id,
+        "filters": filters or {},
+        "group_by": group_by,
+        "measures": measures,
+        "time_window": {"type": window, "start_date": start, "end_date": end},
+        "assumptions": [],
+        "confidence": 1.0,
+        "needs_clarification": False,
+        "clarification_question": None,
+    }
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(sql_compiler, "_TEMPLATES", sql_compiler.TemplateCache())
+
+
+def test_view_answers_plans_within_its_grain():
+    query = compile_plan(_plan(TXN, ["biz_date", "channel"], ["txn_count", "txn_amount_net"], {"channel": "ATM,BRANCH"}))
+
+    assert query.source == "vw_kpi_txn_by_channel_date"
+    assert query.sql == (
+        "SELECT biz_date, channel, SUM(txn_cnt) AS txn_count, SUM(net_amount) AS txn_amount_net\n"
+        "FROM vw_kpi_txn_by_channel_date\n"
+        "WHERE biz_date BETWEEN %s AND %s AND channel IN (%s, %s)\n"
+        "GROUP BY biz_date, channel\n"
+        "ORDER BY biz_date, channel"
+    )
+    assert query.params == ("2026-02-05", "2026-02-11", "ATM", "BRANCH")
+
+
+def test_dimension_missing_from_view_falls_back_to_base_table():
+    query = compile_plan(_plan(TXN, ["biz_date", "txn_type"], ["txn_count"], {"txn_type": "WITHDRAW"}))
+
+    assert query.source == "fact_transaction"
+    assert "FROM fact_transaction\n" in query.sql
+    # date predicate on the bare indexed column (idx_txn_date / idx_txn_type)
+    assert "WHERE fact_transaction.biz_date BETWEEN %s AND %s AND fact_transaction.txn_type = %s" in query.sql
+    assert "COUNT(*) AS txn_count" in query.sql
+    assert query.params == ("2026-02-05", "2026-02-11", "WITHDRAW")
+
+
+def test_base_rejoin_applies_status_and_only_needed_joins():
+    # the deposit view sums every account, so include_status keeps deposit plans off it
+    by_branch = compile_plan(_plan(DEPOSIT, ["biz_date", "branch_id", "currency"], ["total_end_balance"]))
+    assert by_branch.source == "fact_account_balance_daily"
+    assert "JOIN core_account ON" in by_branch.sql and "dim_branch" not in by_branch.sql
+    assert "core_account.status IN (%s, %s)" in by_branch.sql
+    assert by_branch.params[-2:] == ("ACTIVE", "FROZEN")
+
+    by_region = compile_plan(_plan(DEPOSIT, ["biz_date", "currency"], ["total_end_balance"], {"region": "氹仔"}))
+    assert "JOIN dim_branch ON dim_branch.branch_id = core_account.branch_id" in by_region.sql
+    assert by_region.sql.index("JOIN core_account") < by_region.sql.index("JOIN dim_branch")
+
+
+def test_time_shapes():
+    single = compile_plan(_plan(DEPOSIT, ["biz_date", "currency"], ["total_end_balance"], start="2026-02-10", end="2026-02-10"))
+    assert "WHERE fact_account_balance_daily.biz_date = %s" in single.sql
+    assert single.params == ("2026-02-10", "ACTIVE", "FROZEN")
+
+    latest = compile_plan(
+        _plan(DEPOSIT, ["biz_date", "currency"], ["total_end_balance"], start="2026-02-11", end="2026-02-11", window="latest_available_date")
+    )
+    assert (
+        "biz_date = (SELECT MAX(fact_account_balance_daily.biz_date) FROM fact_account_balance_daily "
+        "WHERE fact_account_balance_daily.biz_date <= %s)"
+    ) in latest.sql
+    assert latest.params == ("2026-02-11", "ACTIVE", "FROZEN")
+
+    month = compile_plan(_plan(DEPOSIT, ["biz_date", "currency"], ["total_end_balance"], {"yyyy_mm": "2026-02"}))
+    assert month.params[-4:-2] == ("2026-02-01", "2026-02-28")
+
+
+def test_every_month_of_a_multi_month_filter_is_kept():
+    months = compile_plan(_plan(TXN, ["channel"], ["txn_count"], {"yyyy_mm": "2026-01,2024-2"}, start="2024-01-01", end="2026-12-31"))
+    assert "(biz_date BETWEEN %s AND %s OR biz_date BETWEEN %s AND %s)" in months.sql
+    assert months.params[2:] == ("2026-01-01", "2026-01-31", "2024-02-01", "2024-02-29")
+
+
+def test_repeated_shapes_skip_compilation():
+    sink = metrics.InProcessMetrics()
+    previous = metrics.set_metrics(sink)
+    try:
+        first = compile_plan(_plan(TXN, ["biz_date", "channel"], ["txn_count"], {"channel": "ATM"}))
+        second = compile_plan(_plan(TXN, ["biz_date", "channel"], ["txn_count"], {"channel": "WEB"}, start="2026-01-01"))
+        other = compile_plan(_plan(TXN, ["biz_date", "channel"], ["txn_count"], {"channel": "ATM,WEB"}))
+    finally:
+        metrics.set_metrics(previous)
+
+    assert second.sql is first.sql
+    assert second.params == ("2026-01-01", "2026-02-11", "WEB")
+    assert other.sql != first.sql  # two values change the shape
+    assert sink.counters()["sql.template_miss"] == 2 and sink.counters()["sql.template_hit"] == 1
+    stats = sql_compiler.template_cache_stats()
+    assert (stats.hits, stats.misses, stats.entries) == (1, 2, 2)
+
+
+def test_template_cache_is_bounded():
+    cache = sql_compiler.TemplateCache(max_entries=2)
+    for key in "abc":
+        cache.put(key, sql_compiler.SqlTemplate(key, "src", ()))
+    assert cache.get("a") is None and cache.get("c").sql == "c"
+
+
+@pytest.mark.parametrize(
+    "plan, message",
+    [
+        ({**_plan(TXN, ["biz_date"], ["txn_count"]), "needs_clarification": True}, "clarification"),
+        (_plan("unresolved", ["biz_date"], ["unresolved"]), "unknown metric_id"),
+        (_plan(TXN, ["biz_date", "account_id"], ["txn_count"]), "not allowed"),
+        (_plan(DEPOSIT, ["biz_date"], ["txn_count"]), "not allowed"),
+        (_plan(DEPOSIT, ["biz_date"], ["total_end_balance"], {"full_name": "x"}), "not allowed"),
+        (_plan(TXN, ["channel"], ["txn_count"], {"yyyy_mm": "2026-13"}), "YYYY-MM"),
+        (_plan(TXN, ["channel"], ["txn_count"], {"yyyy_mm": "2026/01"}), "YYYY-MM"),
+        (_plan(TXN, ["channel"], ["txn_count"], {"yyyy_mm": "2026-01,0000-01"}), "YYYY-MM"),
+    ],
+)
+def test_rejected_plans(plan, message):
+    with pytest.raises(CompileError, match=message):
+        compile_plan(plan)
+
+
+def test_planner_output_compiles():
+    from tests.query.test_plan_builder import _plan as plan_for
+
+    for text in ("查昨天各分行的存款餘額", "近7天 ATM 與櫃檯交易量", "今天各渠道交易淨額", "存款餘額"):
+        query = compile_plan(plan_for(text))
+        assert query.source in ("vw_kpi_txn_by_channel_date", "fact_account_balance_daily")
+        assert query.sql.count("%s") == len(query.params)
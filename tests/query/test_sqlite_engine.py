@@ -0,0 +1,127 @@
+import pytest
+
+from src.query import compile_plan
+from src.query import sql_compiler
+from src.query.sqlite_engine import (
+    LocalEngine,
+    SyntheticScale,
+    get_translated_script,
+    open_local_db,
+    split_statements,
+    to_sqlite_sql,
+)
+from tests.query.test_sql_compiler import DEPOSIT, TXN, _plan
+
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = LocalEngine.open()
+    yield engine
+    engine.close()
+
+
+def test_split_statements_respects_quotes_and_comments():
+    script = "-- header\nCREATE TABLE t (a TEXT); -- trailing\nINSERT INTO t VALUES ('x;y'), ('--z');\n"
+    assert list(split_statements(script)) == ["CREATE TABLE t (a TEXT)", "INSERT INTO t VALUES ('x;y'), ('--z')"]
+
+
+def test_translation_moves_indexes_and_adds_fk_indexes():
+    script = get_translated_script()
+    ddl = "\n".join(script.tables)
+
+    assert "ENUM" not in ddl and "ENGINE" not in ddl and "INDEX idx_" not in ddl
+    assert "txn_id         INTEGER PRIMARY KEY" in ddl
+    assert "CREATE INDEX IF NOT EXISTS idx_txn_type ON fact_transaction (txn_type, biz_date)" in script.indexes
+    assert "CREATE INDEX IF NOT EXISTS fk_bal_account ON fact_account_balance_daily (account_id)" in script.indexes
+    # biz_date is the leading PK column, so no extra index for fk_bal_date
+    assert not any("fk_bal_date" in ddl for ddl in script.indexes)
+    assert len(script.views) == 3
+
+
+def test_seed_views_match_hand_totals(engine):
+    rows = engine.conn.execute(
+        "SELECT branch_id, currency, total_end_balance FROM vw_kpi_deposit_balance_by_branch_date "
+        "WHERE biz_date = '2026-01-02' ORDER BY branch_id, currency"
+    ).fetchall()
+    assert rows == [(1, "HKD", 93000), (1, "MOP", 187500), (2, "MOP", 64500), (3, "HKD", 30000), (4, "MOP", 28000)]
+
+
+def test_compiled_plans_run_against_view_and_base_table(engine, monkeypatch):
+    monkeypatch.setattr(sql_compiler, "_TEMPLATES", sql_compiler.TemplateCache())
+    by_channel = engine.answer(_plan(TXN, ["channel"], ["txn_count", "txn_amount_net"], start="2026-01-01", end="2026-01-31"))
+    assert by_channel.source == "vw_kpi_txn_by_channel_date"
+    assert by_channel.records()[0] == {"channel": "API", "txn_count": 2, "txn_amount_net": 30160}
+
+    deposits = engine.answer(_plan(TXN, ["txn_type"], ["txn_count"], {"txn_type": "DEPOSIT"}, start="2026-01-01", end="2026-01-31"))
+    assert deposits.source == "fact_transaction"
+    assert deposits.rows == (("DEPOSIT", 3),)
+
+    base = engine.answer(_plan(DEPOSIT, ["branch_id", "currency"], ["total_end_balance"], start="2026-01-02", end="2026-01-02"))
+    assert base.source == "fact_account_balance_daily"
+    assert dict(((b, c), v) for b, c, v in base.rows)[(4, "MOP")] == 28000  # FROZEN is included
+
+
+def test_latest_available_date_and_index_use(engine):
+    latest = compile_plan(
+        _plan(DEPOSIT, ["biz_date"], ["total_end_balance"], {"currency": "MOP"}, start="2026-01-20", end="2026-01-20", window="latest_available_date")
+    )
+    assert engine.execute(latest).rows == (("2026-01-02", 280000),)
+
+    by_type = compile_plan(_plan(TXN, ["biz_date", "txn_type"], ["txn_count"], {"txn_type": "FEE"}))
+    assert any("idx_txn_type" in step for step in engine.explain(by_type))
+    assert to_sqlite_sql(by_type.sql).count("?") == len(by_type.params)
+
+
+def test_synthetic_scale_is_deterministic():
+    scale = SyntheticScale(branches=3, days=5, accounts=20, txns_per_account_day=2)
+    first, second = open_local_db(scale=scale), open_local_db(scale=scale)
+    count = lambda conn, table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    assert count(first, "dim_branch") == 3
+    assert count(first, "fact_account_balance_daily") == 5 * 20
+    assert count(first, "fact_transaction") == 5 * 40
+    assert count(first, "dim_product") == 7  # seed dimension kept
+    query = "SELECT SUM(end_balance) FROM fact_account_balance_daily"
+    assert first.execute(query).fetchone() == second.execute(query).fetchone()
+
+
+def test_file_database_is_reused_until_inputs_change(tmp_path):
+    path = str(tmp_path / "local.db")
+    small = SyntheticScale(branches=2, days=2, accounts=5)
+
+    open_local_db(path, scale=small).execute("CREATE TABLE marker (x INTEGER)")
+    reused = open_local_db(path, scale=small)
+    assert reused.execute("SELECT name FROM sqlite_master WHERE name = 'marker'").fetchone() is not None
+    reused.close()
+
+    rebuilt = open_local_db(path, scale=SyntheticScale(branches=2, days=3, accounts=5))
+    assert rebuilt.execute("SELECT name FROM sqlite_master WHERE name = 'marker'").fetchone() is None
+    assert rebuilt.execute("SELECT COUNT(*) FROM dim_calendar").fetchone() == (3,)
+
+
+def test_scale_flag_parsing():
+    assert SyntheticScale.parse("10,365,5000") == SyntheticScale(branches=10, days=365, accounts=5000)
+    with pytest.raises(ValueError):
+        SyntheticScale.parse("10,365")
+
+
+def test_deposit_plans_exclude_closed_accounts():
+    local = LocalEngine.open()
+    try:
+        with local.conn:
+            local.conn.execute("UPDATE core_account SET status = 'CLOSED' WHERE account_id = 20001")
+        closed = local.conn.execute(
+            "SELECT end_balance FROM fact_account_balance_daily WHERE account_id = 20001 AND biz_date = '2026-01-02'"
+        ).fetchone()[0]
+        view = dict(
+            local.conn.execute(
+                "SELECT currency, SUM(total_end_balance) FROM vw_kpi_deposit_balance_by_branch_date "
+                "WHERE biz_date = '2026-01-02' GROUP BY currency"
+            ).fetchall()
+        )
+        result = local.answer(_plan(DEPOSIT, ["currency"], ["total_end_balance"], start="2026-01-02", end="2026-01-02"))
+        assert closed > 0
+        assert result.source == "fact_account_balance_daily"
+        assert dict(result.rows) == {**view, "MOP": view["MOP"] - closed}
+    finally:
+        local.close()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import importlib
 import sys
 from types import ModuleType, SimpleNamespace
@@ -8,11 +9,16 @@ from types import ModuleType, SimpleNamespace
 class _DummyLLM:
     def __init__(self):
         self.prompts = []
+        self.timeouts = []
 
-    def invoke(self, prompt):
+    def invoke(self, prompt, timeout=None):
         self.prompts.append(prompt)
+        self.timeouts.append(timeout)
         return SimpleNamespace(content='{"completed": {}}')
 
+    async def ainvoke(self, prompt, timeout=None):
+        return self.invoke(prompt, timeout=timeout)
+
 
 class _DummyBot:
     def __init__(self, *args, **kwargs):
@@ -30,6 +36,11 @@ class _DummyBot:
         del session_id, user_text
         return "ok"
 
+    def stream(self, session_id: str, user_text: str):
+        del session_id, user_text
+        yield "o"
+        yield "k"
+
 
 def _load_app_with_dummy_chat(monkeypatch):
     fake_chat = ModuleType("chat")
@@ -49,6 +60,18 @@ def test_make_llm_completion_client_uses_bot_llm_invoke(monkeypatch):
 
     assert result == '{"completed": {}}'
     assert bot.llm.prompts == ["prompt text"]
+    assert bot.llm.timeouts == [1]
+
+
+def test_make_async_llm_completion_client_uses_bot_llm_ainvoke(monkeypatch):
+    app = _load_app_with_dummy_chat(monkeypatch)
+
+    bot = _DummyBot()
+    client = app._make_async_llm_completion_client(bot)
+
+    assert asyncio.run(client("prompt text", timeout=1)) == '{"completed": {}}'
+    assert bot.llm.prompts == ["prompt text"]
+    assert bot.llm.timeouts == [1]
 
 
 def test_run_cli_normalize_passes_llm_client(monkeypatch, capsys):
@@ -84,3 +107,14 @@ def test_run_cli_normalize_passes_llm_client(monkeypatch, capsys):
 
     out = capsys.readouterr().out
     assert "Normalized>" in out
+
+
+def test_run_cli_streams_chat_reply(monkeypatch, capsys):
+    app = _load_app_with_dummy_chat(monkeypatch)
+
+    inputs = iter(["你好", "/exit"])
+    monkeypatch.setattr("builtins.input", lambda _prompt: next(inputs))
+
+    app.run_cli()
+
+    assert "AI> ok\n" in capsys.readouterr().out
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+import chat
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_importing_cli_and_chat_does_not_load_langchain():
+    code = "import main, chat, src.app, sys; print(any(m.startswith(('langchain', 'dotenv')) for m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "False"
+
+
+def test_setup_runs_in_background_until_first_use(monkeypatch):
+    pytest.importorskip("langchain_core")
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.messages import AIMessage
+
+    release = threading.Event()
+
+    def _slow_build_llm(cfg):
+        release.wait(5)
+        return GenericFakeChatModel(messages=iter([AIMessage("pong"), AIMessage("ok")]))
+
+    monkeypatch.setenv("SYSTEM_PROMPT", "你是 SmartBI 助手")
+    monkeypatch.setattr(chat, "build_llm", _slow_build_llm)
+
+    bot = chat.SmartBIChat(load_env=False)
+    assert not bot.ready
+
+    release.set()
+    assert bot.invoke("s1", "hi") == "ok"  # the background ping consumed "pong"
+    assert bot.ready
+
+
+def test_background_setup_failure_exits_on_first_use(monkeypatch, capsys):
+    def _broken_build_llm(cfg):
+        raise ConnectionError("no route")
+
+    monkeypatch.setattr(chat, "build_llm", _broken_build_llm)
+    pytest.importorskip("langchain_core")
+    bot = chat.SmartBIChat(load_env=False)
+
+    with pytest.raises(SystemExit):
+        bot.history("s1")
+    assert "[Chain error]" in capsys.readouterr().out
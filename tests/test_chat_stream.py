@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("langchain_openai")
+pytest.importorskip("dotenv")
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+import chat
+
+
+@pytest.fixture
+def bot(monkeypatch):
+    monkeypatch.setenv("SYSTEM_PROMPT", "你是 SmartBI 助手")
+    replies = iter([AIMessage("上月 存款 餘額 上升"), AIMessage("交易量 持平")])
+    monkeypatch.setattr(chat, "build_llm", lambda cfg: GenericFakeChatModel(messages=replies))
+    return chat.SmartBIChat(load_env=False, test_connection=False)
+
+
+def test_stream_yields_chunks_and_commits_history(bot):
+    chunks = list(bot.stream("s1", "上月存款?"))
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == "上月 存款 餘額 上升"
+    assert [m.content for m in bot.history("s1")] == ["上月存款?", "上月 存款 餘額 上升"]
+
+    stats = bot.last_turn
+    assert stats.session_id == "s1"
+    assert stats.chunks == len(chunks)
+    assert 0 <= stats.ttft_seconds <= stats.total_seconds
+    assert stats.estimated_tokens > 0 and stats.tokens_per_second > 0
+
+
+def test_astream_commits_history(bot):
+    async def _collect():
+        return [chunk async for chunk in bot.astream("s2", "交易量?")]
+
+    assert "".join(asyncio.run(_collect())) == "上月 存款 餘額 上升"
+    assert len(bot.history("s2")) == 2
+    assert list(bot.turn_stats)[-1].session_id == "s2"
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_core.runnables.history import RunnableWithMessageHistory
+
+from session_store import SessionStore, WindowedChatMessageHistory
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_history_keeps_only_the_latest_window():
+    history = WindowedChatMessageHistory(max_messages=4, max_tokens=10_000)
+    for i in range(10):
+        history.add_messages([HumanMessage(f"q{i}"), AIMessage(f"a{i}")])
+
+    assert [m.content for m in history.messages] == ["q8", "a8", "q9", "a9"]
+
+
+def test_history_token_cap_drops_oldest_but_keeps_latest():
+    history = WindowedChatMessageHistory(max_messages=100, max_tokens=30)
+    history.add_messages([HumanMessage("存款" * 5), AIMessage("交易" * 5)])
+    history.add_messages([HumanMessage("澳門" * 50)])
+
+    assert [m.content for m in history.messages] == ["澳門" * 50]
+    history.clear()
+    assert history.messages == [] and history.tokens == 0
+
+
+def test_store_evicts_least_recently_used_sessions():
+    store = SessionStore(max_sessions=2)
+    store.get("a")
+    store.get("b")
+    store.get("a")
+    store.get("c")
+
+    assert "a" in store and "c" in store and "b" not in store
+    assert store.stats().evicted_lru == 1
+
+
+def test_store_expires_idle_sessions():
+    clock = _Clock()
+    store = SessionStore(idle_ttl_seconds=60, clock=clock)
+    store.get("old").add_messages([HumanMessage("hi")])
+    clock.now = 30
+    store.get("fresh")
+    clock.now = 70
+    store.evict_expired()
+
+    assert "old" not in store and "fresh" in store
+    assert store.stats().evicted_idle == 1
+
+
+def test_store_plugs_into_runnable_with_message_history():
+    store = SessionStore(max_messages=4)
+    seen = []
+
+    def _echo(inputs):
+        seen.append(len(inputs["history"]))
+        return AIMessage(f"echo {inputs['input']}")
+
+    chat = RunnableWithMessageHistory(
+        RunnableLambda(_echo),
+        get_session_history=store.get,
+        input_messages_key="input",
+        history_messages_key="history",
+    )
+    for i in range(5):
+        chat.invoke({"input": f"q{i}"}, config={"configurable": {"session_id": "s1"}})
+
+    assert seen == [0, 2, 4, 4, 4]
+    store.reset("s1")
+    assert store.get("s1").messages == []
+
+
+def test_concurrent_access_is_thread_safe():
+    store = SessionStore(max_sessions=50, max_messages=6)
+
+    def _worker(n):
+        for i in range(200):
+            store.get(f"s{(n * 200 + i) % 80}").add_messages([HumanMessage("q"), AIMessage("a")])
+
+    threads = [threading.Thread(target=_worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = store.stats()
+    assert stats.sessions == 50
+    assert stats.messages <= 50 * 6
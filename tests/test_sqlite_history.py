@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("langchain_openai")
+pytest.importorskip("dotenv")
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from chat import ChatConfig, build_session_store
+from session_store import SQLiteChatMessageHistory, SQLiteHistoryBackend
+
+
+def test_history_survives_reopen(tmp_path):
+    path = str(tmp_path / "chat.db")
+    backend = SQLiteHistoryBackend(path)
+    SQLiteChatMessageHistory("s1", backend).add_messages([HumanMessage("上月存款?"), AIMessage("1,234 億")])
+    backend.close()
+
+    reopened = SQLiteChatMessageHistory("s1", SQLiteHistoryBackend(path))
+    messages = reopened.messages
+    assert [type(m) for m in messages] == [HumanMessage, AIMessage]
+    assert [m.content for m in messages] == ["上月存款?", "1,234 億"]
+
+
+def test_loads_only_last_n_messages(tmp_path):
+    backend = SQLiteHistoryBackend(str(tmp_path / "chat.db"))
+    history = SQLiteChatMessageHistory("s1", backend, max_messages=3)
+    for i in range(10):
+        history.add_messages([HumanMessage(f"q{i}"), AIMessage(f"a{i}")])
+
+    assert [m.content for m in history.messages] == ["a8", "q9", "a9"]
+    assert backend.count("s1") == 20
+
+
+def test_batched_writes_are_visible_and_flushed_on_close(tmp_path):
+    path = str(tmp_path / "chat.db")
+    writer = SQLiteHistoryBackend(path, batch_size=100)
+    history = SQLiteChatMessageHistory("s1", writer)
+    history.add_messages([HumanMessage("q")])
+
+    other_worker = SQLiteHistoryBackend(path)
+    assert other_worker.count("s1") == 0
+    assert [m.content for m in history.messages] == ["q"]  # reads flush first
+    assert other_worker.count("s1") == 1
+
+    history.add_messages([AIMessage("a")])
+    writer.close()
+    assert other_worker.count("s1") == 2
+
+
+def test_clear_only_touches_one_session(tmp_path):
+    backend = SQLiteHistoryBackend(str(tmp_path / "chat.db"))
+    SQLiteChatMessageHistory("s1", backend).add_messages([HumanMessage("a")])
+    SQLiteChatMessageHistory("s2", backend).add_messages([HumanMessage("b")])
+    SQLiteChatMessageHistory("s1", backend).clear()
+
+    assert backend.count("s1") == 0 and backend.count("s2") == 1
+
+
+def test_chat_config_selects_sqlite_backend(tmp_path):
+    cfg = ChatConfig(history_backend="sqlite", history_db_path=str(tmp_path / "chat.db"), max_sessions=1)
+    store = build_session_store(cfg)
+    store.get("s1").add_messages([HumanMessage("hi")])
+    store.get("s2")  # evicts s1 from the in-process LRU only
+
+    assert [m.content for m in store.get("s1").messages] == ["hi"]
+    store.reset("s1")
+    assert store.get("s1").messages == []
+
+    with pytest.raises(ValueError):
+        build_session_store(ChatConfig(history_backend="redis"))